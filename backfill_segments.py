@@ -0,0 +1,315 @@
+"""Backfill job segmentations from a JSONL file, resumably.
+
+Each input line is a JSON object with a job description (the first of
+"description", "body" or "text", with "title" prepended when present) and an
+id ("id", "request_id" or "job_id"; the line number otherwise). Descriptions
+are segmented with bounded concurrency at the "backfill" priority, through the
+same backend pool, rate limits and circuit breakers as the service. Set
+SHARED_STATE_FILE to the file the running service uses to spend one rate
+budget between them (it defaults to the service's own path).
+
+Results go to the output file, one {"id", "segments"} object per line.
+Descriptions whose model output can't be parsed, and calls that still fail
+after the upstream retries, go to the retry file as the original record plus
+an "error" field, so the retry file can be fed back in as input. Progress is
+checkpointed every few seconds; rerunning the same command resumes where
+the last run stopped, without duplicating output lines.
+
+    python backfill_segments.py postings.jsonl segments.jsonl
+    python backfill_segments.py postings.jsonl segments.jsonl --concurrency 32
+    python backfill_segments.py segments.retry.jsonl retried.jsonl
+    python backfill_segments.py postings.jsonl segments.jsonl --simulate   # no IBM calls
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ID_FIELDS = ("id", "request_id", "job_id")
+TEXT_FIELDS = ("description", "body", "text")
+
+
+class Checkpoint:
+    """Progress through one input file, saved atomically next to the output.
+
+    watermark is the first input line that isn't finished; done holds finished
+    lines past it (calls complete out of order). The output and retry file
+    sizes are saved with it, and a resumed run truncates both back to them, so
+    lines written after the last save are redone rather than duplicated.
+    """
+    def __init__(self, path: str, input_path: str):
+        self.path = path
+        self.input = input_path
+        self.watermark = 0
+        self.done: set[int] = set()
+        self.output_bytes = 0
+        self.retry_bytes = 0
+        self.counters = {"succeeded": 0, "failed": 0, "parse_failed": 0, "skipped": 0}
+        self.complete = False
+
+    @classmethod
+    def load(cls, path: str, input_path: str) -> "Checkpoint | None":
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        checkpoint = cls(path, data["input"])
+        checkpoint.watermark = data["watermark"]
+        checkpoint.done = set(data["done"])
+        checkpoint.output_bytes = data["output_bytes"]
+        checkpoint.retry_bytes = data["retry_bytes"]
+        checkpoint.counters.update(data["counters"])
+        checkpoint.complete = data["complete"]
+        return checkpoint
+
+    def finish(self, line: int):
+        """Mark an input line as handled and advance the watermark past every finished line"""
+        self.done.add(line)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    def is_done(self, line: int) -> bool:
+        return line < self.watermark or line in self.done
+
+    def save(self):
+        data = {
+            "input": self.input,
+            "watermark": self.watermark,
+            "done": sorted(self.done),
+            "output_bytes": self.output_bytes,
+            "retry_bytes": self.retry_bytes,
+            "counters": self.counters,
+            "complete": self.complete,
+            "updated": time.time(),
+        }
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+
+def open_at(path: str, size: int):
+    """Open path for appending after truncating it to size (the last checkpointed length)"""
+    f = open(path, "a+b")
+    f.truncate(size)
+    f.seek(size)
+    return f
+
+
+def field(record: dict, names: tuple[str, ...], override: str | None):
+    if override:
+        return record.get(override)
+    for name in names:
+        if record.get(name):
+            return record[name]
+    return None
+
+
+class Backfill:
+    """Stream input lines through asegment_job_description with at most `concurrency` in flight"""
+    def __init__(self, model, service, args, checkpoint: Checkpoint):
+        self.model = model
+        self.service = service
+        self.args = args
+        self.checkpoint = checkpoint
+        self.output = open_at(args.output, checkpoint.output_bytes)
+        self.retry = open_at(args.retry_file, checkpoint.retry_bytes)
+        self.slots = asyncio.Semaphore(args.concurrency)
+        self.started = time.monotonic()
+        self.processed = 0
+
+    def _write(self, f, record: dict):
+        f.write(json.dumps(record, ensure_ascii=False).encode() + b"\n")
+
+    def _fail(self, line: int, record: dict, error: str, kind: str):
+        self._write(self.retry, {**record, "error": error})
+        self.checkpoint.counters[kind] += 1
+        self.checkpoint.finish(line)
+
+    async def _segment(self, line: int, raw: str):
+        try:
+            try:
+                record = json.loads(raw)
+                if not isinstance(record, dict):
+                    raise ValueError("line is not a JSON object")
+            except ValueError as e:
+                self._fail(line, {"line": line + 1, "raw": raw}, f"Invalid input: {e}", "failed")
+                return
+            description = field(record, TEXT_FIELDS, self.args.text_field)
+            if not description:
+                self._fail(line, record, "Invalid input: no job description", "failed")
+                return
+            title = record.get("title")
+            if title and not self.args.text_field:
+                description = f"{title}\n{description}"
+
+            while True:
+                try:
+                    segments = await self.service.asegment_job_description(str(description), priority="backfill", placeholder=False)
+                except self.model.OverloadedError as e:
+                    # Every backend is shedding load; wait it out instead of failing the line
+                    await asyncio.sleep(max(e.retry_after, 1.0))
+                    continue
+                except self.model.SegmentationParseError as e:
+                    self._fail(line, record, str(e), "parse_failed")
+                    return
+                except Exception as e:
+                    self._fail(line, record, str(e), "failed")
+                    return
+                break
+
+            record_id = field(record, ID_FIELDS, self.args.id_field)
+            self._write(self.output, {"id": record_id if record_id is not None else line + 1, "segments": segments.model_dump()})
+            self.checkpoint.counters["succeeded"] += 1
+            self.checkpoint.finish(line)
+        finally:
+            self.processed += 1
+            self.slots.release()
+
+    def save(self):
+        """Flush both output files, then record their sizes with the progress"""
+        for f in (self.output, self.retry):
+            f.flush()
+            os.fsync(f.fileno())
+        self.checkpoint.output_bytes = self.output.tell()
+        self.checkpoint.retry_bytes = self.retry.tell()
+        self.checkpoint.save()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        counters = self.checkpoint.counters
+        print(
+            f"line {self.checkpoint.watermark}: {counters['succeeded']} ok, {counters['parse_failed']} parse failures, "
+            f"{counters['failed']} failed ({self.processed / elapsed if elapsed else 0:.2f}/s this run)",
+            file=sys.stderr,
+        )
+
+    async def _checkpoint_loop(self):
+        while True:
+            await asyncio.sleep(self.args.checkpoint_every)
+            self.save()
+            self.report()
+
+    async def run(self):
+        saver = asyncio.create_task(self._checkpoint_loop())
+        tasks: set[asyncio.Task] = set()
+        try:
+            with open(self.args.input, encoding="utf-8") as f:
+                for line, raw in enumerate(f):
+                    if self.checkpoint.is_done(line):
+                        continue
+                    raw = raw.strip()
+                    if not raw:
+                        self.checkpoint.counters["skipped"] += 1
+                        self.checkpoint.finish(line)
+                        continue
+                    await self.slots.acquire()
+                    task = asyncio.create_task(self._segment(line, raw))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+            self.checkpoint.complete = True
+        finally:
+            saver.cancel()
+            # Interrupted calls stay unfinished in the checkpoint and are redone on resume
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.save()
+            self.report()
+            self.output.close()
+            self.retry.close()
+
+
+async def main(args) -> int:
+    # Configure the service before importing it: more segmentation threads, no translation cache on disk
+    os.environ["SEGMENTATION_WORKERS"] = str(args.concurrency)
+    os.environ["TRANSLATION_CACHE_DB"] = ""
+    if args.simulate:
+        os.environ["SHARED_STATE_FILE"] = ""
+        os.environ.pop("VITE_IBM_API_KEY", None)
+        os.environ.pop("WATSONX_BACKENDS", None)
+    else:
+        os.environ.setdefault("SHARED_STATE_FILE", os.path.join(ROOT, "shared_state.bin"))
+    sys.path.insert(0, ROOT)
+    import model
+
+    if args.simulate:
+        sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+        from simulated_watsonx import SimulatedModelInference
+        service = model.WatsonXAI(model_inference=SimulatedModelInference(malformed_rate=0.05))
+    elif not model.upstream_pool.backends:
+        print("WatsonX is not configured (set WATSONX_BACKENDS or VITE_IBM_API_KEY and VITE_IBM_PROJECT_ID)", file=sys.stderr)
+        return 2
+    else:
+        service = model.WatsonXAI(model.upstream_pool)
+        pending = await asyncio.get_running_loop().run_in_executor(None, service.connect)
+        if pending:
+            print(f"{pending} backend(s) could not connect; continuing with the rest", file=sys.stderr)
+
+    input_path = os.path.abspath(args.input)
+    checkpoint = None if args.restart else Checkpoint.load(args.checkpoint, input_path)
+    if checkpoint is not None and checkpoint.input != input_path:
+        if not checkpoint.complete:
+            print(f"{args.checkpoint} belongs to an unfinished run of {checkpoint.input}; resume it or pass --restart", file=sys.stderr)
+            return 2
+        checkpoint = None
+    if checkpoint is None:
+        # A new run appends to whatever is already in the output files
+        checkpoint = Checkpoint(args.checkpoint, input_path)
+        checkpoint.output_bytes = os.path.getsize(args.output) if os.path.exists(args.output) and not args.restart else 0
+        checkpoint.retry_bytes = os.path.getsize(args.retry_file) if os.path.exists(args.retry_file) and not args.restart else 0
+    elif checkpoint.complete:
+        print(f"{args.input} is already done (pass --restart to run it again)", file=sys.stderr)
+        return 0
+    else:
+        print(f"Resuming at line {checkpoint.watermark + 1}", file=sys.stderr)
+
+    model.upstream_scheduler.start()
+    # The backfill adapts the shared rate alongside the service's workers
+    if model.shared_state is not None:
+        model.shared_state.register_worker(os.getpid())
+    try:
+        await Backfill(model, service, args, checkpoint).run()
+    finally:
+        await model.upstream_scheduler.stop()
+        if model.shared_state is not None:
+            model.shared_state.unregister_worker(os.getpid())
+    print(json.dumps(checkpoint.counters))
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Segment a JSONL file of job descriptions, resumably.")
+    parser.add_argument("input", help="JSONL file of job postings")
+    parser.add_argument("output", help="JSONL file for {id, segments} results (appended to)")
+    parser.add_argument("--retry-file", default=None, help="failed records go here (default: OUTPUT with .retry.jsonl)")
+    parser.add_argument("--checkpoint", default=None, help="progress file (default: OUTPUT with .checkpoint.json)")
+    parser.add_argument("--concurrency", type=int, default=16, help="segmentations in flight at once")
+    parser.add_argument("--checkpoint-every", type=float, default=5.0, help="seconds between checkpoints")
+    parser.add_argument("--id-field", default=None, help=f"record id field (default: first of {', '.join(ID_FIELDS)})")
+    parser.add_argument("--text-field", default=None, help=f"description field (default: first of {', '.join(TEXT_FIELDS)}, with title)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and overwrite the output files")
+    parser.add_argument("--simulate", action="store_true", help="use the simulated WatsonX backend from benchmarks/")
+    args = parser.parse_args(argv)
+    stem = os.path.splitext(args.output)[0]
+    args.retry_file = args.retry_file or f"{stem}.retry.jsonl"
+    args.checkpoint = args.checkpoint or f"{stem}.checkpoint.json"
+    if os.path.abspath(args.retry_file) == os.path.abspath(args.input):
+        parser.error("the retry file is the input; pass a different OUTPUT or --retry-file")
+    return args
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(main(parse_args())))
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        sys.exit(130)
@@ -0,0 +1,66 @@
+"""Micro-benchmark: per-response cost of translation output cleanup.
+
+Compares the original cleanup (34 uncompiled re.sub calls plus quote regexes)
+with the single precompiled TranslationCleaner pattern in model.py.
+
+    python benchmarks/cleanup_bench.py [iterations]
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from model import translation_cleaner
+
+LEGACY_LANGUAGES = [
+    "English", "French", "Spanish", "German", "Italian", "Portuguese", "Russian", "Chinese",
+    "Japanese", "Korean", "Arabic", "Hindi", "Bengali", "Urdu", "Turkish", "Dutch", "Swedish",
+    "Norwegian", "Danish", "Finnish", "Polish", "Czech", "Hungarian", "Greek", "Hebrew", "Thai",
+    "Vietnamese",
+]
+LEGACY_PATTERNS = [
+    r'^[^\w]*Here is the translation:?\s*',
+    r'^[^\w]*Translation:?\s*',
+    r'^[^\w]*The translation is:?\s*',
+    r'^[^\w]*Translated:?\s*',
+    r'^[^\w]*Result:?\s*',
+    r'^[^\w]*Output:?\s*',
+    r'^[^\w]*Input:?\s*',
+] + [rf'^[^\w]*{language}:?\s*' for language in LEGACY_LANGUAGES]
+
+SAMPLES = [
+    ' Translation: "Hola, ¿cómo estás?"\nInput: next',
+    "Bonjour tout le monde",
+    "Here is the translation: Spanish: ¿El puesto sigue disponible?",
+    '"Danke schön"',
+    "Translation:\nこんにちは、元気ですか？\n(Note: informal)",
+    "Sí, todavía está disponible. ¿Cuándo puede venir para una entrevista? " * 4,
+]
+
+
+def legacy_clean(raw_text: str) -> str:
+    cleaned_text = raw_text.strip()
+    for pattern in LEGACY_PATTERNS:
+        cleaned_text = re.sub(pattern, '', cleaned_text, flags=re.IGNORECASE)
+    cleaned_text = re.sub(r'^["\']+|["\']+$', '', cleaned_text)
+    cleaned_text = re.sub(r'^["\'](.+)["\']$', r'\1', cleaned_text)
+    cleaned_text = cleaned_text.split('\n')[0]
+    return cleaned_text.strip()
+
+
+def per_response_us(func, iterations: int) -> float:
+    def run():
+        for sample in SAMPLES:
+            func(sample)
+    return min(timeit.repeat(run, number=iterations, repeat=5)) / (iterations * len(SAMPLES)) * 1e6
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    legacy = per_response_us(legacy_clean, iterations)
+    compiled = per_response_us(translation_cleaner.clean, iterations)
+    print(f"legacy re.sub cascade : {legacy:8.2f} us/response")
+    print(f"compiled single pass  : {compiled:8.2f} us/response")
+    print(f"speedup               : {legacy / compiled:8.1f}x")
@@ -0,0 +1,305 @@
+"""Load test: drive /translate, /segment and the translation cache against a simulated WatsonX.
+
+The FastAPI app runs in-process behind httpx's ASGI transport with
+SimulatedModelInference as the backend, so no network or IBM credentials are
+involved. Each scenario reports throughput, p50/p95/p99 latency, status codes,
+cache hit rate, upstream calls and event-loop lag, and is compared against a
+stored baseline; regressions beyond the tolerance make the run exit with 1.
+
+    python benchmarks/load_test.py                       # all scenarios, compare to baseline.json
+    python benchmarks/load_test.py --scenarios translate --concurrency 64 --requests 1000
+    python benchmarks/load_test.py --quota 20 --malformed-rate 0.2
+    python benchmarks/load_test.py --scenarios translate --backends 3 --quota 5 --rate 5
+    python benchmarks/load_test.py --threads               # upstream calls on executor threads, not awaited
+    python benchmarks/load_test.py --save-baseline       # record a new baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, ".."))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+# Options that pick the code path or the baseline file rather than the workload; left out of the recorded config
+NON_WORKLOAD_ARGS = ("baseline", "save_baseline", "tolerance", "threads")
+
+SUBJECTS = ["I", "We", "The manager", "My friend", "The new cook", "Our team", "The driver", "She", "He", "They"]
+VERBS = ["can start", "will be available", "needs to talk", "is running late", "would like to apply", "finished the shift"]
+ENDINGS = [
+    "on Monday morning", "after lunch", "this weekend", "before the interview", "at the downtown location",
+    "next week", "for the evening shift", "when the store opens", "after the training", "tomorrow",
+]
+ROLES = ["Line cook", "Cashier", "Delivery driver", "Barista", "Warehouse associate", "Dishwasher", "Server", "Host"]
+PLACES = ["Grandview Bistro", "Sunrise Market", "Blue Door Cafe", "Harbor Foods", "Main Street Deli"]
+TARGETS = ["spanish", "french", "german"]
+# Lower is better for these metrics; throughput is the only higher-is-better one
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "loop_lag_p99_ms")
+# Differences smaller than this are noise, whatever the percentage
+ABSOLUTE_SLACK = {"p50_ms": 20.0, "p95_ms": 30.0, "p99_ms": 50.0, "loop_lag_p99_ms": 10.0, "throughput_rps": 2.0}
+
+
+class BackendGroup:
+    """Several simulated backends counted as one"""
+    def __init__(self, backends: list):
+        self.backends = backends
+
+    def stats(self) -> dict:
+        totals = [backend.stats() for backend in self.backends]
+        return {key: sum(stats[key] for stats in totals) for key in totals[0]}
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def sentence_pool(size: int, rng: random.Random) -> list[str]:
+    """Distinct chat messages; about one in five has two sentences"""
+    pool: set[str] = set()
+    while len(pool) < size:
+        text = f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(ENDINGS)}."
+        if rng.random() < 0.2:
+            text += f" {rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(ENDINGS)}."
+        pool.add(text + (f" #{len(pool)}" if len(pool) >= len(SUBJECTS) * len(VERBS) * len(ENDINGS) else ""))
+    return sorted(pool)
+
+
+def description_pool(size: int, rng: random.Random) -> list[str]:
+    return [
+        f"{rng.choice(ROLES)} needed at {rng.choice(PLACES)} in San Jose, CA. ${rng.randint(18, 30)}/hr, "
+        f"{rng.choice(['mornings', 'evenings', 'weekends', 'full time'])}. Posting {i}."
+        for i in range(size)
+    ]
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes a sleeping task"""
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[float] = []
+        self.task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def __enter__(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc_info):
+        self.task.cancel()
+
+
+async def drive(client, requests: list[tuple[str, dict]], concurrency: int) -> dict:
+    """Send requests with a fixed number of concurrent clients and collect latency and status codes"""
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    pending = iter(requests)
+
+    async def client_loop():
+        for path, body in pending:
+            started = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    with LoopLagMonitor() as lag:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        duration = time.perf_counter() - started
+
+    return {
+        "requests": len(requests),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(requests) / duration, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "loop_lag_p99_ms": round(percentile(lag.samples, 0.99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lag.samples, default=0.0) * 1000, 2),
+    }
+
+
+async def run_scenario(name: str, client, model, backend, args, rng: random.Random) -> dict:
+    if name == "translate":
+        # Skewed draw from the pool, like real chat: some messages repeat a lot
+        pool = sentence_pool(args.unique, rng)
+        weights = [1 / (rank + 1) for rank in range(len(pool))]
+        requests = [
+            ("/translate", {"text": text, "fromLanguage": "english", "toLanguage": rng.choice(TARGETS)})
+            for text in rng.choices(pool, weights=weights, k=args.requests)
+        ]
+    elif name == "cache":
+        pool = sentence_pool(min(args.unique, 50), rng)
+        for text in pool:
+            model.translation_cache.set(text, "english", "spanish", text.upper())
+        requests = [
+            ("/translate", {"text": rng.choice(pool), "fromLanguage": "english", "toLanguage": "spanish"})
+            for _ in range(args.requests * 4)
+        ]
+    elif name == "segment":
+        # Segmentations take seconds each on two workers, so keep this one small
+        pool = description_pool(max(1, args.requests // 20), rng)
+        requests = [("/segment", {"description": rng.choice(pool)}) for _ in range(max(1, args.requests // 10))]
+    else:
+        raise ValueError(f"Unknown scenario: {name}")
+
+    cache_before = model.translation_cache.stats()
+    calls_before = backend.stats()["calls"]
+    tokens_before = backend.stats()["output_tokens"]
+    result = await drive(client, requests, args.concurrency)
+    cache_after = model.translation_cache.stats()
+    hits = cache_after["hits"] - cache_before["hits"]
+    misses = cache_after["misses"] - cache_before["misses"]
+    result["cache_hit_rate"] = round(hits / (hits + misses), 4) if hits + misses else None
+    result["upstream_calls"] = backend.stats()["calls"] - calls_before
+    result["output_tokens"] = backend.stats()["output_tokens"] - tokens_before
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Describe every metric that got worse than the baseline by more than the tolerance"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+        for metric in ("throughput_rps", *LOWER_IS_BETTER):
+            old, new = reference.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            slack = ABSOLUTE_SLACK[metric]
+            if metric == "throughput_rps":
+                worse = new < old * (1 - tolerance) and old - new > slack
+            else:
+                worse = new > old * (1 + tolerance) and new - old > slack
+            if worse:
+                regressions.append(f"{name}.{metric}: {old} -> {new}")
+    return regressions
+
+
+def print_table(results: dict, baseline: dict | None):
+    columns = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "cache_hit_rate", "upstream_calls", "output_tokens", "loop_lag_p99_ms")
+    print(f"{'scenario':<10}" + "".join(f"{column:>17}" for column in columns) + "  statuses")
+    for name, result in results.items():
+        reference = (baseline or {}).get("scenarios", {}).get(name, {})
+        cells = []
+        for column in columns:
+            value = result.get(column)
+            cell = "-" if value is None else f"{value}"
+            if isinstance(value, (int, float)) and isinstance(reference.get(column), (int, float)) and reference[column]:
+                cell += f" ({(value - reference[column]) / reference[column]:+.0%})"
+            cells.append(f"{cell:>17}")
+        print(f"{name:<10}" + "".join(cells) + f"  {result['statuses']}")
+
+
+async def main(args) -> int:
+    # Configure the app before importing it: no disk cache, no shared state, rate from the command line
+    os.environ["TRANSLATION_CACHE_DB"] = ""
+    os.environ["SHARED_STATE_FILE"] = ""
+    os.environ["WATSONX_RATE"] = str(args.rate)
+    os.environ["WATSONX_MAX_RATE"] = str(max(args.rate, float(os.getenv("WATSONX_MAX_RATE", "8"))))
+    os.environ.pop("VITE_IBM_API_KEY", None)
+    os.environ.pop("WATSONX_BACKENDS", None)
+    os.environ["TRANSLATION_WORKERS"] = str(4 * args.backends)
+    os.environ["WATSONX_ASYNC"] = "0" if args.threads else "1"
+    import httpx
+    import model
+    from simulated_watsonx import SimulatedModelInference
+
+    # One simulated project per backend, each with its own quota
+    simulated = [
+        SimulatedModelInference(
+            latency_median=args.latency,
+            tokens_per_second=args.tps,
+            rate_limit_rate=args.rate_limit_rate,
+            server_error_rate=args.server_error_rate,
+            quota_rps=args.quota,
+            malformed_rate=args.malformed_rate,
+            seed=args.seed + i,
+        )
+        for i in range(args.backends)
+    ]
+    backend = BackendGroup(simulated)
+    await model.startup_event()
+    if args.backends == 1:
+        service = model.WatsonXAI(model_inference=simulated[0])
+    else:
+        model.upstream_pool.backends = []
+        for i, client in enumerate(simulated):
+            pooled = model.build_backend({"name": f"sim-{i}", "region": "", "rate": args.rate, "max_rate": float(os.environ["WATSONX_MAX_RATE"])}, i)
+            pooled.client = client
+            model.upstream_pool.add(pooled)
+        service = model.WatsonXAI()
+    model.model_inference = model.granite_service = service
+    rng = random.Random(args.seed)
+
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=model.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=300) as client:
+            for name in args.scenarios.split(","):
+                print(f"Running {name}...", file=sys.stderr)
+                results[name] = await run_scenario(name.strip(), client, model, backend, args, rng)
+    finally:
+        await model.shutdown_event()
+
+    config = {key: value for key, value in vars(args).items() if key not in NON_WORKLOAD_ARGS}
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+    print(f"upstream: {model.upstream_pool.stats()}")
+    print(f"backend: {backend.stats()}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"config": config, "scenarios": results}, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if baseline is None:
+        print("No baseline to compare against (use --save-baseline)")
+        return 0
+    if baseline.get("config") != config:
+        print(f"⚠️ Baseline was recorded with different settings: {baseline.get('config')}")
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", default="translate,cache,segment", help="comma-separated: translate, cache, segment")
+    parser.add_argument("--requests", type=int, default=400, help="translate requests (cache runs 4x, segment 0.1x)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--unique", type=int, default=120, help="distinct messages in the translate pool")
+    parser.add_argument("--rate", type=float, default=40.0, help="starting upstream rate limit (req/s)")
+    parser.add_argument("--latency", type=float, default=0.35, help="median time to first token (s)")
+    parser.add_argument("--tps", type=float, default=80.0, help="simulated output tokens per second")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="chance of an injected 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="chance of an injected 503")
+    parser.add_argument("--quota", type=float, default=None, help="upstream quota (req/s) enforced with 429s, per backend")
+    parser.add_argument("--backends", type=int, default=1, help="simulated WatsonX projects in the backend pool")
+    parser.add_argument("--malformed-rate", type=float, default=0.1, help="chance of malformed segmentation JSON")
+    parser.add_argument("--threads", action="store_true", help="run upstream calls on executor threads instead of awaiting the async client")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before flagging")
+    sys.exit(asyncio.run(main(parser.parse_args())))
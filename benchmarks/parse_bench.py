@@ -0,0 +1,87 @@
+"""Micro-benchmark: segmentation output parsing on well-formed and adversarial outputs.
+
+Compares the original parse_ai_response fallback cascade (fence strip,
+first/last brace slice, three regex scans, character rebuild, quote fixing)
+with the single-pass JSONExtractor in model.py. Inputs are sized like an
+800-token generation (~3200 characters).
+
+    python benchmarks/parse_bench.py [iterations]
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from model import json_extractor, SEGMENT_FIELD_NAMES
+
+
+def extract(text: str) -> dict:
+    return json_extractor.extract(text, accept=lambda obj: any(key.lower() in SEGMENT_FIELD_NAMES for key in obj))
+
+FIELDS = '"jobTitle": "Sous Chef", "companyName": "The Grandview", "location": "San Jose, CA", "salaryRange": "$35/hr", '
+PROSE = "We are seeking an experienced cook to join our team and help with prep, service and cleaning. "
+
+SAMPLES = {
+    "well-formed, fenced": "```json\n{" + FIELDS + '"description": "' + PROSE * 30 + '"}\n```',
+    "truncated at max_new_tokens": "{" + FIELDS + '"description": "' + PROSE * 33,
+    "unescaped inner quotes": "{" + FIELDS + '"description": "' + 'say "hi" and {wave} ' * 150 + '"}',
+    "braces in surrounding prose": "Output for {job} in {city}: " + PROSE * 28 + "{" + FIELDS + '"qualifications": "none"}',
+    "single quotes + trailing commas": "{" + FIELDS.replace('"', "'") + "'qualifications': ['a', 'b', " * 60 + "]}",
+}
+
+
+def legacy_parse(response_text: str) -> dict:
+    try:
+        return json.loads(response_text.strip())
+    except json.JSONDecodeError:
+        pass
+    clean_text = re.sub(r'```json\n?|\n?```', '', response_text).strip()
+    start_idx, end_idx = clean_text.find('{'), clean_text.rfind('}')
+    if start_idx != -1 and end_idx > start_idx:
+        try:
+            return json.loads(clean_text[start_idx:end_idx + 1])
+        except json.JSONDecodeError:
+            pass
+    for pattern in (r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', r'\{.*?\}', r'\{[^}]*\}'):
+        for match in re.findall(pattern, clean_text, re.DOTALL):
+            try:
+                return json.loads(match)
+            except json.JSONDecodeError:
+                continue
+    cleaned_json = ''.join(char for char in clean_text if char.isprintable() or char in '\n\t')
+    start_idx, end_idx = cleaned_json.find('{'), cleaned_json.rfind('}')
+    try:
+        if start_idx != -1 and end_idx > start_idx:
+            return json.loads(cleaned_json[start_idx:end_idx + 1])
+    except json.JSONDecodeError:
+        pass
+    fixed_text = re.sub(r"'([^']+)':", r'"\1":', clean_text.replace('“', '"').replace('”', '"'))
+    start_idx, end_idx = fixed_text.find('{'), fixed_text.rfind('}')
+    if start_idx != -1 and end_idx > start_idx:
+        return json.loads(fixed_text[start_idx:end_idx + 1])
+    raise ValueError("Could not extract valid JSON")
+
+
+def time_us(func, text: str, iterations: int) -> tuple[float, bool]:
+    ok = True
+    start = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            result = func(text)
+            ok = isinstance(result, dict) and "jobTitle" in result
+        except Exception:
+            ok = False
+    return (time.perf_counter() - start) / iterations * 1e6, ok
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'input':34} {'chars':>6} {'legacy us':>12} {'single-pass us':>15}")
+    for name, text in SAMPLES.items():
+        legacy, legacy_ok = time_us(legacy_parse, text, iterations)
+        scanner, scanner_ok = time_us(extract, text, iterations)
+        print(f"{name:34} {len(text):6} {legacy:10.0f}{' ' if legacy_ok else '!'} {scanner:14.0f}{' ' if scanner_ok else '!'}")
+    print("(! = no usable object recovered)")
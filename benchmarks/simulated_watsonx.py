@@ -0,0 +1,216 @@
+"""Simulated WatsonX backend for offline benchmarks and load tests.
+
+SimulatedModelInference has the ModelInference methods model.py uses (generate
+and generate_text_stream, and their async agenerate and agenerate_stream) and
+answers the translation, batch, fanout and segmentation prompts with plausible
+output. It sleeps like the real service would: a lognormal time to first token,
+then output tokens at a fixed rate, cut off at the first stop sequence or
+max_new_tokens. It can inject 429s and 5xx errors (randomly or by enforcing a
+request quota) and return malformed segmentation JSON.
+
+    from model import WatsonXAI
+    service = WatsonXAI(model_inference=SimulatedModelInference(rate_limit_rate=0.05))
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from threading import Lock
+
+TRANSLATION_INPUT = re.compile(r"^Input: (.*)$", re.MULTILINE)
+BATCH_TARGET = re.compile(r"^Translate each numbered line to (.+?)\. ")
+BATCH_LINE = re.compile(r"^(\d+)\. (.*)$", re.MULTILINE)
+SEGMENT_FIELD = re.compile(r"^- (\w+): ", re.MULTILINE)
+FANOUT_TEXT = re.compile(r"^Text: (.*)$", re.MULTILINE)
+JOB_DESCRIPTION = re.compile(r'^Job Description: "(.*)"$', re.MULTILINE | re.DOTALL)
+
+FILLER = (
+    "We are looking for a reliable team member to help with daily operations, "
+    "keep the workspace clean and safe, and give every customer a great experience. "
+)
+
+
+class SimulatedResponse:
+    """Just enough of an HTTP response for model.upstream_status and upstream_retry_after"""
+    def __init__(self, status_code: int, retry_after: float | None = None):
+        self.status_code = status_code
+        self.headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+
+
+class SimulatedApiError(Exception):
+    """Raised like ibm_watsonx_ai's ApiRequestFailure, with a .response carrying the status"""
+    def __init__(self, status_code: int, retry_after: float | None = None):
+        self.response = SimulatedResponse(status_code, retry_after)
+        super().__init__(f"Failure during generate. Status code: {status_code}")
+
+
+class SimulatedModelInference:
+    """Stand-in for ibm_watsonx_ai ModelInference with tunable latency and failures.
+
+    latency_median / latency_sigma: lognormal time to first token, in seconds
+    tokens_per_second: generation speed after the first token (4 characters per token)
+    rate_limit_rate / server_error_rate: chance of a 429 / 503 for any call
+    quota_rps: if set, calls beyond this many per second (bucket of quota_burst) get a 429
+    malformed_rate: chance that segmentation output is fenced, truncated or loosely quoted
+    """
+    def __init__(
+        self,
+        latency_median: float = 0.35,
+        latency_sigma: float = 0.4,
+        tokens_per_second: float = 80.0,
+        rate_limit_rate: float = 0.0,
+        server_error_rate: float = 0.0,
+        quota_rps: float | None = None,
+        quota_burst: float = 4.0,
+        malformed_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.quota_rps = quota_rps
+        self.quota_burst = quota_burst
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.quota_tokens = quota_burst
+        self.quota_updated = time.monotonic()
+        self.lock = Lock()
+        self.counters = {"calls": 0, "rate_limited": 0, "server_errors": 0, "malformed": 0, "output_tokens": 0, "cancelled": 0}
+
+    def _admit(self):
+        """Apply quota and error injection before any output"""
+        with self.lock:
+            self.counters["calls"] += 1
+            if self.quota_rps is not None:
+                now = time.monotonic()
+                self.quota_tokens = min(self.quota_burst, self.quota_tokens + (now - self.quota_updated) * self.quota_rps)
+                self.quota_updated = now
+                if self.quota_tokens < 1:
+                    self.counters["rate_limited"] += 1
+                    raise SimulatedApiError(429, retry_after=(1 - self.quota_tokens) / self.quota_rps)
+                self.quota_tokens -= 1
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                self.counters["rate_limited"] += 1
+                raise SimulatedApiError(429)
+            if roll < self.rate_limit_rate + self.server_error_rate:
+                self.counters["server_errors"] += 1
+                raise SimulatedApiError(503)
+            return self.random.lognormvariate(math.log(self.latency_median), self.latency_sigma)
+
+    def _respond(self, prompt: str) -> str:
+        """Plausible raw model output for one of model.py's prompts"""
+        if prompt.startswith("You are a job description analyzer"):
+            match = JOB_DESCRIPTION.search(prompt)
+            fields = SEGMENT_FIELD.findall(prompt.split("\nJob Description:")[0])
+            return self._segmentation(match.group(1) if match else "", fields)
+        if prompt.startswith("Translate the text into each numbered language"):
+            text = self._translate(FANOUT_TEXT.search(prompt).group(1))
+            body = prompt.split("\nLanguages:\n")[1].split("\nTranslations:")[0]
+            return "\n".join(f"{number}. {language}: {text}" for number, language in BATCH_LINE.findall(body))
+        match = BATCH_TARGET.match(prompt)
+        if match:
+            body = prompt.split("\nTranslations:")[0]
+            return "\n".join(f"{number}. {self._translate(text)}" for number, text in BATCH_LINE.findall(body))
+        match = TRANSLATION_INPUT.search(prompt)
+        text = match.group(1) if match else prompt
+        # Real outputs often echo a label and run on past the first line
+        return f"Translation: {self._translate(text)}\nNote: this is a literal translation."
+
+    def _translate(self, text: str) -> str:
+        return text.upper()
+
+    def _segmentation(self, description: str, fields: list[str]) -> str:
+        words = description.split()
+        segments = {
+            "jobTitle": " ".join(words[:2]).title() or "Team Member",
+            "companyName": " ".join(words[2:4]).title() or "Company",
+            "location": "San Jose, CA",
+            "salaryRange": "$25/hr",
+            "workSchedule": "Monday to Friday",
+            "contactInfo": "",
+            "description": FILLER * 2,
+            "qualifications": "Reliable, Friendly, Able to lift 25 lbs",
+        }
+        # Only the fields the prompt asked for, like the real model
+        output = json.dumps({field: value for field, value in segments.items() if not fields or field in fields})
+        with self.lock:
+            malformed = self.random.random() < self.malformed_rate
+            style = self.random.randrange(3)
+            if malformed:
+                self.counters["malformed"] += 1
+        if not malformed:
+            return output
+        if style == 0:
+            return f"Here is the JSON:\n```json\n{output}\n```\nLet me know if you need anything else."
+        if style == 1:
+            return output[:len(output) * 2 // 3]
+        return output.replace('"', "'")[:-1] + ",}"
+
+    def _tokens(self, text: str, params: dict | None) -> tuple[list[str], str]:
+        """Split output into 4-character tokens, cut at the first stop sequence or max_new_tokens; also the stop reason"""
+        params = params or {}
+        stop_reason = "eos_token"
+        ends = [(text.find(stop), stop) for stop in params.get("stop_sequences") or () if stop in text]
+        if ends:
+            end, stop = min(ends)
+            text = text[:end + len(stop)] if params.get("include_stop_sequence", True) else text[:end]
+            stop_reason = "stop_sequence"
+        limit = params.get("max_new_tokens", 1024)
+        tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+        if len(tokens) > limit:
+            tokens = tokens[:limit]
+            stop_reason = "max_tokens"
+        with self.lock:
+            self.counters["output_tokens"] += len(tokens)
+        return tokens, stop_reason
+
+    def _result(self, tokens: list[str], stop_reason: str) -> dict:
+        return {"results": [{"generated_text": "".join(tokens), "generated_token_count": len(tokens), "stop_reason": stop_reason}]}
+
+    def generate(self, prompt=None, params=None, **kwargs) -> dict:
+        first_token = self._admit()
+        tokens, stop_reason = self._tokens(self._respond(prompt), params)
+        time.sleep(first_token + len(tokens) / self.tokens_per_second)
+        return self._result(tokens, stop_reason)
+
+    def generate_text_stream(self, prompt=None, params=None, **kwargs):
+        first_token = self._admit()
+        tokens, _ = self._tokens(self._respond(prompt), params)
+        time.sleep(first_token)
+        for token in tokens:
+            yield token
+            time.sleep(1 / self.tokens_per_second)
+
+    async def agenerate(self, prompt=None, params=None, **kwargs) -> dict:
+        first_token = self._admit()
+        tokens, stop_reason = self._tokens(self._respond(prompt), params)
+        try:
+            await asyncio.sleep(first_token + len(tokens) / self.tokens_per_second)
+        except asyncio.CancelledError:
+            # The caller went away; a real request would be aborted here
+            with self.lock:
+                self.counters["cancelled"] += 1
+            raise
+        return self._result(tokens, stop_reason)
+
+    async def agenerate_stream(self, prompt=None, params=None, **kwargs):
+        """Like the SDK: awaiting it returns an async generator of raw response events"""
+        first_token = self._admit()
+        tokens, _ = self._tokens(self._respond(prompt), params)
+
+        async def events():
+            await asyncio.sleep(first_token)
+            for token in tokens:
+                yield {"results": [{"generated_text": token}]}
+                await asyncio.sleep(1 / self.tokens_per_second)
+
+        return events()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return dict(self.counters)
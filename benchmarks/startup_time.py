@@ -0,0 +1,110 @@
+"""Startup benchmark: how long until a fresh replica can take traffic.
+
+Each run starts the service in a new uvicorn process and reports:
+  import_s  time to import model.py in a fresh interpreter
+  ready_s   time from spawning the server to the first 200 from /health/ready
+  live_s    time to the first 200 from /health/live
+
+Dummy IBM credentials are set by default, so the run also shows that readiness
+does not wait for the WatsonX client (which can't log in with them and keeps
+retrying in the background). Exits with 1 if the median ready_s is above
+--max-ready.
+
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --runs 10 --max-ready 1.0
+    python benchmarks/startup_time.py --no-credentials
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    """Seconds to import model.py, measured inside a fresh interpreter"""
+    code = "import time; started = time.perf_counter(); import model; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def wait_for(client: httpx.Client, url: str, started: float, timeout: float, process: subprocess.Popen) -> float:
+    """Poll url until it answers 200; seconds since started"""
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def measure_server(env: dict, timeout: float) -> tuple[float, float]:
+    """Start a server process and time liveness and readiness"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "model:app", "--app-dir", ROOT, "--port", str(port), "--log-level", "error"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            live = wait_for(client, f"http://127.0.0.1:{port}/health/live", started, timeout, process)
+            ready = wait_for(client, f"http://127.0.0.1:{port}/health/ready", started, timeout, process)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return live, ready
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time how long a fresh AI service process takes to accept traffic.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="give up on a run after this many seconds")
+    parser.add_argument("--max-ready", type=float, default=None, help="fail if the median ready_s is above this")
+    parser.add_argument("--no-credentials", action="store_true", help="start without WatsonX configured")
+    args = parser.parse_args()
+
+    env = dict(os.environ, TRANSLATION_CACHE_DB="", SHARED_STATE_FILE="", READY_REQUIRES_MODEL="0")
+    if args.no_credentials:
+        env["VITE_IBM_API_KEY"] = ""
+        env["VITE_IBM_PROJECT_ID"] = ""
+    else:
+        env.setdefault("VITE_IBM_API_KEY", "startup-benchmark")
+        env.setdefault("VITE_IBM_PROJECT_ID", "startup-benchmark")
+
+    runs = {"import_s": [], "live_s": [], "ready_s": []}
+    for i in range(args.runs):
+        runs["import_s"].append(measure_import(env))
+        live, ready = measure_server(env, args.timeout)
+        runs["live_s"].append(live)
+        runs["ready_s"].append(ready)
+        print(f"run {i + 1}: import {runs['import_s'][-1]:.3f}s  live {live:.3f}s  ready {ready:.3f}s", file=sys.stderr)
+
+    print(f"{'metric':<10}{'median':>10}{'min':>10}{'max':>10}")
+    for name, values in runs.items():
+        print(f"{name:<10}{statistics.median(values):>10.3f}{min(values):>10.3f}{max(values):>10.3f}")
+
+    if args.max_ready is not None and statistics.median(runs["ready_s"]) > args.max_ready:
+        print(f"REGRESSION ready_s median above {args.max_ready}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
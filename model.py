@@ -1,103 +1,2488 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 import os
 from dotenv import load_dotenv
-from ibm_watsonx_ai import APIClient
-from ibm_watsonx_ai import Credentials
-from ibm_watsonx_ai.foundation_models import ModelInference
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import re
 import time
-from collections import deque
-from threading import Lock
+from threading import Lock, Thread, Event
+from collections import OrderedDict, deque
 import hashlib
+import math
+import random
+import uuid
+import sqlite3
+import mmap
+import struct
 import requests
+import httpx
+import bisect
 import json
+import logging
 from typing import Optional
 
+try:
+    import fcntl
+except ImportError:  # Windows has no flock, so state stays per process
+    fcntl = None
+
 # Load environment variables
 load_dotenv()
 
+# Logging: leveled and structured; chatty per-request events are sampled
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Fraction of per-request debug events (prompts, raw responses) that are actually written
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger("ai_service")
+# Only this service's logger follows LOG_LEVEL, so DEBUG doesn't turn on every library's debug output
+logger.setLevel(LOG_LEVEL)
+
+def log_event(level: int, event: str, sample: float = 1.0, **fields):
+    """Log one event as a JSON object; sample < 1 keeps only that fraction"""
+    if not logger.isEnabledFor(level) or (sample < 1.0 and random.random() >= sample):
+        return
+    logger.log(level, json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
+
+# Metrics in the Prometheus text format, served on /metrics
+class Metric:
+    """Base for labelled metrics; values are keyed by the sorted label items"""
+    kind = "untyped"
+    
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.lock = Lock()
+    
+    @staticmethod
+    def _labels(labels: tuple[tuple[str, str], ...], le: str = "") -> str:
+        parts = [f'{key}="{value}"' for key, value in labels]
+        if le:
+            parts.append(f'le="{le}"')
+        return "{" + ",".join(parts) + "}" if parts else ""
+    
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+    
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+class MetricCounter(Metric):
+    kind = "counter"
+    
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self.values: dict[tuple, float] = {}
+    
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+    
+    def samples(self) -> list[str]:
+        with self.lock:
+            return [f"{self.name}{self._labels(key)} {value:g}" for key, value in sorted(self.values.items())]
+
+class MetricHistogram(Metric):
+    kind = "histogram"
+    # Seconds, from a sub-millisecond cache lookup to a long segmentation
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+    
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = buckets
+        # label key -> (per-bucket counts, sum, count)
+        self.values: dict[tuple, list] = {}
+    
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    def time(self, **labels: str) -> "StageTimer":
+        """Context manager that observes its own duration"""
+        return StageTimer(self, labels)
+    
+    def samples(self) -> list[str]:
+        lines = []
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{self._labels(key, format(bound, 'g'))} {cumulative}")
+                lines.append(f"{self.name}_bucket{self._labels(key, '+Inf')} {count}")
+                lines.append(f"{self.name}_sum{self._labels(key)} {total:.6f}")
+                lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+class MetricGauge(Metric):
+    """Gauge read from the service's own stats when /metrics is scraped"""
+    kind = "gauge"
+    
+    def __init__(self, name: str, help_text: str, read):
+        super().__init__(name, help_text)
+        # read() -> {label tuple: value}
+        self.read = read
+    
+    def samples(self) -> list[str]:
+        return [f"{self.name}{self._labels(key)} {value:g}" for key, value in sorted(self.read().items())]
+
+class StageTimer:
+    __slots__ = ("histogram", "labels", "started")
+    
+    def __init__(self, histogram: MetricHistogram, labels: dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+    
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+# Global metrics
+metrics = MetricsRegistry()
+stage_seconds = metrics.register(MetricHistogram(
+    "ai_stage_seconds",
+    "Time spent per stage: cache_lookup, limiter_wait, executor_queue, upstream_generate, cleanup, json_parse"
+))
+request_seconds = metrics.register(MetricHistogram("ai_http_request_seconds", "HTTP request latency by route and status"))
+tokens_total = metrics.register(MetricCounter("ai_tokens_total", "Model tokens by direction (in = prompt, out = generated)"))
+upstream_errors_total = metrics.register(MetricCounter("ai_upstream_errors_total", "Failed upstream calls by HTTP status (0 = no response)"))
+retries_total = metrics.register(MetricCounter("ai_upstream_retries_total", "Upstream calls retried after a transient failure"))
+fallbacks_total = metrics.register(MetricCounter("ai_fallbacks_total", "Degraded results by kind"))
+cache_lookups_total = metrics.register(MetricCounter("ai_cache_lookups_total", "Translation cache lookups by outcome"))
+disconnects_total = metrics.register(MetricCounter("ai_client_disconnects_total", "Requests whose client went away before the response, by route"))
+token_budget_total = metrics.register(MetricCounter("ai_token_budget_total", "max_new_tokens requested by kind of call"))
+token_budget_used = metrics.register(MetricHistogram(
+    "ai_token_budget_used_ratio", "Generated tokens as a share of max_new_tokens by kind of call",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+))
+token_budget_exhausted_total = metrics.register(MetricCounter("ai_token_budget_exhausted_total", "Calls that stopped at max_new_tokens by kind"))
+rule_fields_total = metrics.register(MetricCounter("ai_segmentation_rule_fields_total", "Job fields filled by the rule-based extractor instead of the model"))
+
 app = FastAPI(title="AI Services API", description="Translation and Job Segmentation services using IBM WatsonX")
 
 # Global model instance (loaded once at startup)
 model_inference = None
 granite_service = None
-executor = ThreadPoolExecutor(max_workers=4)
+
+# Worker count for `python model.py` (uvicorn reads UVICORN_WORKERS and WEB_CONCURRENCY itself)
+UVICORN_WORKERS = int(os.getenv("UVICORN_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1")
+# State shared by all worker processes, however they were started (`uvicorn model:app --workers N` sets no
+# variable); on by default wherever flock is available, empty disables
+SHARED_STATE_FILE = os.getenv(
+    "SHARED_STATE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "shared_state.bin") if fcntl is not None else ""
+)
+
+class SharedState:
+    """A fixed-layout record in a memory-mapped file that every worker process maps.
+    
+    Holds the upstream token buckets (one per backend), the translation
+    cache generation and the pids of the processes serving requests, so N
+    workers on one host spend one rate budget per project, see each other's
+    cache clears and know how many of them share it. Use as a context manager for
+    read-modify-write: it takes a thread lock and an exclusive flock (flock
+    alone doesn't exclude threads sharing the descriptor). Single-field reads
+    need no lock.
+    """
+    # Token bucket slots; slot 0 keeps the original layout, the others follow the generation counter,
+    # and each slot's last rate decrease comes after all of them, then the worker table
+    BUCKET_SLOTS = 16
+    WORKER_SLOTS = 64
+    DECREASED_AT = 32 + 24 * (BUCKET_SLOTS - 1)
+    WORKERS_AT = DECREASED_AT + 8 * BUCKET_SLOTS
+    FIELDS = {
+        "tokens": (0, "d"), "updated": (8, "d"), "rate": (16, "d"), "cache_generation": (24, "q"),
+        **{
+            # Class-body comprehensions only see class names in the first iterable, hence the zip
+            f"{name}{slot}": (offset + 8 * i, "d")
+            for slot, offset in zip(range(1, BUCKET_SLOTS), range(32, 32 + 24 * (BUCKET_SLOTS - 1), 24))
+            for i, name in enumerate(("tokens", "updated", "rate"))
+        },
+        **{
+            f"decreased{slot or ''}": (offset, "d")
+            for slot, offset in enumerate(range(DECREASED_AT, WORKERS_AT, 8))
+        },
+        **{f"worker{slot}": (offset, "q") for slot, offset in enumerate(range(WORKERS_AT, WORKERS_AT + 8 * WORKER_SLOTS, 8))},
+    }
+    SIZE = WORKERS_AT + 8 * WORKER_SLOTS
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.thread_lock = Lock()
+        with self:
+            if os.fstat(self.fd).st_size < self.SIZE:
+                # Zero-filled; rate 0 tells the token bucket to set itself up
+                os.ftruncate(self.fd, self.SIZE)
+            self.map = mmap.mmap(self.fd, self.SIZE)
+    
+    def __enter__(self):
+        self.thread_lock.acquire()
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+    
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.thread_lock.release()
+    
+    def get(self, field: str) -> float | int:
+        offset, fmt = self.FIELDS[field]
+        return struct.unpack_from(fmt, self.map, offset)[0]
+    
+    def set(self, field: str, value: float | int):
+        offset, fmt = self.FIELDS[field]
+        struct.pack_into(fmt, self.map, offset, value)
+    
+    def register_worker(self, pid: int):
+        """Add a serving process to the worker table, dropping ones that have exited"""
+        with self:
+            free = None
+            for slot in range(self.WORKER_SLOTS):
+                other = self.get(f"worker{slot}")
+                if other == pid:
+                    return
+                if other and not pid_alive(other):
+                    self.set(f"worker{slot}", 0)
+                    other = 0
+                if not other and free is None:
+                    free = slot
+            if free is not None:
+                self.set(f"worker{free}", pid)
+    
+    def unregister_worker(self, pid: int):
+        with self:
+            for slot in range(self.WORKER_SLOTS):
+                if self.get(f"worker{slot}") == pid:
+                    self.set(f"worker{slot}", 0)
+    
+    def workers(self) -> int:
+        """Processes in the worker table (at least 1)"""
+        return max(1, sum(1 for slot in range(self.WORKER_SLOTS) if self.get(f"worker{slot}")))
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def open_shared_state(path: str) -> SharedState | None:
+    """Map the shared state file, or fall back to per-process state"""
+    if not path:
+        return None
+    if fcntl is None:
+        log_event(logging.WARNING, "shared_state_unsupported", detail="SHARED_STATE_FILE needs flock; each worker keeps its own rate limit and cache")
+        return None
+    return SharedState(path)
+
+# Global cross-process state (None when disabled or unsupported)
+shared_state = open_shared_state(SHARED_STATE_FILE)
 
 # Translation cache
 class TranslationCache:
-    def __init__(self, max_size: int = 1000):
-        self.cache = {}
+    """LRU translation cache bounded by entry count and by bytes of stored text.
+    
+    Entries can optionally expire after ttl seconds. Hit/miss/eviction counters
+    are kept per language pair for /cache/stats. An optional backing store is
+    read through on memory misses and written behind on sets. With shared
+    state, clearing the memory tier clears it in every worker.
+    """
+    def __init__(self, max_size: int = 1000, max_bytes: int = 8 * 1024 * 1024, ttl: float | None = None, backing: "PersistentTranslationStore | None" = None, shared: SharedState | None = None):
+        # cache_key -> (translation, language pair, expiry timestamp or None, size in bytes)
+        self.cache: OrderedDict[str, tuple[str, str, float | None, int]] = OrderedDict()
         self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.pair_stats: dict[str, dict[str, int]] = {}
+        self.backing = backing
+        self.shared = shared
+        self.generation = shared.get("cache_generation") if shared is not None else 0
         self.lock = Lock()
     
     def _get_cache_key(self, text: str, from_language: str, to_language: str) -> str:
         """Generate a cache key for the translation request"""
-        key_string = f"{text.lower().strip()}:{from_language.lower()}:{to_language.lower()}"
+        # "English", "en" and "english" share entries; registry names key exactly as before
+        key_string = f"{text.lower().strip()}:{normalize_language(from_language)}:{normalize_language(to_language)}"
         return hashlib.md5(key_string.encode()).hexdigest()
     
+    def _pair(self, from_language: str, to_language: str) -> str:
+        return f"{normalize_language(from_language)}->{normalize_language(to_language)}"
+    
+    def _stats_for(self, pair: str) -> dict[str, int]:
+        stats = self.pair_stats.get(pair)
+        if stats is None:
+            # Language names come from clients, so cap how many pairs get their own counters
+            if len(self.pair_stats) >= MAX_TRACKED_LANGUAGE_PAIRS:
+                pair = "other"
+            stats = self.pair_stats.setdefault(pair, {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "bytes": 0})
+        return stats
+    
+    def _remove(self, cache_key: str) -> tuple[str, str, float | None, int]:
+        entry = self.cache.pop(cache_key)
+        self.bytes -= entry[3]
+        self._stats_for(entry[1])["bytes"] -= entry[3]
+        return entry
+    
+    def _sync_generation(self):
+        """Drop the memory tier if another worker cleared the cache"""
+        generation = self.shared.get("cache_generation")
+        if generation != self.generation:
+            with self.lock:
+                self._clear_memory()
+                self.generation = generation
+    
     def get(self, text: str, from_language: str, to_language: str) -> str | None:
-        """Get cached translation if available"""
+        """Get cached translation if available, reading through to the disk tier on a memory miss"""
+        with stage_seconds.time(stage="cache_lookup"):
+            return self._lookup(text, from_language, to_language)
+    
+    def _lookup(self, text: str, from_language: str, to_language: str) -> str | None:
+        if self.shared is not None:
+            self._sync_generation()
+        cache_key = self._get_cache_key(text, from_language, to_language)
+        pair = self._pair(from_language, to_language)
+        with self.lock:
+            stats = self._stats_for(pair)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                translation, _, expires_at, _ = entry
+                if expires_at is None or expires_at > time.time():
+                    # Mark as most recently used
+                    self.cache.move_to_end(cache_key)
+                    stats["hits"] += 1
+                    cache_lookups_total.inc(outcome="hit")
+                    return translation
+                self._remove(cache_key)
+                stats["expirations"] += 1
+                cache_lookups_total.inc(outcome="expired")
+            
+            if self.backing is None:
+                stats["misses"] += 1
+                cache_lookups_total.inc(outcome="miss")
+                return None
+        
+        # Disk lookups happen outside the lock so memory hits never wait on SQLite
+        row = self.backing.get(cache_key)
         with self.lock:
-            cache_key = self._get_cache_key(text, from_language, to_language)
-            return self.cache.get(cache_key)
+            stats = self._stats_for(pair)
+            if row is None:
+                stats["misses"] += 1
+                cache_lookups_total.inc(outcome="miss")
+                return None
+            translation, expires_at = row
+            self._insert(cache_key, pair, translation, expires_at)
+            stats["hits"] += 1
+            stats["disk_hits"] += 1
+            cache_lookups_total.inc(outcome="disk_hit")
+            return translation
+    
+    def _insert(self, cache_key: str, pair: str, translation: str, expires_at: float | None) -> bool:
+        """Put an entry into the memory tier; caller holds the lock"""
+        size = len(cache_key) + len(translation.encode())
+        
+        # Don't let a single pasted wall of text flush the whole cache
+        if size > self.max_bytes // 16:
+            return False
+        
+        if cache_key in self.cache:
+            self._remove(cache_key)
+        
+        # Evict least recently used entries until the new one fits
+        while self.cache and (len(self.cache) >= self.max_size or self.bytes + size > self.max_bytes):
+            _, evicted_pair, _, _ = self._remove(next(iter(self.cache)))
+            self._stats_for(evicted_pair)["evictions"] += 1
+        
+        self.cache[cache_key] = (translation, pair, expires_at, size)
+        self.bytes += size
+        self._stats_for(pair)["bytes"] += size
+        return True
     
     def set(self, text: str, from_language: str, to_language: str, translation: str):
-        """Cache a translation"""
+        """Cache a translation in memory and queue it for the disk tier"""
+        cache_key = self._get_cache_key(text, from_language, to_language)
+        pair = self._pair(from_language, to_language)
+        expires_at = time.time() + self.ttl if self.ttl else None
         with self.lock:
-            cache_key = self._get_cache_key(text, from_language, to_language)
-            
-            # If cache is full, remove oldest entry (simple FIFO)
-            if len(self.cache) >= self.max_size:
-                # Remove first item (oldest)
-                self.cache.pop(next(iter(self.cache)))
-            
-            self.cache[cache_key] = translation
+            self._insert(cache_key, pair, translation, expires_at)
+        if self.backing is not None:
+            self.backing.put(cache_key, pair, translation, expires_at)
     
-    def clear(self):
-        """Clear the cache"""
+    def warm(self, limit: int):
+        """Load the most recently used disk entries into memory"""
+        if self.backing is None:
+            return 0
+        rows = self.backing.recent(limit)
         with self.lock:
-            self.cache.clear()
+            # Oldest first so the most recent end up at the hot end of the LRU
+            for cache_key, pair, translation, expires_at in reversed(rows):
+                if cache_key not in self.cache:
+                    self._insert(cache_key, pair, translation, expires_at)
+        return len(rows)
+    
+    def clear(self, tier: str = "all"):
+        """Clear the memory tier, the disk tier, or both"""
+        if tier in ("memory", "all"):
+            with self.lock:
+                self._clear_memory()
+            if self.shared is not None:
+                with self.shared:
+                    self.generation = self.shared.get("cache_generation") + 1
+                    self.shared.set("cache_generation", self.generation)
+        if tier in ("disk", "all") and self.backing is not None:
+            self.backing.clear()
+    
+    def _clear_memory(self):
+        """Empty the memory tier; caller holds the lock"""
+        self.cache.clear()
+        self.bytes = 0
+        for stats in self.pair_stats.values():
+            stats["bytes"] = 0
     
     def size(self) -> int:
         """Get current cache size"""
         with self.lock:
             return len(self.cache)
+    
+    def stats(self) -> dict:
+        """Get totals and per language pair counters"""
+        with self.lock:
+            pairs = {pair: dict(stats) for pair, stats in self.pair_stats.items()}
+            entries = len(self.cache)
+            size_bytes = self.bytes
+        
+        totals = {name: sum(stats[name] for stats in pairs.values()) for name in ("hits", "disk_hits", "misses", "evictions", "expirations")}
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            "cache_size": entries,
+            "max_size": self.max_size,
+            "bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            **totals,
+            "hit_rate": round(totals["hits"] / lookups, 4) if lookups else 0.0,
+            "pairs": pairs,
+            "disk": self.backing.stats() if self.backing is not None else None
+        }
+
+# Persistent second tier for the translation cache
+class PersistentTranslationStore:
+    """SQLite (WAL mode) store that lets cached translations survive restarts.
+    
+    The database is opened on first use. Writes are queued and flushed by a
+    background thread so request handlers never wait on disk I/O for a set.
+    """
+    def __init__(self, path: str, max_rows: int = 200_000, flush_interval: float = 1.0, compact_interval: float = 3600.0):
+        self.path = path
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.conn: sqlite3.Connection | None = None
+        self.lock = Lock()
+        # cache_key -> (pair, translation, expires_at) waiting to be written
+        self.pending: dict[str, tuple[str, str, float | None]] = {}
+        self.pending_lock = Lock()
+        self.wakeup = Event()
+        self.writer: Thread | None = None
+        self.closed = False
+        self.last_compaction = time.time()
+        self.writes = 0
+        self.errors = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use; caller holds the lock"""
+        if self.conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "cache_key TEXT PRIMARY KEY, pair TEXT NOT NULL, translation TEXT NOT NULL, "
+                "expires_at REAL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS translations_updated_at ON translations (updated_at)")
+            conn.commit()
+            self.conn = conn
+        return self.conn
+    
+    def get(self, cache_key: str) -> tuple[str, float | None] | None:
+        """Look up a translation that is not in memory"""
+        with self.pending_lock:
+            queued = self.pending.get(cache_key)
+        if queued is not None:
+            _, translation, expires_at = queued
+        else:
+            try:
+                with self.lock:
+                    row = self._connect().execute(
+                        "SELECT translation, expires_at FROM translations WHERE cache_key = ?", (cache_key,)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                self.errors += 1
+                log_event(logging.ERROR, "translation_cache_db_read_failed", error=str(e))
+                return None
+            if row is None:
+                return None
+            translation, expires_at = row
+        
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return translation, expires_at
+    
+    def put(self, cache_key: str, pair: str, translation: str, expires_at: float | None):
+        """Queue a translation to be written by the background thread"""
+        if self.closed:
+            return
+        with self.pending_lock:
+            self.pending[cache_key] = (pair, translation, expires_at)
+            if self.writer is None:
+                self.writer = Thread(target=self._write_loop, name="translation-cache-writer", daemon=True)
+                self.writer.start()
+    
+    def recent(self, limit: int) -> list[tuple[str, str, str, float | None]]:
+        """Get the most recently written entries that haven't expired"""
+        try:
+            with self.lock:
+                return self._connect().execute(
+                    "SELECT cache_key, pair, translation, expires_at FROM translations "
+                    "WHERE expires_at IS NULL OR expires_at > ? ORDER BY updated_at DESC LIMIT ?",
+                    (time.time(), limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            self.errors += 1
+            log_event(logging.ERROR, "translation_cache_db_warm_up_failed", error=str(e))
+            return []
+    
+    def flush(self):
+        """Write all queued translations in one transaction"""
+        with self.pending_lock:
+            batch, self.pending = self.pending, {}
+        if not batch:
+            return
+        now = time.time()
+        try:
+            with self.lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO translations (cache_key, pair, translation, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [(cache_key, pair, translation, expires_at, now) for cache_key, (pair, translation, expires_at) in batch.items()]
+                )
+                conn.commit()
+            self.writes += len(batch)
+        except sqlite3.Error as e:
+            self.errors += 1
+            log_event(logging.ERROR, "translation_cache_db_write_failed", error=str(e))
+    
+    def compact(self):
+        """Drop expired rows, trim to max_rows by age and checkpoint the WAL"""
+        try:
+            with self.lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM translations WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+                conn.execute(
+                    "DELETE FROM translations WHERE cache_key IN ("
+                    "SELECT cache_key FROM translations ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,)
+                )
+                conn.commit()
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.last_compaction = time.time()
+        except sqlite3.Error as e:
+            self.errors += 1
+            log_event(logging.ERROR, "translation_cache_db_compaction_failed", error=str(e))
+    
+    def _write_loop(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+            if time.time() - self.last_compaction >= self.compact_interval:
+                self.compact()
+    
+    def clear(self):
+        """Delete every stored translation"""
+        with self.pending_lock:
+            self.pending.clear()
+        try:
+            with self.lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM translations")
+                conn.commit()
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            self.errors += 1
+            log_event(logging.ERROR, "translation_cache_db_clear_failed", error=str(e))
+    
+    def close(self):
+        """Flush queued writes and close the database"""
+        self.closed = True
+        self.wakeup.set()
+        self.flush()
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+    
+    def stats(self) -> dict:
+        """Get disk tier statistics"""
+        with self.pending_lock:
+            pending = len(self.pending)
+        rows = None
+        if self.conn is not None:
+            try:
+                with self.lock:
+                    rows = self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return {
+            "path": self.path,
+            "rows": rows,
+            "max_rows": self.max_rows,
+            "pending_writes": pending,
+            "writes": self.writes,
+            "errors": self.errors
+        }
+
+# Language pairs beyond this share one set of counters
+MAX_TRACKED_LANGUAGE_PAIRS = 100
+
+# Disk tier location; set TRANSLATION_CACHE_DB to an empty string to keep the cache in memory only
+TRANSLATION_CACHE_DB = os.getenv("TRANSLATION_CACHE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_cache.db"))
+TRANSLATION_CACHE_WARM_ENTRIES = int(os.getenv("TRANSLATION_CACHE_WARM_ENTRIES", "2000"))
 
 # Global translation cache
-translation_cache = TranslationCache(max_size=1000)
-
-# Rate limiting for IBM WatsonX AI (2 requests per second)
-class RateLimiter:
-    def __init__(self, max_requests: int = 2, time_window: float = 1.0):
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = deque()
+translation_cache = TranslationCache(
+    max_size=int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "10000")),
+    max_bytes=int(os.getenv("TRANSLATION_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    ttl=float(os.getenv("TRANSLATION_CACHE_TTL", "0")) or None,
+    backing=PersistentTranslationStore(
+        TRANSLATION_CACHE_DB,
+        max_rows=int(os.getenv("TRANSLATION_CACHE_DB_MAX_ROWS", "200000")),
+        # Other workers see a new translation once it is flushed, so flush sooner when there are several
+        flush_interval=float(os.getenv("TRANSLATION_CACHE_FLUSH_INTERVAL", "0.2" if shared_state is not None else "1.0"))
+    ) if TRANSLATION_CACHE_DB else None,
+    shared=shared_state
+)
+
+# Upstream request rate: starting point and bounds for the adaptive controller (requests per second)
+WATSONX_RATE = float(os.getenv("WATSONX_RATE", "2"))
+WATSONX_MIN_RATE = float(os.getenv("WATSONX_MIN_RATE", "0.25"))
+WATSONX_MAX_RATE = float(os.getenv("WATSONX_MAX_RATE", "8"))
+# Await upstream calls on the event loop when the client supports it (0 = always use executor threads)
+WATSONX_ASYNC = os.getenv("WATSONX_ASYNC", "1") == "1"
+# Connections in each backend's async keep-alive pool (calls beyond this wait for a free one)
+WATSONX_MAX_CONNECTIONS = int(os.getenv("WATSONX_MAX_CONNECTIONS", "64"))
+
+# Rate limiting for IBM WatsonX AI
+class TokenBucket:
+    """Token bucket shared by the event loop and executor threads.
+
+    Each caller reserves a token up front and is told exactly how long to wait
+    for it, so waiters sleep once and wake in FIFO order instead of polling.
+    """
+    def __init__(self, rate: float = 2.0, capacity: float = 2.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # When the rate was last cut, so concurrent reports of one overload only cut it once
+        self.decreased = 0.0
         self.lock = Lock()
     
-    def can_make_request(self) -> bool:
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def reserve(self) -> float:
+        """Take a token and return the delay before it may be used"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            # Tokens below zero are owed to earlier waiters
+            return -self.tokens / self.rate
+    
+    def refund(self):
+        """Give back a reserved token that was never used"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + 1)
+    
+    async def acquire(self):
+        """Wait for a token without blocking the event loop"""
+        delay = self.reserve()
+        if delay <= 0:
+            return
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.refund()
+            raise
+    
+    def acquire_sync(self):
+        """Blocking variant for executor threads and scripts"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+    
+    def set_rate(self, rate: float):
+        """Change the refill rate; tokens already earned are kept"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+    
+    def increase_rate(self, step: float, max_rate: float):
+        """Additive increase: add step/rate to the rate, up to max_rate"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = min(max_rate, self.rate + step / (self.rate * self.sharers()))
+    
+    def sharers(self) -> int:
+        """Processes adapting this bucket's rate"""
+        return 1
+    
+    def decrease_rate(self, factor: float, min_rate: float, interval: float) -> bool:
+        """Multiplicative decrease, unless the rate was already cut in the last interval seconds"""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.decreased < interval:
+                return False
+            self._refill(now)
+            self.decreased = now
+            self.rate = max(min_rate, self.rate * factor)
+            return True
+    
+    def available(self) -> float:
+        """Tokens available right now (negative while earlier reservations are still owed)"""
         with self.lock:
-            now = time.time()
-            # Remove old requests outside the time window
-            while self.requests and now - self.requests[0] > self.time_window:
-                self.requests.popleft()
+            self._refill(time.monotonic())
+            return self.tokens
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose tokens, refill time and rate live in one SharedState slot.
+    
+    The base class logic runs unchanged: its lock is the shared state's flock
+    and its fields read and write the mapped record, so every worker draws
+    from, and adapts, one upstream budget.
+    """
+    # Shared state idle this long is from an earlier run; start over from the configured rate
+    STALE_AFTER = 60.0
+    
+    def __init__(self, state: SharedState, rate: float = 2.0, capacity: float = 2.0, slot: int = 0):
+        if slot >= SharedState.BUCKET_SLOTS:
+            raise ValueError(f"SharedState has {SharedState.BUCKET_SLOTS} token bucket slots")
+        self.state = state
+        self.capacity = capacity
+        self.lock = state
+        suffix = str(slot) if slot else ""
+        self.fields = {name: f"{name}{suffix}" for name in ("tokens", "updated", "rate", "decreased")}
+        with state:
+            now = time.monotonic()
+            updated = state.get(self.fields["updated"])
+            # updated > now means the record was written before a reboot
+            if state.get(self.fields["rate"]) <= 0 or updated > now or now - updated > self.STALE_AFTER:
+                state.set(self.fields["rate"], rate)
+                state.set(self.fields["tokens"], capacity)
+                state.set(self.fields["updated"], now)
+                state.set(self.fields["decreased"], 0.0)
+    
+    tokens = property(lambda self: self.state.get(self.fields["tokens"]), lambda self, value: self.state.set(self.fields["tokens"], value))
+    updated = property(lambda self: self.state.get(self.fields["updated"]), lambda self, value: self.state.set(self.fields["updated"], value))
+    rate = property(lambda self: self.state.get(self.fields["rate"]), lambda self, value: self.state.set(self.fields["rate"], value))
+    decreased = property(lambda self: self.state.get(self.fields["decreased"]), lambda self, value: self.state.set(self.fields["decreased"], value))
+    
+    def sharers(self) -> int:
+        return self.state.workers()
+
+class OverloadedError(Exception):
+    """Raised when a request is shed because it can't be served in time"""
+    status_code = 429
+    
+    def __init__(self, retry_after: float, message: str | None = None):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(message or f"Upstream model is overloaded, retry in {self.retry_after}s")
+
+class CircuitOpenError(OverloadedError):
+    """Raised without calling WatsonX while the circuit breaker is open"""
+    status_code = 503
+    
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after, f"Upstream model is unavailable, retry in {max(1, math.ceil(retry_after))}s")
+
+class _Waiter:
+    __slots__ = ("tag", "deadline", "future")
+    
+    def __init__(self, tag: float, deadline: float | None, future: asyncio.Future):
+        self.tag = tag
+        self.deadline = deadline
+        self.future = future
+
+# Priority classes sharing the upstream budget: name -> (weight, default deadline in seconds)
+PRIORITY_CLASSES: dict[str, tuple[float, float | None]] = {
+    "interactive": (8.0, 10.0),   # chat translation, a user is looking at the bubble
+    "ui": (3.0, 120.0),           # job post segmentation from the UI
+    "backfill": (1.0, None),      # bulk jobs, can always wait
+}
+
+class UpstreamScheduler:
+    """Hand out rate-limit tokens to waiting upstream calls by weighted fair queuing.
+    
+    Each priority class has its own FIFO queue. Waiters get a virtual finish tag
+    (start + 1/weight), and whenever the dispatcher gets a token it grants the
+    class head with the smallest tag. A burst of low-priority work therefore
+    only gets its weighted share while interactive requests are waiting. Requests
+    whose estimated wait exceeds their deadline are rejected up front. Tokens
+    come from the backend pool, and each grant carries the lease naming the
+    backend the call should go to.
+    """
+    def __init__(self, limiter: "BackendPool", classes: dict[str, tuple[float, float | None]]):
+        self.limiter = limiter
+        self.weights = {name: weight for name, (weight, _) in classes.items()}
+        self.deadlines = {name: deadline for name, (_, deadline) in classes.items()}
+        self.queues: dict[str, deque[_Waiter]] = {name: deque() for name in classes}
+        self.last_finish = {name: 0.0 for name in classes}
+        self.virtual_time = 0.0
+        self.counters = {name: {"granted": 0, "shed": 0, "expired": 0} for name in classes}
+        self.wakeup: asyncio.Event | None = None
+        self.task: asyncio.Task | None = None
+    
+    def start(self):
+        """Start the dispatcher on the running loop"""
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._dispatch())
+    
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+    
+    def _estimate_wait(self, tag: float) -> float:
+        """Seconds until a waiter with this tag would be granted a token"""
+        ahead = sum(1 for queue in self.queues.values() for waiter in queue if waiter.tag <= tag and not waiter.future.done())
+        return max(0.0, ahead + 1 - self.limiter.available()) / self.limiter.rate
+    
+    async def acquire(self, priority: str = "interactive", deadline: float | None = None):
+        """Wait for a token for one upstream call; deadline is an absolute loop time"""
+        if self.task is None:
+            # Dispatcher not running (scripts, tests): plain FIFO token bucket
+            return await self.limiter.acquire()
+        
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if deadline is None and self.deadlines[priority] is not None:
+            deadline = now + self.deadlines[priority]
+        
+        tag = max(self.last_finish[priority], self.virtual_time) + 1.0 / self.weights[priority]
+        wait = self._estimate_wait(tag)
+        if deadline is not None and now + wait > deadline:
+            self.counters[priority]["shed"] += 1
+            raise OverloadedError(wait)
+        
+        self.last_finish[priority] = tag
+        waiter = _Waiter(tag, deadline, loop.create_future())
+        self.queues[priority].append(waiter)
+        self.wakeup.set()
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller went away
+                self.limiter.refund(waiter.future.result())
+            raise
+    
+    def _next(self) -> tuple[str, _Waiter] | None:
+        """Pop the live waiter with the smallest finish tag"""
+        best = None
+        for name, queue in self.queues.items():
+            # Drop waiters whose callers went away
+            while queue and queue[0].future.done():
+                queue.popleft()
+            if queue and (best is None or queue[0].tag < best[1].tag):
+                best = (name, queue[0])
+        if best is not None:
+            self.queues[best[0]].popleft()
+        return best
+    
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not any(self.queues.values()):
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
             
-            return len(self.requests) < self.max_requests
+            token = await self.limiter.acquire()
+            # Choose only once the token is in hand so late high-priority arrivals go first
+            while True:
+                picked = self._next()
+                if picked is None:
+                    self.limiter.refund(token)
+                    break
+                name, waiter = picked
+                if waiter.deadline is not None and loop.time() > waiter.deadline:
+                    self.counters[name]["expired"] += 1
+                    waiter.future.set_exception(OverloadedError(self._estimate_wait(waiter.tag)))
+                    continue
+                self.virtual_time = waiter.tag
+                self.counters[name]["granted"] += 1
+                waiter.future.set_result(token)
+                break
+    
+    def stats(self) -> dict:
+        return {
+            name: {"waiting": sum(1 for waiter in queue if not waiter.future.done()), **self.counters[name]}
+            for name, queue in self.queues.items()
+        }
+
+# Statuses worth retrying after a backoff (0 = the request never got an HTTP response)
+RETRYABLE_STATUSES = {0, 429, 500, 502, 503, 504, 520}
+# "Status code: 429" from ApiRequestFailure, "Request failed with: ... (429)" from the streaming API
+STATUS_CODE_PATTERN = re.compile(r"status code:?\s*(\d{3})|\((\d{3})\)\s*$", re.IGNORECASE)
+
+def upstream_status(error: Exception) -> int | None:
+    """HTTP status of a failed upstream call, 0 for connection failures, None if unknown"""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status
+    if isinstance(error, (httpx.TransportError, requests.ConnectionError, requests.Timeout, TimeoutError, ConnectionError)):
+        return 0
+    # Errors that were re-wrapped only keep the status in their message
+    error_str = str(error)
+    match = STATUS_CODE_PATTERN.search(error_str)
+    if match:
+        return int(match.group(1) or match.group(2))
+    if "429" in error_str or "rate_limit" in error_str.lower():
+        return 429
+    return None
+
+def upstream_retry_after(error: Exception) -> float | None:
+    """Seconds the upstream asked us to wait, from a Retry-After header"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers.get("Retry-After")) if headers is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def record_token_usage(prompt: str, response):
+    """Count prompt and generated tokens, estimating four characters per token where WatsonX doesn't report them"""
+    results = response.get("results") if isinstance(response, dict) else None
+    if not results:
+        tokens_total.inc(len(prompt) // 4, direction="in")
+        tokens_total.inc(len(str(response)) // 4, direction="out")
+        return
+    for result in results:
+        tokens_in = result.get("input_token_count")
+        tokens_out = result.get("generated_token_count")
+        tokens_total.inc(tokens_in if tokens_in is not None else len(prompt) // 4, direction="in")
+        tokens_total.inc(tokens_out if tokens_out is not None else len(result.get("generated_text", "")) // 4, direction="out")
+
+def timed_upstream_call(func, submitted: float | None, lease: "BackendLease", prompt: str, *args):
+    """Run func(client, prompt, *args) against the leased backend, recording executor queue wait (since submitted), generate time and tokens"""
+    if submitted is not None:
+        stage_seconds.observe(time.perf_counter() - submitted, stage="executor_queue")
+    with stage_seconds.time(stage="upstream_generate"):
+        response = func(lease.backend.client, prompt, *args)
+    record_token_usage(prompt, response)
+    return response
+
+async def atimed_upstream_call(func, lease: "BackendLease", prompt: str, *args):
+    """Await func(async_client, prompt, *args) against the leased backend on the loop, recording generate time and tokens"""
+    with stage_seconds.time(stage="upstream_generate"):
+        response = await func(lease.backend.async_client, prompt, *args)
+    record_token_usage(prompt, response)
+    return response
+
+class AsyncInference:
+    """A client's agenerate/agenerate_stream behind the ModelInference generate/generate_text_stream interface.
+    
+    The same _generate_* helpers build the call for either kind of client; with
+    this one they return a coroutine to await instead of a response, so a
+    pending call holds a coroutine and a pooled keep-alive connection rather
+    than a thread. Cancelling the awaiting task aborts the HTTP request.
+    """
+    __slots__ = ("client",)
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def generate(self, prompt: str, params: dict | None = None):
+        return self.client.agenerate(prompt=prompt, params=params)
+    
+    async def generate_text_stream(self, prompt: str, params: dict | None = None):
+        """Yield generated text chunks; closing the generator closes the HTTP stream"""
+        stream = await self.client.agenerate_stream(prompt=prompt, params=params)
+        try:
+            async for chunk in stream:
+                # The async stream yields raw response events rather than text
+                yield chunk["results"][0]["generated_text"] if isinstance(chunk, dict) else chunk
+        finally:
+            await stream.aclose()
+    
+    async def aclose(self):
+        """Close the client's async keep-alive connections"""
+        close = getattr(self.client, "aclose_persistent_connection", None)
+        if close is not None:
+            await close()
+
+class UpstreamGuard:
+    """Adapt the upstream request rate to what WatsonX accepts and fail fast while it is down.
+
+    The limiter rate follows AIMD: each success adds increase/rate (about
+    `increase` req/s per second of clean traffic) and a 429 or a very slow call
+    halves it, at most once per decrease_interval so one overload episode only
+    counts once. The limiter keeps the time of the last cut, so workers sharing
+    one bucket also cut it once between them, and splits each increase between
+    them so together they grow it at the configured pace. Consecutive 5xx or connection failures open the circuit; while
+    open, calls are rejected without a thread or a token. After the cooldown one
+    trial call is let through, and each failed trial doubles the cooldown.
+    """
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        min_rate: float = 0.25,
+        max_rate: float = 8.0,
+        increase: float = 0.2,
+        decrease: float = 0.5,
+        decrease_interval: float = 2.0,
+        slow_call: float = 20.0,
+        failure_threshold: int = 5,
+        cooldown: float = 5.0,
+        max_cooldown: float = 120.0,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+    ):
+        self.limiter = limiter
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.decrease_interval = decrease_interval
+        self.slow_call = slow_call
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.counters = {"calls": 0, "successes": 0, "rate_limited": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self.lock = Lock()
+
+    def admit(self) -> bool:
+        """Check the breaker before an upstream call; returns True if the call is the half-open trial"""
+        with self.lock:
+            if self.state == "closed":
+                return False
+            now = time.monotonic()
+            remaining = self.opened_at + self.cooldown - now
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            self.counters["rejected"] += 1
+            raise CircuitOpenError(max(remaining, 1.0))
+
+    def can_admit(self) -> bool:
+        """Whether admit() would let a call through now, without claiming the half-open trial"""
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self.opened_at + self.cooldown > time.monotonic():
+                return False
+            return not self.trial_in_flight
+    
+    def retry_in(self) -> float:
+        """Seconds until the breaker lets a trial call through"""
+        with self.lock:
+            if self.state != "open":
+                return 0.0
+            return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+    
+    def release(self, trial: bool):
+        """Hand back an admission whose call never reached WatsonX"""
+        if trial:
+            with self.lock:
+                self.trial_in_flight = False
+
+    def _back_off_rate(self):
+        self.limiter.decrease_rate(self.decrease, self.min_rate, self.decrease_interval)
+
+    def _open(self, now: float):
+        self.state = "open"
+        self.opened_at = now
+        self.trial_in_flight = False
+        self.counters["opened"] += 1
+
+    def succeeded(self, latency: float, trial: bool):
+        """Record a successful upstream call"""
+        with self.lock:
+            now = time.monotonic()
+            self.counters["calls"] += 1
+            self.counters["successes"] += 1
+            self.failures = 0
+            if trial or self.state != "closed":
+                self.state = "closed"
+                self.cooldown = self.base_cooldown
+                self.trial_in_flight = False
+            if latency > self.slow_call:
+                # Answered, but the backend is queueing our requests
+                self._back_off_rate()
+            else:
+                self.limiter.increase_rate(self.increase, self.max_rate)
+
+    def failed(self, status: int | None, latency: float, trial: bool):
+        """Record a failed upstream call"""
+        with self.lock:
+            now = time.monotonic()
+            self.counters["calls"] += 1
+            if status == 429:
+                # Throttled means reachable: slow down, but don't count it towards the breaker
+                self.counters["rate_limited"] += 1
+                self._back_off_rate()
+                if trial:
+                    self.state = "closed"
+                    self.cooldown = self.base_cooldown
+                    self.trial_in_flight = False
+                return
+
+            if status is not None and status < 500 and status != 0:
+                # The request itself was bad; WatsonX is fine
+                if trial:
+                    self.trial_in_flight = False
+                return
+
+            self.counters["failures"] += 1
+            if trial:
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._open(now)
+                return
+            self.failures += 1
+            if self.state == "closed" and self.failures >= self.failure_threshold:
+                self._open(now)
+            if latency > self.slow_call:
+                self._back_off_rate()
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter delay before retry number attempt (0-based), never shorter than a Retry-After hint"""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_cap))
+        return delay
+
+    def stats(self) -> dict:
+        with self.lock:
+            retry_in = self.opened_at + self.cooldown - time.monotonic() if self.state == "open" else 0.0
+            return {
+                "state": self.state,
+                "rate": round(self.limiter.rate, 3),
+                "consecutive_failures": self.failures,
+                "cooldown": self.cooldown,
+                "retry_in": round(max(0.0, retry_in), 1),
+                **self.counters,
+            }
+
+# Upstream backends: one per WatsonX project and region
+class UpstreamBackend:
+    """One WatsonX project: its client, token bucket, guard and observed latency"""
+    def __init__(self, name: str, limiter: TokenBucket, guard: UpstreamGuard, region: str = "", connect=None):
+        self.name = name
+        self.region = region
+        self.limiter = limiter
+        self.guard = guard
+        # connect() -> client with the ModelInference generate/generate_text_stream interface,
+        # and agenerate/agenerate_stream if its calls can be awaited on the loop
+        self.connect = connect
+        self.client = None
+        self.last_error: str | None = None
+        # Leased calls not yet settled (waiting for their token or running)
+        self.in_flight = 0
+        # Smoothed latency of successful calls, None until the first one
+        self.latency: float | None = None
+        # After a 429 or an outage, route elsewhere until then when there is a choice
+        self.avoid_until = 0.0
+    
+    @property
+    def async_client(self) -> AsyncInference | None:
+        """The client's awaitable interface, or None when its calls have to run on executor threads"""
+        if self.client is None or not WATSONX_ASYNC or not hasattr(self.client, "agenerate"):
+            return None
+        return AsyncInference(self.client)
+    
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "region": self.region,
+            "connected": self.client is not None,
+            "async": self.async_client is not None,
+            "last_error": self.last_error,
+            "in_flight": self.in_flight,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "tokens": round(self.limiter.available(), 2),
+            **self.guard.stats(),
+        }
+
+class BackendLease:
+    """A granted upstream call: the backend to send it to and whether it is that backend's half-open trial"""
+    __slots__ = ("backend", "trial")
+    
+    def __init__(self, backend: UpstreamBackend, trial: bool):
+        self.backend = backend
+        self.trial = trial
+
+class BackendPool:
+    """Route upstream calls across several WatsonX projects, each with its own budget.
+    
+    Every backend keeps its own token bucket and guard, so AIMD and the
+    circuit breaker work per project and the pool's capacity is the sum of
+    theirs. A call is leased to the connected backend with the lowest score:
+    least_loaded prefers the shortest wait for its next token plus the calls
+    already leased to it per unit of rate, lowest_latency the shortest token
+    wait plus smoothed call latency. Backends that just returned a 429 or a
+    server error are skipped while any other can take the call, so retries fail
+    over to another project or region.
+    """
+    ROUTING = ("least_loaded", "lowest_latency")
+    
+    def __init__(self, routing: str = "least_loaded", latency_smoothing: float = 0.2, avoid_seconds: float = 2.0):
+        if routing not in self.ROUTING:
+            raise ValueError(f"routing must be one of: {', '.join(self.ROUTING)}")
+        self.routing = routing
+        self.latency_smoothing = latency_smoothing
+        self.avoid_seconds = avoid_seconds
+        self.backends: list[UpstreamBackend] = []
+        self.rejected = 0
+        self.lock = Lock()
+    
+    def add(self, backend: UpstreamBackend) -> UpstreamBackend:
+        self.backends.append(backend)
+        return backend
     
-    def record_request(self):
+    def attach(self, client):
+        """Serve every call from an existing client (tests and benchmarks), replacing the configured backends"""
+        if len(self.backends) != 1:
+            self.backends = [build_backend({"name": "default", "region": "", "rate": WATSONX_RATE, "max_rate": WATSONX_MAX_RATE}, 0)]
+        self.backends[0].client = client
+    
+    def connect(self) -> int:
+        """Connect every backend that isn't yet (blocking); returns how many are still unconnected
+        
+        Raises the last error if no backend is connected afterwards.
+        """
+        error = None
+        for backend in self.backends:
+            if backend.client is not None or backend.connect is None:
+                continue
+            try:
+                backend.client = backend.connect()
+                backend.last_error = None
+                log_event(logging.INFO, "backend_connected", backend=backend.name, region=backend.region)
+            except Exception as e:
+                error = e
+                backend.last_error = str(e)
+                log_event(logging.ERROR, "backend_connect_failed", backend=backend.name, region=backend.region, error=str(e))
+        if not any(backend.client is not None for backend in self.backends):
+            raise error or RuntimeError("No WatsonX backends configured")
+        return sum(1 for backend in self.backends if backend.client is None)
+    
+    async def aclose(self):
+        """Close the async keep-alive connections of every backend"""
+        for backend in self.backends:
+            client = backend.async_client
+            if client is not None:
+                await client.aclose()
+    
+    def _connected(self) -> list[UpstreamBackend]:
+        return [backend for backend in self.backends if backend.client is not None]
+    
+    @property
+    def rate(self) -> float:
+        """Combined request rate of the backends that can take calls"""
+        open_backends = [backend for backend in self._connected() if backend.guard.can_admit()]
+        return sum(backend.limiter.rate for backend in open_backends or self._connected() or self.backends) or WATSONX_MIN_RATE
+    
+    def available(self) -> float:
+        return sum(backend.limiter.available() for backend in self._connected() if backend.guard.can_admit())
+    
+    def retry_in(self) -> float:
+        """Seconds until some backend's breaker lets a call through"""
+        return min((backend.guard.retry_in() for backend in self._connected()), default=1.0)
+    
+    def admit(self):
+        """Fail fast, before queueing for a token, while no backend can take a call"""
+        if not any(backend.guard.can_admit() for backend in self._connected()):
+            with self.lock:
+                self.rejected += 1
+            raise CircuitOpenError(max(self.retry_in(), 1.0))
+    
+    def _score(self, backend: UpstreamBackend) -> float:
+        rate = backend.limiter.rate
+        wait = max(0.0, 1 - backend.limiter.available()) / rate
+        if self.routing == "lowest_latency":
+            return wait + (backend.latency or 0.0)
+        return wait + backend.in_flight / rate
+    
+    def reserve(self) -> tuple[BackendLease, float] | None:
+        """Lease the best backend and take one of its tokens; returns the lease and the delay before using it"""
         with self.lock:
-            self.requests.append(time.time())
+            now = time.monotonic()
+            candidates = sorted(
+                (backend for backend in self._connected() if backend.guard.can_admit()),
+                key=lambda backend: (backend.avoid_until > now, self._score(backend))
+            )
+            for backend in candidates:
+                try:
+                    trial = backend.guard.admit()
+                except CircuitOpenError:
+                    # Another thread took the half-open trial first
+                    continue
+                backend.in_flight += 1
+                return BackendLease(backend, trial), backend.limiter.reserve()
+        return None
+    
+    async def acquire(self) -> BackendLease:
+        """Wait for a token from the best backend without blocking the event loop"""
+        while True:
+            reserved = self.reserve()
+            if reserved is None:
+                # Every backend is open; queued calls wait for the first cooldown to end
+                await asyncio.sleep(min(max(self.retry_in(), 0.05), 1.0))
+                continue
+            lease, delay = reserved
+            if delay > 0:
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    self.refund(lease)
+                    raise
+            return lease
+    
+    def acquire_sync(self) -> BackendLease:
+        """Blocking variant for executor threads and scripts"""
+        reserved = self.reserve()
+        if reserved is None:
+            raise CircuitOpenError(max(self.retry_in(), 1.0))
+        lease, delay = reserved
+        if delay > 0:
+            time.sleep(delay)
+        return lease
+    
+    def refund(self, lease: BackendLease):
+        """Give back a lease whose call was never made, token included"""
+        lease.backend.limiter.refund()
+        self.release(lease)
+    
+    def release(self, lease: BackendLease):
+        """Settle a lease whose outcome is unknown (the caller went away)"""
+        with self.lock:
+            lease.backend.in_flight -= 1
+        lease.backend.guard.release(lease.trial)
+    
+    def succeeded(self, lease: BackendLease, latency: float):
+        backend = lease.backend
+        with self.lock:
+            backend.in_flight -= 1
+            backend.latency = latency if backend.latency is None else backend.latency + self.latency_smoothing * (latency - backend.latency)
+        backend.guard.succeeded(latency, lease.trial)
+    
+    def failed(self, lease: BackendLease, status: int | None, latency: float, retry_after: float | None = None):
+        backend = lease.backend
+        upstream_errors_total.inc(backend=backend.name, status=str(status or 0))
+        with self.lock:
+            backend.in_flight -= 1
+            if status in RETRYABLE_STATUSES:
+                backend.avoid_until = time.monotonic() + max(self.avoid_seconds, retry_after or 0.0)
+        backend.guard.failed(status, latency, lease.trial)
+    
+    def backoff(self, lease: BackendLease, attempt: int, retry_after: float | None = None) -> float:
+        """Delay before retrying a call that failed on lease's backend; none when another backend can take it"""
+        now = time.monotonic()
+        if any(
+            backend is not lease.backend and backend.avoid_until <= now and backend.guard.can_admit()
+            for backend in self._connected()
+        ):
+            return 0.0
+        return lease.backend.guard.backoff(attempt, retry_after)
+    
+    def stats(self) -> dict:
+        return {
+            "routing": self.routing,
+            "rate": round(self.rate, 3),
+            "rejected": self.rejected,
+            "backends": [backend.stats() for backend in self.backends],
+        }
+
+def load_backend_configs() -> list[dict]:
+    """Backend entries from WATSONX_BACKENDS, else the single VITE_IBM_* project
     
-    def wait_if_needed(self):
-        while not self.can_make_request():
-            time.sleep(0.1)  # Wait 100ms before checking again
-        self.record_request()
+    WATSONX_BACKENDS is a JSON list of {"name", "api_key" or "api_key_env",
+    "project_id" or "project_id_env", "region", "rate", "max_rate"}.
+    """
+    raw = os.getenv("WATSONX_BACKENDS", "").strip()
+    if not raw:
+        api_key = os.getenv("VITE_IBM_API_KEY")
+        project_id = os.getenv("VITE_IBM_PROJECT_ID")
+        if not (api_key and project_id):
+            return []
+        raw = json.dumps([{"name": "default", "api_key": api_key, "project_id": project_id, "region": os.getenv("VITE_IBM_REGION", "us-south")}])
+    
+    configs = []
+    for i, entry in enumerate(json.loads(raw)):
+        region = entry.get("region", "us-south")
+        config = {
+            "name": entry.get("name") or f"{region}-{i}",
+            "api_key": entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), ""),
+            "project_id": entry.get("project_id") or os.getenv(entry.get("project_id_env", ""), ""),
+            "region": region,
+            "rate": float(entry.get("rate", WATSONX_RATE)),
+            "max_rate": float(entry.get("max_rate", WATSONX_MAX_RATE)),
+        }
+        if not (config["api_key"] and config["project_id"]):
+            raise ValueError(f"WATSONX_BACKENDS entry {config['name']} needs an API key and a project id")
+        configs.append(config)
+    return configs
+
+def build_backend(config: dict, slot: int) -> UpstreamBackend:
+    """Create a backend's limiter and guard; slot picks its token bucket in the shared state"""
+    limiter = (
+        SharedTokenBucket(shared_state, rate=config["rate"], capacity=2, slot=slot)
+        if shared_state is not None
+        else TokenBucket(rate=config["rate"], capacity=2)
+    )
+    guard = UpstreamGuard(
+        limiter,
+        min_rate=WATSONX_MIN_RATE,
+        max_rate=config["max_rate"],
+        slow_call=float(os.getenv("WATSONX_SLOW_CALL_SECONDS", "20")),
+        failure_threshold=int(os.getenv("WATSONX_BREAKER_FAILURES", "5")),
+        cooldown=float(os.getenv("WATSONX_BREAKER_COOLDOWN", "5")),
+    )
+    connect = None
+    if config.get("api_key"):
+        connect = lambda: connect_watsonx(config["api_key"], config["project_id"], config["region"])
+    return UpstreamBackend(config["name"], limiter, guard, region=config["region"], connect=connect)
+
+# Global backend pool (backends connect in the startup warm-up)
+upstream_pool = BackendPool(routing=os.getenv("WATSONX_ROUTING", "least_loaded"))
+for _slot, _config in enumerate(load_backend_configs()):
+    upstream_pool.add(build_backend(_config, _slot))
+
+# Global upstream scheduler
+upstream_scheduler = UpstreamScheduler(upstream_pool, PRIORITY_CLASSES)
+
+# Translation threads: enough for every backend's calls to be in flight at once
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", str(4 * max(1, len(upstream_pool.backends)))))
+SEGMENTATION_WORKERS = int(os.getenv("SEGMENTATION_WORKERS", "2"))
+executor = ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS)
+# Long segmentation calls get their own threads so they can't starve translations
+segmentation_executor = ThreadPoolExecutor(max_workers=SEGMENTATION_WORKERS)
+# Keep-alive connections per backend; idle ones are kept this long so calls at a few per second reuse them
+WATSONX_KEEPALIVE_SECONDS = float(os.getenv("WATSONX_KEEPALIVE_SECONDS", "30"))
+
+# Coalescing of identical in-flight requests
+class FlightAbandoned(Exception):
+    """Set on a claimed call whose owner went away without a result; whoever waits on it makes the call instead"""
+
+class SingleFlight:
+    """Share one in-flight call between all concurrent callers with the same key.
+    
+    A claimed call whose owner fails hands its error to everyone waiting on
+    it; one whose owner is cancelled (a shed batch, a disconnected stream)
+    makes them run the call themselves instead of failing with it.
+    
+    Only used from the event loop, so no locking is needed.
+    """
+    def __init__(self):
+        self.calls: dict[str, asyncio.Future] = {}
+        # Callers still awaiting each call started by do(); the call is cancelled when the last one is
+        self.waiters: dict[asyncio.Future, int] = {}
+        self.coalesced = 0
+        self.cancelled = 0
+    
+    def _track(self, key: str, future: asyncio.Future):
+        self.calls[key] = future
+        future.add_done_callback(lambda _: self.calls.pop(key, None) if self.calls.get(key) is future else None)
+    
+    async def do(self, key: str, func, *args):
+        """Await func(*args), or the identical call that is already running"""
+        future = self.calls.get(key)
+        if future is None or future.done():
+            future = asyncio.ensure_future(func(*args))
+            self._track(key, future)
+            self.waiters[future] = 0
+            future.add_done_callback(lambda _: self.waiters.pop(future, None))
+        else:
+            self.coalesced += 1
+        if future in self.waiters:
+            self.waiters[future] += 1
+        try:
+            # Shield so one caller disconnecting does not cancel the call for everyone else
+            return await asyncio.shield(future)
+        except FlightAbandoned:
+            pass
+        except asyncio.CancelledError:
+            if not self._lost(future):
+                if future in self.waiters:
+                    self.waiters[future] -= 1
+                    if self.waiters[future] == 0:
+                        # Nobody is left to read the result; stop the upstream call
+                        self.cancelled += 1
+                        future.cancel()
+                raise
+        return await self.do(key, func, *args)
+    
+    def _lost(self, future: asyncio.Future) -> bool:
+        """Whether a CancelledError came from the shared call being cancelled rather than from the caller"""
+        return future.cancelled() and not asyncio.current_task().cancelling()
+    
+    async def wait(self, future: asyncio.Future, key: str, func, *args):
+        """Await a joined call; if its owner went away without a result, run func(*args) through do() instead"""
+        try:
+            return await asyncio.shield(future)
+        except FlightAbandoned:
+            pass
+        except asyncio.CancelledError:
+            if not self._lost(future):
+                raise
+        return await self.do(key, func, *args)
+    
+    def join(self, key: str) -> asyncio.Future | None:
+        """Get the in-flight call for key, if any
+        
+        Joined callers await the future themselves, so do() no longer cancels it when its own callers go away.
+        """
+        future = self.calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            self.waiters.pop(future, None)
+        return future
+    
+    def claim(self, key: str) -> asyncio.Future:
+        """Register the caller as the one computing key; the caller must resolve the returned future, or abandon() it"""
+        future = asyncio.get_running_loop().create_future()
+        self._track(key, future)
+        return future
+    
+    def abandon(self, futures, error: BaseException):
+        """Settle claimed futures their owner stopped computing because of error
+        
+        Waiters get the owner's exception; if the owner was cancelled or closed
+        instead, they get FlightAbandoned and make the call themselves.
+        """
+        for future in futures:
+            if future.done():
+                continue
+            future.set_exception(error if isinstance(error, Exception) else FlightAbandoned())
+            # Nobody may be waiting; don't log the exception as never retrieved
+            future.exception()
+    
+    def in_flight(self) -> int:
+        return len(self.calls)
+
+# Global in-flight request table
+translation_flights = SingleFlight()
+
+def segmentation_key(description: str) -> str:
+    """Generate a key for a job description, ignoring whitespace differences"""
+    return hashlib.md5(" ".join(description.split()).encode()).hexdigest()
+
+# Batch translation limits (per upstream call)
+BATCH_MAX_ITEMS = 20
+BATCH_MAX_CHARS = 2000
+BATCH_MAX_NEW_TOKENS = 1024
+MAX_BATCH_REQUEST_ITEMS = 200
+# Fanout translation limits: target languages per upstream call, and per request
+FANOUT_MAX_TARGETS = 8
+# Output tokens per numbered line besides the translation: "N. " and the newline, plus "Language: " for fanouts
+BATCH_PREFIX_TOKENS = 3
+FANOUT_PREFIX_TOKENS = 6
+MAX_FANOUT_REQUEST_TARGETS = 30
+BATCH_LINE_PATTERN = re.compile(r'^\s*(\d+)\s*[.):]\s*(.*)$')
+
+# Language registry: the names the chat UI sends, mapped to the ISO 639-1 code
+# and any other spellings (including the native name) the model may echo back
+LANGUAGES: dict[str, tuple[str, ...]] = {
+    "english": ("en", "eng"),
+    "spanish": ("es", "español", "espanol", "castellano"),
+    "french": ("fr", "français", "francais"),
+    "german": ("de", "deutsch"),
+    "italian": ("it", "italiano"),
+    "portuguese": ("pt", "português", "portugues"),
+    "russian": ("ru", "русский"),
+    "chinese": ("zh", "mandarin", "中文", "汉语", "漢語"),
+    "japanese": ("ja", "日本語"),
+    "korean": ("ko", "한국어"),
+    "arabic": ("ar", "العربية"),
+    "hindi": ("hi", "हिन्दी", "हिंदी"),
+    "bengali": ("bn", "bangla", "বাংলা"),
+    "urdu": ("ur", "اردو"),
+    "turkish": ("tr", "türkçe", "turkce"),
+    "dutch": ("nl", "nederlands"),
+    "swedish": ("sv", "svenska"),
+    "norwegian": ("no", "norsk"),
+    "danish": ("da", "dansk"),
+    "finnish": ("fi", "suomi"),
+    "polish": ("pl", "polski"),
+    "czech": ("cs", "čeština", "cestina"),
+    "hungarian": ("hu", "magyar"),
+    "greek": ("el", "ελληνικά"),
+    "hebrew": ("he", "עברית"),
+    "thai": ("th", "ไทย"),
+    "vietnamese": ("vi", "tiếng việt", "tieng viet"),
+}
+
+# Any spelling from the registry ("English", "en", "español") -> registry name
+LANGUAGE_ALIASES = {
+    spelling: name
+    for name, aliases in LANGUAGES.items()
+    for spelling in (name, *aliases)
+}
+
+def normalize_language(language: str) -> str:
+    """Registry name for a language name or code; unknown names are just lowercased"""
+    key = language.strip().lower()
+    return LANGUAGE_ALIASES.get(key, key)
+
+# Output cleanup for translations
+class TranslationCleaner:
+    """Strip intro labels, wrapping quotes and trailing lines from raw model output.
+    
+    Everything happens in one precompiled regex match: any run of labels such as
+    "Translation:" or "**Spanish** -" (built from LANGUAGES), then optional quotes,
+    then the first line of text without its closing quotes. A label only counts
+    when a colon, a spaced dash or a line break follows it, since the same words
+    start real sentences ("English teachers needed", "Español es mi idioma").
+    """
+    INTRO_LABELS = (
+        "here is the translation", "the translation is", "translation", "translated",
+        "result", "output", "input",
+    )
+    QUOTES = "\"'“”„«»"
+    
+    def __init__(self, languages: dict[str, tuple[str, ...]]):
+        labels = set(self.INTRO_LABELS)
+        labels.update(languages)
+        # Native names too, but not two-letter codes, which are too likely to be real words to strip at all
+        labels.update(alias for aliases in languages.values() for alias in aliases if len(alias) > 3)
+        # Longest first so "the translation is" wins over "translation"
+        alternation = "|".join(re.escape(label) for label in sorted(labels, key=len, reverse=True))
+        quotes = re.escape(self.QUOTES)
+        # Labels ("Spanish translation"), markdown emphasis around them ("**Translation**:", "**Translation:**"),
+        # then the separator
+        self.prefix_pattern = re.compile(
+            rf'(?:[^\w\n]*(?:{alternation})\b(?:[ \t]+(?:{alternation})\b)*[*_]*[ \t]*(?::|[-–—](?=\s)|\n)[*_]*\s*)*',
+            re.IGNORECASE
+        )
+        # Every lowercase prefix of every label, to tell "Transl" (wait) from "Trabajo" (text) mid-stream
+        self.label_prefixes = {label.lower()[:i] for label in labels for i in range(1, len(label) + 1)}
+        # Whole labels still waiting for their separator ("**Translation**", "English -", "Spanish ")
+        self.label_run = re.compile(rf'(?:(?:{alternation})[*_]*[ \t]*(?:[-–—][*_]*[ \t]*)?)+', re.IGNORECASE)
+        self.pattern = re.compile(
+            rf'{self.prefix_pattern.pattern}[{quotes}]*(?P<text>[^\n]*?)[{quotes}]*\s*(?:\n|$)',
+            re.IGNORECASE
+        )
+    
+    def clean(self, raw_text: str) -> str:
+        """Clean one raw translation"""
+        match = self.pattern.match(raw_text.strip())
+        return match.group("text").strip() if match else ""
+    
+    def stream(self) -> "StreamingTranslationCleaner":
+        """Start cleaning a translation that arrives in pieces"""
+        return StreamingTranslationCleaner(self)
+
+class StreamingTranslationCleaner:
+    """Incremental TranslationCleaner.clean over a token stream.
+    
+    Output is held back only while it could still change: until the leading
+    labels are settled (the buffer might end in "Transl..."), and for trailing
+    quotes and whitespace that clean() would strip. Everything after the first
+    newline is ignored, so the concatenated deltas equal clean() of the full text.
+    """
+    def __init__(self, cleaner: TranslationCleaner):
+        self.cleaner = cleaner
+        self.raw = ""
+        self.start: int | None = None
+        self.emitted = 0
+        self.done = False
+        self.strip_chars = cleaner.QUOTES + " \t\r\f\v"
+    
+    def _find_start(self) -> int | None:
+        """Offset where the translation begins, or None while the labels may still be growing"""
+        offset = len(self.raw) - len(self.raw.lstrip())
+        match = self.cleaner.prefix_pattern.match(self.raw, offset)
+        rest = self.raw[match.end():]
+        if not rest:
+            return None
+        word = rest.lstrip(self.cleaner.QUOTES + " \t\r\f\v")
+        if not word:
+            return None
+        # Leading punctuation may belong to a label ("**Translation**:"), so look past it
+        bare = re.sub(r"^[^\w\n]+", "", word)
+        # Wait while it is all labels so far, possibly ending in the start of another one
+        labels = self.cleaner.label_run.match(bare)
+        partial = bare[labels.end():] if labels else bare
+        if not bare or ("\n" not in word and (not partial or partial.lower() in self.cleaner.label_prefixes)):
+            return None
+        return len(self.raw) - len(word)
+    
+    def feed(self, chunk: str) -> str:
+        """Add raw model output and return the newly settled cleaned text"""
+        if self.done:
+            return ""
+        self.raw += chunk
+        if self.start is None:
+            self.start = self._find_start()
+            if self.start is None:
+                return ""
+            self.emitted = self.start
+        
+        newline = self.raw.find("\n", self.start)
+        if newline >= 0:
+            self.done = True
+            end = newline
+            settled = len(self.raw[self.emitted:end].rstrip(self.strip_chars)) + self.emitted
+        else:
+            settled = len(self.raw.rstrip(self.strip_chars))
+        if settled <= self.emitted:
+            return ""
+        delta = self.raw[self.emitted:settled]
+        self.emitted = settled
+        return delta
+    
+    def finish(self) -> str:
+        """Flush at end of stream and return the complete cleaned translation"""
+        if self.start is None:
+            # The stream ended mid-label; fall back to the one-shot cleaner
+            return self.cleaner.clean(self.raw)
+        self.done = True
+        return self.raw[self.start:self.emitted]
+
+translation_cleaner = TranslationCleaner(LANGUAGES)
+
+# Translation memory: long texts are translated and cached per sentence, multi-line ones per line
+class TranslationMemory:
+    """Split texts into sentence segments that are translated and cached on their own.
+    
+    A long message that shares sentences with earlier ones (greetings,
+    signatures, standard replies) only pays for the new sentences, and no
+    longer runs into max_new_tokens. Texts shorter than min_chars keep their
+    sentences together for context and are only split at line breaks, which
+    the first-line cleanup would otherwise drop. The whitespace between
+    segments, including newlines, is kept verbatim for reassembly.
+    """
+    # Whitespace after sentence-ending punctuation (and closing quotes) before something that isn't lowercase,
+    # any line break, or the point right after CJK punctuation, which takes no space
+    BOUNDARY = re.compile(
+        r"(\s*\n\s*|(?:(?<=[.!?…])|(?<=[.!?…][\"'”’)\]»]))\s+(?=[^\sa-z])|(?<=[。！？])\s*)"
+    )
+    LINE_BREAK = re.compile(r"(\s*\n\s*)")
+    CLAUSE_BREAK = re.compile(r"(?<=[,;:，；、])\s*")
+    WHITESPACE = re.compile(r"\s+")
+    
+    def __init__(self, min_chars: int = 300, max_segment_chars: int = 400):
+        self.min_chars = min_chars
+        self.max_segment_chars = max_segment_chars
+        self.counters = {"texts": 0, "segments": 0, "segment_hits": 0}
+    
+    def _split_long(self, segment: str) -> list[str]:
+        """Break an over-long sentence at clause breaks, else at spaces; returns alternating pieces and separators"""
+        parts: list[str] = []
+        while len(segment) > self.max_segment_chars:
+            window = segment[:self.max_segment_chars]
+            cut = None
+            for pattern in (self.CLAUSE_BREAK, self.WHITESPACE):
+                for match in pattern.finditer(window):
+                    if match.start() > 0 and match.end() < len(segment):
+                        cut = match
+                if cut is not None:
+                    break
+            if cut is None:
+                break
+            parts.extend((segment[:cut.start()], cut.group()))
+            segment = segment[cut.end():]
+        parts.append(segment)
+        return parts
+    
+    def split(self, text: str, boundary: re.Pattern | None = None) -> tuple[list[str], list[str]]:
+        """Split text into segments and the len(segments) + 1 separators around them (sentences unless boundary is given)"""
+        body = text.strip()
+        lead = len(text) - len(text.lstrip())
+        parts: list[str] = []
+        for i, part in enumerate((boundary or self.BOUNDARY).split(body)):
+            parts.extend(self._split_long(part) if i % 2 == 0 else [part])
+        
+        segments: list[str] = []
+        separators = [text[:lead]]
+        # parts alternates segment, separator; empty segments just merge their separators
+        for i, part in enumerate(parts):
+            if i % 2:
+                separators[-1] += part
+            elif part:
+                segments.append(part)
+                separators.append("")
+        separators[-1] += text[lead + len(body):]
+        return segments, separators
+    
+    def plan(self, text: str) -> tuple[list[str], list[str]] | None:
+        """Segments and separators for text, or None if it should be translated whole"""
+        segments, separators = self.split(text, self.BOUNDARY if len(text) >= self.min_chars else self.LINE_BREAK)
+        return (segments, separators) if len(segments) > 1 else None
+    
+    def join(self, translations: list[str], separators: list[str]) -> str:
+        """Reassemble translated segments with the original separators"""
+        return separators[0] + "".join(translation + separator for translation, separator in zip(translations, separators[1:]))
+    
+    def record(self, segments: int, hits: int):
+        self.counters["texts"] += 1
+        self.counters["segments"] += segments
+        self.counters["segment_hits"] += hits
+    
+    def stats(self) -> dict:
+        return dict(self.counters)
+
+# Global translation memory
+translation_memory = TranslationMemory(
+    min_chars=int(os.getenv("TRANSLATION_MEMORY_MIN_CHARS", "300")),
+    max_segment_chars=int(os.getenv("TRANSLATION_MEMORY_MAX_SEGMENT_CHARS", "400"))
+)
+
+# Short samples of everyday chat and job-posting language for the Latin-script languages in LANGUAGES
+LANGUAGE_SAMPLES: dict[str, str] = {
+    "english": (
+        "Hello, thank you for your message. I am interested in the job and I would like to know more about it. "
+        "Are you still looking for someone? What are the hours and where is the restaurant? We need a cook who can "
+        "work on weekends. Please send me your phone number so we can talk about the position this week. "
+        "I have three years of experience and I can start right away. That sounds good, see you tomorrow."
+    ),
+    "spanish": (
+        "Hola, gracias por tu mensaje. Estoy interesado en el trabajo y me gustaría saber más sobre el puesto. "
+        "¿Todavía están buscando a alguien? ¿Cuál es el horario y dónde está el restaurante? Necesitamos un cocinero "
+        "que pueda trabajar los fines de semana. Por favor envíame tu número de teléfono para que podamos hablar "
+        "esta semana. Tengo tres años de experiencia y puedo empezar ahora mismo. Me parece bien, nos vemos mañana."
+    ),
+    "french": (
+        "Bonjour, merci pour votre message. Je suis intéressé par le poste et j'aimerais en savoir plus. "
+        "Est-ce que vous cherchez toujours quelqu'un ? Quels sont les horaires et où se trouve le restaurant ? Nous "
+        "avons besoin d'un cuisinier qui peut travailler le week-end. Envoyez-moi votre numéro de téléphone pour que "
+        "nous puissions parler cette semaine. J'ai trois ans d'expérience et je peux commencer tout de suite. "
+        "C'est parfait, à demain."
+    ),
+    "german": (
+        "Hallo, danke für deine Nachricht. Ich interessiere mich für die Stelle und möchte gerne mehr darüber wissen. "
+        "Suchen Sie noch jemanden? Wie sind die Arbeitszeiten und wo ist das Restaurant? Wir brauchen einen Koch, "
+        "der auch am Wochenende arbeiten kann. Bitte schick mir deine Telefonnummer, damit wir diese Woche sprechen "
+        "können. Ich habe drei Jahre Erfahrung und kann sofort anfangen. Das klingt gut, bis morgen."
+    ),
+    "italian": (
+        "Ciao, grazie per il tuo messaggio. Sono interessato al lavoro e vorrei sapere di più sulla posizione. "
+        "State ancora cercando qualcuno? Qual è l'orario e dove si trova il ristorante? Abbiamo bisogno di un cuoco "
+        "che possa lavorare nel fine settimana. Per favore mandami il tuo numero di telefono così possiamo parlare "
+        "questa settimana. Ho tre anni di esperienza e posso iniziare subito. Va bene, ci vediamo domani."
+    ),
+    "portuguese": (
+        "Olá, obrigado pela sua mensagem. Estou interessado no trabalho e gostaria de saber mais sobre a vaga. "
+        "Vocês ainda estão procurando alguém? Qual é o horário e onde fica o restaurante? Precisamos de um cozinheiro "
+        "que possa trabalhar nos fins de semana. Por favor me envie o seu número de telefone para que possamos "
+        "conversar esta semana. Tenho três anos de experiência e posso começar agora. Está ótimo, até amanhã."
+    ),
+    "turkish": (
+        "Merhaba, mesajınız için teşekkür ederim. Bu işle ilgileniyorum ve pozisyon hakkında daha fazla bilgi "
+        "almak istiyorum. Hala birini arıyor musunuz? Çalışma saatleri nedir ve restoran nerede? Hafta sonları "
+        "çalışabilecek bir aşçıya ihtiyacımız var. Lütfen bu hafta konuşabilmemiz için telefon numaranızı gönderin. "
+        "Üç yıllık deneyimim var ve hemen başlayabilirim. Çok güzel, yarın görüşürüz."
+    ),
+    "dutch": (
+        "Hallo, bedankt voor je bericht. Ik ben geïnteresseerd in de baan en ik wil graag meer weten over de functie. "
+        "Zoeken jullie nog iemand? Wat zijn de werktijden en waar is het restaurant? We hebben een kok nodig die in "
+        "het weekend kan werken. Stuur me alsjeblieft je telefoonnummer zodat we deze week kunnen praten. Ik heb "
+        "drie jaar ervaring en ik kan meteen beginnen. Dat klinkt goed, tot morgen."
+    ),
+    "swedish": (
+        "Hej, tack för ditt meddelande. Jag är intresserad av jobbet och vill gärna veta mer om tjänsten. "
+        "Söker ni fortfarande någon? Vilka är arbetstiderna och var ligger restaurangen? Vi behöver en kock som kan "
+        "jobba på helgerna. Skicka mig ditt telefonnummer så att vi kan prata den här veckan. Jag har tre års "
+        "erfarenhet och kan börja direkt. Det låter bra, vi ses i morgon."
+    ),
+    "norwegian": (
+        "Hei, takk for meldingen din. Jeg er interessert i jobben og vil gjerne vite mer om stillingen. "
+        "Ser dere fortsatt etter noen? Hva er arbeidstidene og hvor ligger restauranten? Vi trenger en kokk som kan "
+        "jobbe i helgene. Vennligst send meg telefonnummeret ditt så vi kan snakke denne uken. Jeg har tre års "
+        "erfaring og kan begynne med en gang. Det høres bra ut, vi sees i morgen."
+    ),
+    "danish": (
+        "Hej, tak for din besked. Jeg er interesseret i jobbet og vil gerne vide mere om stillingen. "
+        "Leder I stadig efter nogen? Hvad er arbejdstiderne, og hvor ligger restauranten? Vi har brug for en kok, "
+        "der kan arbejde i weekenderne. Send mig venligst dit telefonnummer, så vi kan tale sammen i denne uge. "
+        "Jeg har tre års erfaring og kan starte med det samme. Det lyder godt, vi ses i morgen."
+    ),
+    "finnish": (
+        "Hei, kiitos viestistäsi. Olen kiinnostunut työpaikasta ja haluaisin tietää lisää tehtävästä. "
+        "Etsittekö vielä jotakuta? Mitkä ovat työajat ja missä ravintola sijaitsee? Tarvitsemme kokin, joka voi "
+        "tehdä töitä viikonloppuisin. Lähetä minulle puhelinnumerosi, jotta voimme puhua tällä viikolla. Minulla "
+        "on kolmen vuoden kokemus ja voin aloittaa heti. Kuulostaa hyvältä, nähdään huomenna."
+    ),
+    "polish": (
+        "Cześć, dziękuję za wiadomość. Jestem zainteresowany tą pracą i chciałbym dowiedzieć się więcej o stanowisku. "
+        "Czy nadal szukacie kogoś? Jakie są godziny pracy i gdzie jest restauracja? Potrzebujemy kucharza, który "
+        "może pracować w weekendy. Proszę wyślij mi swój numer telefonu, żebyśmy mogli porozmawiać w tym tygodniu. "
+        "Mam trzy lata doświadczenia i mogę zacząć od razu. Brzmi dobrze, do zobaczenia jutro."
+    ),
+    "czech": (
+        "Ahoj, děkuji za vaši zprávu. Mám zájem o tuto práci a rád bych se dozvěděl více o pozici. "
+        "Hledáte ještě někoho? Jaká je pracovní doba a kde je restaurace? Potřebujeme kuchaře, který může pracovat "
+        "o víkendech. Pošlete mi prosím své telefonní číslo, abychom si mohli tento týden promluvit. Mám tři roky "
+        "zkušeností a mohu začít hned. To zní dobře, uvidíme se zítra."
+    ),
+    "hungarian": (
+        "Szia, köszönöm az üzenetedet. Érdekel ez a munka, és szeretnék többet megtudni az állásról. "
+        "Még mindig keresnek valakit? Mi a munkaidő, és hol van az étterem? Olyan szakácsra van szükségünk, aki "
+        "hétvégén is tud dolgozni. Kérlek, küldd el a telefonszámodat, hogy ezen a héten beszélhessünk. Három év "
+        "tapasztalatom van, és azonnal tudok kezdeni. Ez jól hangzik, holnap találkozunk."
+    ),
+    "vietnamese": (
+        "Xin chào, cảm ơn tin nhắn của bạn. Tôi quan tâm đến công việc này và muốn biết thêm về vị trí. "
+        "Các bạn vẫn đang tìm người chứ? Giờ làm việc là mấy giờ và nhà hàng ở đâu? Chúng tôi cần một đầu bếp có "
+        "thể làm việc vào cuối tuần. Vui lòng gửi cho tôi số điện thoại của bạn để chúng ta có thể nói chuyện trong "
+        "tuần này. Tôi có ba năm kinh nghiệm và có thể bắt đầu ngay. Nghe hay đấy, hẹn gặp bạn ngày mai."
+    ),
+}
+
+class LanguageIdentifier:
+    """Offline language identifier for short chat messages.
+    
+    Text written mostly in a non-Latin script (Cyrillic, Hangul, Thai, ...) only
+    gets a guess at the registry language that script belongs to; Ukrainian,
+    Persian and Marathi come back as Russian, Arabic and Hindi. Latin-script
+    text is scored against character trigram profiles built from
+    LANGUAGE_SAMPLES with add-one smoothing; confidence is the per-trigram
+    log-likelihood margin over the runner-up.
+    """
+    SCRIPTS = {
+        "latin": re.compile(r"[A-Za-zÀ-ɏḀ-ỿ]"),
+        "cyrillic": re.compile(r"[Ѐ-ӿ]"),
+        "greek": re.compile(r"[Ͱ-Ͽ]"),
+        "hebrew": re.compile(r"[א-ת]"),
+        "arabic": re.compile(r"[ؠ-يٱ-ۓ]"),
+        "devanagari": re.compile(r"[ऀ-ॿ]"),
+        "bengali": re.compile(r"[ঀ-৿]"),
+        "thai": re.compile(r"[฀-๿]"),
+        "hangul": re.compile(r"[가-힯ᄀ-ᇿ㄰-㆏]"),
+        "kana": re.compile(r"[぀-ヿ]"),
+        "han": re.compile(r"[㐀-䶿一-鿿]"),
+    }
+    SCRIPT_LANGUAGES = {
+        "cyrillic": "russian", "greek": "greek", "hebrew": "hebrew", "arabic": "arabic",
+        "devanagari": "hindi", "bengali": "bengali", "thai": "thai", "hangul": "korean",
+        "kana": "japanese", "han": "chinese",
+    }
+    # Letters Urdu uses and Arabic doesn't
+    URDU_LETTERS = re.compile(r"[ٹڈڑںےھگکی]")
+    WORD = re.compile(r"[^\W\d_]+")
+    
+    def __init__(self, samples: dict[str, str]):
+        counts: dict[str, dict[str, int]] = {language: {} for language in samples}
+        for language, sample in samples.items():
+            for gram in self._trigrams(sample):
+                counts[language][gram] = counts[language].get(gram, 0) + 1
+        vocabulary = len({gram for grams in counts.values() for gram in grams})
+        self.profiles: dict[str, dict[str, float]] = {}
+        self.unseen: dict[str, float] = {}
+        for language, grams in counts.items():
+            total = sum(grams.values()) + vocabulary
+            self.profiles[language] = {gram: math.log((count + 1) / total) for gram, count in grams.items()}
+            self.unseen[language] = math.log(1 / total)
+    
+    def _trigrams(self, text: str) -> list[str]:
+        grams = []
+        for word in self.WORD.findall(text.lower()):
+            padded = f" {word} "
+            grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return grams
+    
+    def letters(self, text: str) -> dict[str, int]:
+        """Letter counts per script"""
+        return {script: len(pattern.findall(text)) for script, pattern in self.SCRIPTS.items()}
+    
+    def detect(self, text: str) -> tuple[str | None, float, bool]:
+        """Most likely registry language, a confidence (script share, or trigram margin for Latin text) and whether it was scored by trigrams"""
+        counts = self.letters(text)
+        total = sum(counts.values())
+        if not total:
+            return None, 0.0, False
+        script = max(counts, key=counts.get)
+        if script != "latin":
+            if counts["kana"] and script in ("han", "kana"):
+                # Japanese mixes kanji with kana; Chinese never uses kana
+                return "japanese", (counts["han"] + counts["kana"]) / total, False
+            language = self.SCRIPT_LANGUAGES[script]
+            if language == "arabic" and self.URDU_LETTERS.search(text):
+                language = "urdu"
+            return language, counts[script] / total, False
+        
+        grams = self._trigrams(text)
+        if not grams:
+            return None, 0.0, False
+        scores = sorted(
+            (sum(profile.get(gram, self.unseen[language]) for gram in grams), language)
+            for language, profile in self.profiles.items()
+        )
+        (best, language), (runner_up, _) = scores[-1], scores[-2]
+        return language, (best - runner_up) / len(grams), True
+
+class TranslationFastPath:
+    """Answer translation requests that can't change the text without calling the model.
+    
+    Covers source and target naming the same language ("English" vs "en"),
+    text with nothing to translate (emoji, URLs, emails, numbers, times, code),
+    and text the trigram profiles clearly place in the target language already.
+    """
+    # Tokens that stay as they are in any language
+    UNTRANSLATABLE = re.compile(
+        r"```.*?```|`[^`\n]*`|https?://\S+|www\.\S+|[\w.+-]+@[\w-]+(?:\.[\w-]+)+|@\w+"
+        r"|\d[\d.,:]*\s?(?:am|pm|k|hrs?|h|/hr|/h|/yr)?\b",
+        re.IGNORECASE | re.DOTALL
+    )
+    LETTER = re.compile(r"[^\W\d_]")
+    
+    def __init__(self, identifier: LanguageIdentifier, min_letters: int = 12, min_confidence: float = 0.1):
+        self.identifier = identifier
+        self.min_letters = min_letters
+        self.min_confidence = min_confidence
+        self.counters = {"same_language": 0, "untranslatable": 0, "already_target": 0}
+    
+    def check(self, text: str, from_language: str, to_language: str) -> str | None:
+        """Return text unchanged if translating it is a no-op, else None"""
+        from_language = normalize_language(from_language)
+        to_language = normalize_language(to_language)
+        if from_language == to_language:
+            self.counters["same_language"] += 1
+            return text
+        
+        remainder = self.UNTRANSLATABLE.sub(" ", text)
+        if not self.LETTER.search(remainder):
+            self.counters["untranslatable"] += 1
+            return text
+        
+        # fromLanguage is only a hint from the UI, but only a trigram score that also weighed it can overrule it;
+        # a script guess can't tell Ukrainian from Russian or Persian from Arabic
+        overrulable = not from_language or from_language in self.identifier.profiles
+        if overrulable and to_language in LANGUAGES and sum(self.identifier.letters(remainder).values()) >= self.min_letters:
+            language, confidence, scored = self.identifier.detect(remainder)
+            if scored and language == to_language and confidence >= self.min_confidence:
+                self.counters["already_target"] += 1
+                return text
+        return None
+    
+    def stats(self) -> dict:
+        return dict(self.counters)
+
+# Global pre-model stage
+translation_fast_path = TranslationFastPath(
+    LanguageIdentifier(LANGUAGE_SAMPLES),
+    min_letters=int(os.getenv("LANGUAGE_ID_MIN_LETTERS", "12")),
+    min_confidence=float(os.getenv("LANGUAGE_ID_MIN_CONFIDENCE", "0.1"))
+)
+
+# JSON extraction for segmentation output
+class JSONExtractor:
+    """Find and repair the first JSON object in model output in one left-to-right pass.
+    
+    Copes with surrounding prose and markdown fences, smart and single quotes,
+    unquoted keys and values, unescaped inner quotes and newlines, missing and
+    trailing commas, and objects cut off by max_new_tokens. The scanner only
+    uses anchored, non-backtracking token patterns, so parse time grows
+    linearly with the length of the output.
+    """
+    TOKEN = re.compile(r'\s+|[^\s"\'\\{}\[\],:\u201c\u201d\u2018\u2019]+|.', re.S)
+    # Inside strings only quotes, backslashes and control characters matter
+    STRING_TOKEN = re.compile(r'[^"\'\\\u201c\u201d\u2018\u2019\x00-\x1f]+|.', re.S)
+    NEXT = re.compile(r'\s*(.?)', re.S)
+    BARE_KEY = re.compile(r'[^:,{}\[\]\n"]*')
+    BARE_VALUE = re.compile(r'[^,{}\[\]\n]*')
+    NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+    HEX4 = re.compile(r'[0-9a-fA-F]{4}')
+    LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+    # Opening quote -> characters that may close it
+    QUOTES = {'"': '"', "'": "'", "\u201c": "\u201d\"", "\u201d": "\u201d\"", "\u2018": "\u2019'", "\u2019": "\u2019'"}
+    ESCAPES = str.maketrans({**{chr(i): f"\\u{i:04x}" for i in range(32)}, "\n": "\\n", "\t": "\\t", "\r": "\\r"})
+    MAX_CANDIDATES = 8
+    
+    # Container states
+    KEY, COLON, VALUE, AFTER = range(4)
+    
+    def extract(self, text: str, accept=None) -> dict:
+        """Return the first JSON object in text that accept(obj) allows, repairing it if needed"""
+        start = text.find("{")
+        if start == -1:
+            raise ValueError("No JSON object found in model output")
+        
+        # Fast path: prose or fences around an otherwise valid object
+        end = text.rfind("}")
+        if end > start:
+            try:
+                result = json.loads(text[start:end + 1])
+                if isinstance(result, dict) and (accept is None or accept(result)):
+                    return result
+            except json.JSONDecodeError:
+                pass
+        
+        last_error = None
+        for _ in range(self.MAX_CANDIDATES):
+            repaired, resume = self._scan(text, start)
+            try:
+                result = json.loads(repaired)
+                if isinstance(result, dict) and (accept is None or accept(result)):
+                    return result
+            except json.JSONDecodeError as e:
+                last_error = e
+            # Rejected candidates that closed cleanly are skipped whole, so total work stays linear
+            start = text.find("{", resume if resume > start + 1 else start + 1)
+            if start == -1:
+                break
+        raise ValueError(f"No usable JSON object found in model output{f': {last_error}' if last_error else ''}")
+    
+    def _scan(self, text: str, start: int) -> tuple[str, int]:
+        """Rewrite the object starting at text[start] as valid JSON; also returns where it ended"""
+        out: list[str] = []
+        stack: list[list] = []  # [kind, state] per open container
+        open_counts = {"{": 0, "[": 0}
+        pos = start
+        n = len(text)
+        
+        while pos < n:
+            match = self.TOKEN.match(text, pos)
+            token = match.group()
+            token_start, pos = pos, match.end()
+            ch = token[0]
+            if ch.isspace():
+                continue
+            top = stack[-1] if stack else None
+            
+            if ch in "{[":
+                if top is not None and not self._before_value(out, top, is_string=False):
+                    continue
+                stack.append([ch, self.KEY if ch == "{" else self.VALUE])
+                open_counts[ch] += 1
+                out.append(ch)
+            
+            elif ch in "}]":
+                opener = "{" if ch == "}" else "["
+                if not open_counts[opener]:
+                    continue
+                # Close anything the model forgot to close inside this container
+                while stack[-1][0] != opener:
+                    self._close_top(out, stack, open_counts)
+                self._close_top(out, stack, open_counts)
+                if not stack:
+                    return "".join(out), pos
+            
+            elif top is None:
+                continue
+            
+            elif ch == ",":
+                if top[1] == self.AFTER:
+                    out.append(",")
+                    top[1] = self.KEY if top[0] == "{" else self.VALUE
+            
+            elif ch == ":":
+                if top[0] == "{" and top[1] == self.COLON:
+                    out.append(":")
+                    top[1] = self.VALUE
+            
+            elif ch in self.QUOTES:
+                is_key = self._before_value(out, top, is_string=True)
+                if is_key is None:
+                    continue
+                pos = self._scan_string(text, pos, self.QUOTES[ch], out, is_key, top[0] == "[")
+                top[1] = self.COLON if is_key else self.AFTER
+            
+            elif ch != "\\":
+                # Bare word: an unquoted key, a literal/number, or an unquoted string value
+                is_key = self._before_value(out, top, is_string=True)
+                if is_key is None:
+                    continue
+                if is_key:
+                    bare = self.BARE_KEY.match(text, token_start)
+                    out.append(json.dumps(bare.group().strip()))
+                    top[1] = self.COLON
+                else:
+                    bare = self.BARE_VALUE.match(text, token_start)
+                    value = bare.group().strip()
+                    if value in self.LITERALS:
+                        out.append(self.LITERALS[value])
+                    elif self.NUMBER.fullmatch(value):
+                        out.append(value)
+                    else:
+                        out.append(json.dumps(value))
+                    top[1] = self.AFTER
+                pos = max(pos, bare.end())
+        
+        # Output ended mid-object (e.g. max_new_tokens cutoff): close what is open
+        while stack:
+            self._close_top(out, stack, open_counts)
+        return "".join(out), pos
+    
+    def _before_value(self, out: list[str], top: list, is_string: bool):
+        """Repair missing separators before the next token.
+        
+        For strings/bare words returns True for a key, False for a value, None to skip;
+        for containers returns whether a value may start here.
+        """
+        kind, state = top
+        if kind == "{":
+            if state == self.AFTER:
+                # Missing comma between members
+                out.append(",")
+                top[1] = state = self.KEY
+            if state == self.KEY:
+                return True if is_string else False
+            if state == self.COLON:
+                # Missing colon after a key
+                out.append(":")
+                top[1] = self.VALUE
+            return False if is_string else True
+        if state == self.AFTER:
+            out.append(",")
+            top[1] = self.VALUE
+        return False if is_string else True
+    
+    def _close_top(self, out: list[str], stack: list[list], open_counts: dict[str, int]):
+        kind, state = stack.pop()
+        open_counts[kind] -= 1
+        if kind == "{" and state == self.COLON:
+            out.append(":null")
+        elif kind == "{" and state == self.VALUE:
+            out.append("null")
+        elif out[-1] == ",":
+            # Trailing comma
+            out.pop()
+        out.append("}" if kind == "{" else "]")
+        if stack:
+            stack[-1][1] = self.AFTER
+    
+    def _scan_string(self, text: str, pos: int, closers: str, out: list[str], is_key: bool, in_array: bool) -> int:
+        """Copy a string body as an escaped JSON string; returns the position after it"""
+        pieces = ['"']
+        n = len(text)
+        while pos < n:
+            match = self.STRING_TOKEN.match(text, pos)
+            token = match.group()
+            pos = match.end()
+            ch = token[0]
+            if ch in closers and self._closes_string(text, pos, is_key, in_array):
+                break
+            if ch == "\\":
+                escaped = text[pos:pos + 1]
+                if escaped and escaped in '"\\/bfnrt' or (escaped == "u" and self.HEX4.match(text, pos + 1)):
+                    pieces.append("\\" + escaped)
+                    pos += 1
+                elif escaped in ("'", "\u2019") and escaped:
+                    # \' is not a JSON escape
+                    pieces.append(escaped)
+                    pos += 1
+                else:
+                    pieces.append("\\\\")
+            elif ch == '"':
+                pieces.append('\\"')
+            else:
+                pieces.append(token.translate(self.ESCAPES))
+        pieces.append('"')
+        out.append("".join(pieces))
+        return pos
+    
+    def _closes_string(self, text: str, pos: int, is_key: bool, in_array: bool) -> bool:
+        """Decide whether a quote ends the string or is an unescaped quote inside it"""
+        match = self.NEXT.match(text, pos)
+        following = match.group(1)
+        if not following or following in self.QUOTES or following in "{}[]":
+            return True
+        if is_key:
+            return following == ":"
+        if following != ",":
+            return False
+        # A comma only ends the value if what follows it can start the next member
+        after_comma = self.NEXT.match(text, match.end()).group(1)
+        if not after_comma or after_comma in self.QUOTES or after_comma in "{}[]":
+            return True
+        return in_array and (after_comma.isdigit() or after_comma in "-tfn")
+
+json_extractor = JSONExtractor()
+
+class JobFieldExtractor:
+    """Fill the job fields that follow fixed patterns without asking the model.
+    
+    Salary ("$35/hr", "$18-22 per hour", "$50,000/year"), US city and state,
+    phone, email and contact name, and day/time schedules ("Mon-Fri 9-5") are
+    found with precompiled regexes and normalized to the format the
+    segmentation prompt asks for. Fields that aren't found are left to the model.
+    """
+    AMOUNT = r'\$\s?\d[\d,]*(?:\.\d{1,2})?(?:\s?[kK]\b)?'
+    SALARY = re.compile(
+        rf'(?P<low>{AMOUNT})(?:\s*(?:-|–|to)\s*(?P<high>\$?\s?\d[\d,]*(?:\.\d{{1,2}})?(?:\s?[kK]\b)?))?'
+        r'(?:\s*(?:/|per\b|an?\b)\s*(?P<period>hour|hr|hourly|year|yr|annually|annum|week|wk|month|mo|day)\b|\s+(?P<adverb>hourly|annually|yearly|weekly|monthly|daily)\b)?',
+        re.IGNORECASE
+    )
+    PERIODS = {
+        "hour": "hr", "hr": "hr", "hourly": "hr",
+        "year": "year", "yr": "year", "annually": "year", "annum": "year", "yearly": "year",
+        "week": "week", "wk": "week", "weekly": "week",
+        "month": "month", "mo": "month", "monthly": "month",
+        "day": "day", "daily": "day",
+    }
+    STATES = {
+        "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+        "colorado": "CO", "connecticut": "CT", "delaware": "DE", "florida": "FL", "georgia": "GA",
+        "hawaii": "HI", "idaho": "ID", "illinois": "IL", "indiana": "IN", "iowa": "IA",
+        "kansas": "KS", "kentucky": "KY", "louisiana": "LA", "maine": "ME", "maryland": "MD",
+        "massachusetts": "MA", "michigan": "MI", "minnesota": "MN", "mississippi": "MS", "missouri": "MO",
+        "montana": "MT", "nebraska": "NE", "nevada": "NV", "new hampshire": "NH", "new jersey": "NJ",
+        "new mexico": "NM", "new york": "NY", "north carolina": "NC", "north dakota": "ND", "ohio": "OH",
+        "oklahoma": "OK", "oregon": "OR", "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC",
+        "south dakota": "SD", "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT",
+        "virginia": "VA", "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+        "district of columbia": "DC",
+    }
+    # A state code or name (longest names first)
+    STATE = rf"(?:{'|'.join(sorted(set(STATES.values())))}|{'|'.join(name.title() for name in sorted(STATES, key=len, reverse=True))})"
+    # Up to three capitalized words on one line, a comma, then a state, unless that state is really the city
+    # of a "City, ST" that follows ("Barista, New York, NY" is New York, NY)
+    LOCATION = re.compile(
+        r"\b(?P<city>[A-Z][a-zA-Z.'-]+(?: [A-Z][a-zA-Z.'-]+){0,2}),[ \t]*"
+        rf"(?P<state>{STATE})\b(?!,\s*{STATE}\b)"
+    )
+    # Capitalized words that start a sentence rather than a city name
+    CITY_LEAD_WORDS = {"in", "at", "near", "located", "based", "downtown", "location", "the"}
+    # The start of the first line, up to a comma, dash, pipe or colon: the job title in "Barista, NY" or "Barista - Blue Door Cafe"
+    TITLE = re.compile(r"\s*(?P<title>[^,\n|:–-]+)")
+    EMAIL = re.compile(r'\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b')
+    PHONE = re.compile(r'(?<!\d)(?:\+?1[\s.-]?)?(?:\(\d{3}\)|\d{3})[\s.-]?\d{3}[\s.-]?\d{4}(?!\d)')
+    CONTACT_NAME = re.compile(r'\b(?i:contact|ask for|call|text|email|reach out to)\s+(?P<name>[A-Z][a-z]+(?:\s[A-Z][a-z]+)?)\b')
+    CONTACT_NOT_NAMES = {"us", "me", "now", "today", "our", "the", "for", "at"}
+    DAY = r'(?:mon(?:day)?|tue(?:s(?:day)?)?|wed(?:nesday)?|thu(?:r(?:s(?:day)?)?)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)'
+    TIME = r'\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)?'
+    TIME_RANGE = rf'(?P<start>{TIME})\s*(?:-|–|to|until)\s*(?P<end>{TIME})'
+    DAY_RANGE = re.compile(
+        rf'\b(?P<first>{DAY})\.?\s*(?:-|–|to|through|thru)\s*(?P<last>{DAY})\b\.?(?:,?\s*(?:from\s+)?{TIME_RANGE}(?![\d/]))?',
+        re.IGNORECASE
+    )
+    # A time range on its own needs am/pm on at least one end, so "18-22" in a salary isn't a schedule
+    HOURS = re.compile(
+        rf'(?<![\d$])(?P<start>{TIME})\s*(?:-|–|to|until)\s*(?P<end>{TIME})(?![\d/])',
+        re.IGNORECASE
+    )
+    DAY_NAMES = {
+        "mon": "Monday", "tue": "Tuesday", "wed": "Wednesday", "thu": "Thursday",
+        "fri": "Friday", "sat": "Saturday", "sun": "Sunday",
+    }
+    
+    def _salary(self, description: str) -> str | None:
+        for match in self.SALARY.finditer(description):
+            period = match.group("period") or match.group("adverb")
+            low = re.sub(r'\s', '', match.group("low"))
+            # A bare amount is only a salary when it's clearly annual ("$50,000", "$60k")
+            if period is None and not ("," in low or low[-1] in "kK"):
+                continue
+            amount = low
+            if match.group("high"):
+                high = re.sub(r'\s', '', match.group("high"))
+                amount = f"{low}-{high if high.startswith('$') else '$' + high}"
+            return f"{amount}/{self.PERIODS[period.lower()]}" if period else amount
+        return None
+    
+    def _location(self, description: str) -> str | None:
+        title = self.TITLE.match(description)
+        title = title.group("title").strip().lower() if title else ""
+        for match in self.LOCATION.finditer(description):
+            words = match.group("city").split()
+            while words and words[0].lower() in self.CITY_LEAD_WORDS:
+                words.pop(0)
+            city = " ".join(words)
+            if not city or city.lower() == title:
+                continue
+            state = match.group("state")
+            # A state name is only a city in front of a state code ("New York, NY", "Washington, DC")
+            if city.lower() in self.STATES and state.lower() in self.STATES:
+                continue
+            return f"{city}, {self.STATES.get(state.lower(), state)}"
+        return None
+    
+    def _contact(self, description: str) -> str | None:
+        details = []
+        for pattern in (self.PHONE, self.EMAIL):
+            match = pattern.search(description)
+            if match:
+                details.append(match.group().strip())
+        # A name alone may be a manager mentioned in passing; leave that to the model
+        if not details:
+            return None
+        for match in self.CONTACT_NAME.finditer(description):
+            if match.group("name").split()[0].lower() not in self.CONTACT_NOT_NAMES:
+                return ", ".join([match.group("name"), *details])
+        return ", ".join(details)
+    
+    def _time(self, value: str) -> str:
+        return re.sub(r'\s+', '', value).lower().replace(".", "")
+    
+    def _schedule(self, description: str) -> str | None:
+        match = self.DAY_RANGE.search(description)
+        if match:
+            days = f"{self.DAY_NAMES[match.group('first')[:3].lower()]} to {self.DAY_NAMES[match.group('last')[:3].lower()]}"
+            if match.group("start"):
+                return f"{days}, {self._time(match.group('start'))}-{self._time(match.group('end'))}"
+            return days
+        for match in self.HOURS.finditer(description):
+            start, end = self._time(match.group("start")), self._time(match.group("end"))
+            if start.endswith("m") or end.endswith("m"):
+                return f"{start}-{end}"
+        return None
+    
+    def extract(self, description: str) -> dict[str, str]:
+        """Job fields found in description, by JobSegments field name"""
+        fields = {
+            "salaryRange": self._salary(description),
+            "location": self._location(description),
+            "contactInfo": self._contact(description),
+            "workSchedule": self._schedule(description),
+        }
+        return {field: value for field, value in fields.items() if value}
 
-# Global rate limiter
-rate_limiter = RateLimiter(max_requests=2, time_window=1.0)
+job_field_extractor = JobFieldExtractor()
 
 class TranslationRequest(BaseModel):
     text: str
@@ -112,6 +2497,24 @@ class TranslationResponse(BaseModel):
     toLanguage: str
     cached: bool = False
 
+class BatchTranslationRequest(BaseModel):
+    items: list[TranslationRequest]
+
+class FanoutTranslationRequest(BaseModel):
+    text: str
+    fromLanguage: str
+    toLanguages: list[str]
+
+class FanoutTranslationResponse(BaseModel):
+    success: bool
+    originalText: str
+    fromLanguage: str
+    translations: list[TranslationResponse]
+
+class BatchTranslationResponse(BaseModel):
+    success: bool
+    results: list[TranslationResponse]
+
 # Job Segmentation Models
 class JobSegmentationRequest(BaseModel):
     description: str
@@ -126,335 +2529,1272 @@ class JobSegments(BaseModel):
     description: Optional[str] = None
     qualifications: Optional[str] = None
 
+# Normalized key (lowercase, no separators) -> JobSegments field, including common model renamings
+SEGMENT_FIELD_NAMES = {name.lower(): name for name in JobSegments.model_fields}
+SEGMENT_FIELD_NAMES.update({
+    "title": "jobTitle",
+    "position": "jobTitle",
+    "company": "companyName",
+    "salary": "salaryRange",
+    "pay": "salaryRange",
+    "schedule": "workSchedule",
+    "hours": "workSchedule",
+    "contact": "contactInfo",
+    "jobdescription": "description",
+    "requirements": "qualifications",
+})
+
+# Compact segmentation instructions per JobSegments field, so fields filled by JobFieldExtractor can be left out
+SEGMENTATION_FIELD_PROMPTS = {
+    "jobTitle": 'the job title only, without words like "opportunity" or "position"',
+    "companyName": 'the business name, keeping a leading "The"',
+    "location": '"City, ST", no street address',
+    "salaryRange": 'pay with currency and period, e.g. "$35/hr" or "$50,000/year"',
+    "workSchedule": 'work days and hours, "" if not mentioned',
+    "contactInfo": 'contact person, "" if not mentioned',
+    "description": "2-3 professional sentences on the role and its typical responsibilities (write them if missing)",
+    "qualifications": "comma-separated skills and experience for the role (infer them if missing)",
+}
+# Output token budget: JSON overhead, a fixed share per short field, and room for the free-text
+# fields that grows with the input (base, tokens per input token, cap)
+SEGMENTATION_BASE_TOKENS = 20
+SEGMENTATION_FIELD_TOKENS = {
+    "jobTitle": 24,
+    "companyName": 24,
+    "location": 16,
+    "salaryRange": 20,
+    "workSchedule": 28,
+    "contactInfo": 32,
+}
+SEGMENTATION_TEXT_FIELD_TOKENS = {
+    "description": (80, 1.0, 320),
+    "qualifications": (50, 0.5, 240),
+}
+# No stop sequence: "}" can occur inside string values, so the budget bounds the output and JSONExtractor
+# takes the first object out of whatever follows it
+SEGMENTATION_MAX_NEW_TOKENS = 800
+
+# Translation output stops at the first blank line or appended explanation; the cleaner keeps only the first line anyway
+TRANSLATION_STOP_SEQUENCES = ["\n\n", "\nNote", "\nExplanation", "\nInput:"]
+TRANSLATION_MAX_NEW_TOKENS = 300
+# Per language: characters needed relative to English for the same text, and characters per token
+LANGUAGE_TOKEN_PROFILES = {
+    "english": (1.0, 4.0),
+    "spanish": (1.15, 3.3),
+    "french": (1.2, 3.3),
+    "german": (1.2, 3.2),
+    "italian": (1.15, 3.3),
+    "portuguese": (1.1, 3.3),
+    "russian": (1.1, 2.6),
+    "chinese": (0.3, 1.1),
+    "japanese": (0.4, 1.1),
+    "korean": (0.45, 1.2),
+    "arabic": (0.95, 2.2),
+    "hindi": (1.0, 1.2),
+    "bengali": (1.0, 1.0),
+    "urdu": (1.0, 2.0),
+    "turkish": (1.05, 2.8),
+    "dutch": (1.15, 3.2),
+    "swedish": (1.05, 3.2),
+    "norwegian": (1.05, 3.2),
+    "danish": (1.05, 3.2),
+    "finnish": (1.1, 2.8),
+    "polish": (1.1, 2.7),
+    "czech": (1.05, 2.6),
+    "hungarian": (1.1, 2.7),
+    "greek": (1.1, 2.2),
+    "hebrew": (0.85, 2.2),
+    "thai": (0.95, 1.2),
+    "vietnamese": (1.1, 2.6),
+}
+# Unknown languages get a long, token-hungry profile so they aren't cut off
+DEFAULT_TOKEN_PROFILE = (1.2, 2.0)
+
+# Prompt templates and output budgets
+class PromptBudget:
+    """Size max_new_tokens and stop sequences from the input, and track how much of each budget is used.
+    
+    A translation needs about as many tokens as the input text takes in the
+    target language: its length scaled by how much longer or shorter that
+    language writes it, divided by the characters per token of its script
+    (LANGUAGE_TOKEN_PROFILES). Budgets are that estimate times margin, plus
+    slack for labels and quotes the cleaner strips. Segmentation gets a fixed
+    share per short field and room for the description and qualifications
+    that grows with the input. Compact segmentation templates are built once
+    per set of requested fields.
+    
+    record() counts budgeted and generated tokens per kind of call, and the
+    calls that ran out of budget, so the profiles and margin can be tuned from
+    /health and /metrics.
+    """
+    def __init__(self, margin: float = 1.5, slack: int = 8, min_tokens: int = 16):
+        self.margin = margin
+        self.slack = slack
+        self.min_tokens = min_tokens
+        # Field tuple -> segmentation prompt up to the description
+        self.templates: dict[tuple[str, ...], str] = {}
+        # kind -> calls, budgeted, generated, exhausted (streams record from executor threads)
+        self.counters: dict[str, dict[str, int]] = {}
+        self.lock = Lock()
+    
+    def _profile(self, language: str | None) -> tuple[float, float]:
+        if language is None:
+            return LANGUAGE_TOKEN_PROFILES["english"]
+        return LANGUAGE_TOKEN_PROFILES.get(normalize_language(language), DEFAULT_TOKEN_PROFILE)
+    
+    def output_tokens(self, text: str, from_language: str | None, to_language: str) -> float:
+        """Estimated tokens for text translated into to_language"""
+        source_length, _ = self._profile(from_language)
+        target_length, chars_per_token = self._profile(to_language)
+        return len(text) * target_length / source_length / chars_per_token
+    
+    def translation(self, text: str, from_language: str, to_language: str) -> int:
+        """max_new_tokens for a single translation"""
+        estimate = math.ceil(self.output_tokens(text, from_language, to_language) * self.margin) + self.slack
+        return min(TRANSLATION_MAX_NEW_TOKENS, max(self.min_tokens, estimate))
+    
+    def line(self, text: str, from_language: str | None, to_language: str, prefix_tokens: int) -> int:
+        """Tokens for one numbered output line: the translation after a "N. " style prefix"""
+        return math.ceil(self.output_tokens(text, from_language, to_language) * self.margin) + prefix_tokens
+    
+    def numbered(self, lines: list[int]) -> int:
+        """max_new_tokens for numbered output with the given line budgets"""
+        return min(BATCH_MAX_NEW_TOKENS, max(self.min_tokens, sum(lines) + self.slack))
+    
+    def segmentation(self, description: str, fields: list[str]) -> int:
+        """max_new_tokens for a segmentation asking for the given fields"""
+        input_tokens = len(description) / 4
+        budget = SEGMENTATION_BASE_TOKENS
+        for field in fields:
+            if field in SEGMENTATION_TEXT_FIELD_TOKENS:
+                base, per_input_token, cap = SEGMENTATION_TEXT_FIELD_TOKENS[field]
+                budget += min(cap, base + math.ceil(input_tokens * per_input_token))
+            else:
+                budget += SEGMENTATION_FIELD_TOKENS[field]
+        return min(SEGMENTATION_MAX_NEW_TOKENS, budget)
+    
+    def segmentation_prompt(self, description: str, fields: list[str]) -> str:
+        """Compact segmentation prompt asking only for fields"""
+        key = tuple(fields)
+        template = self.templates.get(key)
+        if template is None:
+            field_lines = "\n".join(f"- {field}: {SEGMENTATION_FIELD_PROMPTS[field]}" for field in fields)
+            template = self.templates[key] = (
+                "You are a job description analyzer. Return only a JSON object with these keys, "
+                "no other text or markdown:\n"
+                f"{field_lines}\n\n"
+            )
+        return f'{template}Job Description: "{description}"\n\nJSON:'
+    
+    def record(self, kind: str, budget: int, response) -> bool:
+        """Count one call's budget against what it generated (a response, or a token count for streams); True if it ran out"""
+        stop_reason = None
+        result = (response.get("results") or [None])[0] if isinstance(response, dict) else None
+        if isinstance(response, int):
+            generated = response
+        elif result is not None:
+            generated = result.get("generated_token_count")
+            if generated is None:
+                generated = len(result.get("generated_text", "")) // 4
+            stop_reason = result.get("stop_reason")
+        else:
+            generated = len(str(response)) // 4
+        exhausted = stop_reason == "max_tokens" if stop_reason is not None else generated >= budget
+        with self.lock:
+            counters = self.counters.setdefault(kind, {"calls": 0, "budgeted": 0, "generated": 0, "exhausted": 0})
+            counters["calls"] += 1
+            counters["budgeted"] += budget
+            counters["generated"] += generated
+            counters["exhausted"] += exhausted
+        token_budget_total.inc(budget, kind=kind)
+        token_budget_used.observe(generated / budget if budget else 0.0, kind=kind)
+        if exhausted:
+            token_budget_exhausted_total.inc(kind=kind)
+        return exhausted
+    
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                kind: {
+                    **counters,
+                    "used": round(counters["generated"] / counters["budgeted"], 3) if counters["budgeted"] else None,
+                }
+                for kind, counters in self.counters.items()
+            }
+
+# Global prompt and token budget planner
+prompt_budget = PromptBudget(
+    margin=float(os.getenv("TOKEN_BUDGET_MARGIN", "1.5")),
+    slack=int(os.getenv("TOKEN_BUDGET_SLACK", "8"))
+)
+
+class SegmentationParseError(Exception):
+    """Model output that couldn't be turned into JobSegments (raised instead of returning placeholders)"""
+
+# MinHash hash functions (a * x + b) mod a Mersenne prime, seeded so every process agrees
+MINHASH_PRIME = (1 << 61) - 1
+_minhash_random = random.Random(1729)
+MINHASH_COEFFICIENTS = [(_minhash_random.randrange(1, MINHASH_PRIME), _minhash_random.randrange(MINHASH_PRIME)) for _ in range(64)]
+
+class SegmentationCache:
+    """LRU cache of segmentation results with two fallbacks for re-posted ads.
+    
+    Exact hits are keyed by the description with whitespace normalized. On a
+    miss, the description's template (lowercased, with emails, URLs, phone
+    numbers, dates, times and amounts masked) finds an earlier posting that
+    differs only in those; its segments are reused with the changed values
+    substituted. Failing that, a MinHash signature over word 3-shingles finds
+    lightly edited postings whose estimated Jaccard similarity is at least
+    min_similarity. Signatures are indexed in LSH bands, so a lookup only
+    compares the few postings that share a band. Both kinds of reuse refresh
+    the fields JobFieldExtractor can read from the new description.
+    
+    Only used from the event loop, so no locking is needed.
+    """
+    VOLATILE = re.compile(
+        r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+'
+        r'|https?://\S+|www\.\S+'
+        r'|(?:\+?1[\s.-]?)?(?:\(\d{3}\)|\d{3})[\s.-]?\d{3}[\s.-]?\d{4}'
+        r'|\d{1,4}[/.-]\d{1,2}[/.-]\d{1,4}'
+        r'|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{1,2}(?:st|nd|rd|th)?(?:,?\s+\d{4})?\b'
+        r'|\d{1,2}(?::\d{2})?\s?[ap]\.?m\.?(?!\w)'
+        r'|\$\s?\d[\d,]*(?:\.\d+)?(?:[kK]\b)?',
+        re.IGNORECASE
+    )
+    WORD = re.compile(r'\w+')
+    # 64 hash functions in 16 bands of 4: postings at 0.75 similarity share a band with probability > 0.99
+    PERMUTATIONS = len(MINHASH_COEFFICIENTS)
+    BAND_ROWS = 4
+    # With fewer shingles a single edit changes too large a share of them to tell postings apart
+    MIN_SHINGLES = 8
+    
+    def __init__(self, max_size: int = 2000, ttl: float | None = None, min_similarity: float = 0.75):
+        # key -> (segments, masked values in order, template key, MinHash signature or None, expiry timestamp or None)
+        self.entries: OrderedDict[str, tuple[JobSegments, list[str], str, tuple[int, ...] | None, float | None]] = OrderedDict()
+        self.max_size = max_size
+        self.ttl = ttl
+        # 0 turns near-duplicate matching off
+        self.min_similarity = min_similarity
+        self.templates: dict[str, str] = {}
+        # (band number, band of the signature) -> keys
+        self.bands: dict[tuple[int, tuple[int, ...]], set[str]] = {}
+        self.counters = {"hits": 0, "template_hits": 0, "near_hits": 0, "misses": 0, "expirations": 0, "evictions": 0}
+    
+    def _fingerprint(self, description: str) -> tuple[list[str], str, tuple[int, ...] | None]:
+        """Masked values, template key and MinHash signature of a description"""
+        values = [match.group() for match in self.VOLATILE.finditer(description)]
+        template = self.VOLATILE.sub("#", " ".join(description.lower().split()))
+        words = self.WORD.findall(template)
+        shingles = {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+        signature = None
+        if self.min_similarity > 0 and len(shingles) >= self.MIN_SHINGLES:
+            hashes = [int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big") for shingle in shingles]
+            signature = tuple(min((a * value + b) % MINHASH_PRIME for value in hashes) for a, b in MINHASH_COEFFICIENTS)
+        return values, hashlib.md5(template.encode()).hexdigest(), signature
+    
+    def _band_keys(self, signature: tuple[int, ...]) -> list[tuple[int, tuple[int, ...]]]:
+        return [(band, signature[start:start + self.BAND_ROWS]) for band, start in enumerate(range(0, self.PERMUTATIONS, self.BAND_ROWS))]
+    
+    def _similarity(self, first: tuple[int, ...], second: tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity: the share of hash functions with the same minimum"""
+        return sum(1 for a, b in zip(first, second) if a == b) / self.PERMUTATIONS
+    
+    def _remove(self, key: str):
+        _, _, template, signature, _ = self.entries.pop(key)
+        if self.templates.get(template) == key:
+            del self.templates[template]
+        if signature is not None:
+            for band_key in self._band_keys(signature):
+                keys = self.bands.get(band_key)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.bands[band_key]
+    
+    def _live(self, key: str) -> tuple[JobSegments, list[str], str, tuple[int, ...] | None, float | None] | None:
+        """Entry for key unless it has expired (expired entries are dropped)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[4] is not None and entry[4] <= time.time():
+            self._remove(key)
+            self.counters["expirations"] += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry
+    
+    def _patch(self, segments: JobSegments, old_values: list[str], new_values: list[str], description: str) -> JobSegments:
+        """Carry an earlier posting's segments over to description"""
+        fields = segments.model_dump()
+        # Values line up one to one only when the masked templates had the same shape
+        if len(old_values) == len(new_values):
+            replacements = [(old, new) for old, new in zip(old_values, new_values) if old != new]
+            for name, value in fields.items():
+                if value:
+                    for old, new in replacements:
+                        value = value.replace(old, new)
+                    fields[name] = value
+        fields.update(job_field_extractor.extract(description))
+        return JobSegments(**fields)
+    
+    def get(self, description: str) -> JobSegments | None:
+        """Segments for description, reused from an identical, re-dated or lightly edited posting"""
+        entry = self._live(segmentation_key(description))
+        if entry is not None:
+            self.counters["hits"] += 1
+            return entry[0].model_copy()
+        
+        values, template, signature = self._fingerprint(description)
+        template_owner = self.templates.get(template)
+        entry = self._live(template_owner) if template_owner is not None else None
+        if entry is not None:
+            self.counters["template_hits"] += 1
+            return self._patch(entry[0], entry[1], values, description)
+        
+        if signature is not None:
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates.update(self.bands.get(band_key, ()))
+            best = max(candidates, key=lambda key: self._similarity(self.entries[key][3], signature), default=None)
+            if best is not None and self._similarity(self.entries[best][3], signature) >= self.min_similarity:
+                entry = self._live(best)
+                if entry is not None:
+                    self.counters["near_hits"] += 1
+                    return self._patch(entry[0], entry[1], values, description)
+        
+        self.counters["misses"] += 1
+        return None
+    
+    def set(self, description: str, segments: JobSegments):
+        key = segmentation_key(description)
+        if key in self.entries:
+            self._remove(key)
+        values, template, signature = self._fingerprint(description)
+        expires_at = time.time() + self.ttl if self.ttl else None
+        self.entries[key] = (segments.model_copy(), values, template, signature, expires_at)
+        self.templates[template] = key
+        if signature is not None:
+            for band_key in self._band_keys(signature):
+                self.bands.setdefault(band_key, set()).add(key)
+        while len(self.entries) > self.max_size:
+            self._remove(next(iter(self.entries)))
+            self.counters["evictions"] += 1
+    
+    def clear(self):
+        self.entries.clear()
+        self.templates.clear()
+        self.bands.clear()
+    
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["template_hits"] + self.counters["near_hits"] + self.counters["misses"]
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            **self.counters,
+            "hit_rate": round((lookups - self.counters["misses"]) / lookups, 4) if lookups else 0.0,
+        }
+
+# Global segmentation result cache
+segmentation_cache = SegmentationCache(
+    max_size=int(os.getenv("SEGMENTATION_CACHE_MAX_ENTRIES", "2000")),
+    ttl=float(os.getenv("SEGMENTATION_CACHE_TTL", "0")) or None,
+    min_similarity=float(os.getenv("SEGMENTATION_NEAR_DUPLICATE_SIMILARITY", "0.75"))
+)
+
 class JobSegmentationResponse(BaseModel):
     success: bool
     data: JobSegments
     message: Optional[str] = None
 
+class SegmentationJobResponse(BaseModel):
+    jobId: str
+    status: str
+    data: Optional[JobSegments] = None
+    message: Optional[str] = None
+    createdAt: float
+    finishedAt: Optional[float] = None
+
+def connect_watsonx(api_key: str, project_id: str, region: str):
+    """Log in to one WatsonX project and return its ModelInference (blocking)"""
+    # The SDK pulls in pandas and takes about half a second to import, so only load it when a client is built
+    from ibm_watsonx_ai import APIClient, Credentials
+    from ibm_watsonx_ai.foundation_models import ModelInference
+    from ibm_watsonx_ai.utils.utils import HttpClientConfig
+    
+    # Create credentials
+    credentials = Credentials(
+        url=f"https://{region}.ml.cloud.ibm.com",
+        api_key=api_key
+    )
+    
+    # One API client per project; its keep-alive pool has room for every thread that may call it,
+    # and its async pool for the calls awaited on the loop
+    connections = TRANSLATION_WORKERS + SEGMENTATION_WORKERS
+    client = APIClient(
+        credentials,
+        project_id=project_id,
+        httpx_client=HttpClientConfig(limits=httpx.Limits(
+            max_connections=connections,
+            max_keepalive_connections=connections,
+            keepalive_expiry=WATSONX_KEEPALIVE_SECONDS
+        )),
+        async_httpx_client=HttpClientConfig(limits=httpx.Limits(
+            max_connections=WATSONX_MAX_CONNECTIONS,
+            max_keepalive_connections=WATSONX_MAX_CONNECTIONS,
+            keepalive_expiry=WATSONX_KEEPALIVE_SECONDS
+        ))
+    )
+    
+    # Initialize the model inference on that client (a credentials dict would log in and pool connections a second time)
+    return ModelInference(
+        model_id="ibm/granite-3-2b-instruct",  # 3.2B parameter IBM natural language model
+        api_client=client,
+        project_id=project_id,
+        # Retries happen in _call_upstream/_acall_upstream, where 429s can steer the request rate
+        max_retries=0
+    )
+
 class WatsonXAI:
-    def __init__(self, api_key: str, project_id: str, region: str = "us-south"):
-        self.api_key = api_key
-        self.project_id = project_id
-        self.region = region
+    def __init__(self, pool: BackendPool | None = None, model_inference=None):
+        self.pool = pool or upstream_pool
+        
+        if model_inference is not None:
+            # Injected backend with the ModelInference generate/generate_text_stream interface, and optionally
+            # agenerate/agenerate_stream (e.g. benchmarks/simulated_watsonx.py), so nothing talks to IBM
+            self.pool.attach(model_inference)
+    
+    def connect(self) -> int:
+        """Connect the pool's backends (blocking); returns how many still failed to connect"""
+        return self.pool.connect()
+    
+    def _build_translation_prompt(self, text: str, to_language: str) -> str:
+        """Build the translation prompt for a single text"""
+        return (
+            f"Translate this exact text to {to_language}. Do not add any words, do not complete sentences, do not explain anything.\n"
+            f"Input: {text}\n"
+            f"Translation:"
+        )
+    
+    # Generation parameters optimized for speed
+    TRANSLATION_PARAMS = {
+        "max_new_tokens": TRANSLATION_MAX_NEW_TOKENS,  # Cap; each call asks for prompt_budget's estimate
+        "min_new_tokens": 1,
+        "temperature": 0.05,    # Even lower temperature for more deterministic output
+        "top_p": 0.8,           # Lower for more focused output
+        "repetition_penalty": 1.1,
+        "stop_sequences": TRANSLATION_STOP_SEQUENCES,
+        "include_stop_sequence": False
+    }
+    
+    def _translation_params(self, max_new_tokens: int) -> dict:
+        return {**self.TRANSLATION_PARAMS, "max_new_tokens": max_new_tokens}
+    
+    def _generate_translation(self, client, prompt: str, max_new_tokens: int = TRANSLATION_MAX_NEW_TOKENS):
+        """Make a single upstream generate call for a translation prompt"""
+        return client.generate(prompt=prompt, params=self._translation_params(max_new_tokens))
+    
+    def _cut_off(self, response, max_new_tokens: int) -> bool:
+        """Record a translation's token use; True if it ran out of a budget below the cap before finishing its line"""
+        exhausted = prompt_budget.record("translation", max_new_tokens, response)
+        return (
+            exhausted
+            and max_new_tokens < TRANSLATION_MAX_NEW_TOKENS
+            and "\n" not in self._extract_generated_text(response).strip()
+        )
+    
+    def _stream_translation(self, lease: BackendLease, prompt: str, max_new_tokens: int, push, stop: Event, submitted: float):
+        """Stream a translation prompt on an executor thread, handing each chunk to push until stop is set"""
+        stage_seconds.observe(time.perf_counter() - submitted, stage="executor_queue")
+        generated = 0
+        timer = stage_seconds.time(stage="upstream_generate")
+        stream = lease.backend.client.generate_text_stream(prompt=prompt, params=self._translation_params(max_new_tokens))
+        try:
+            with timer:
+                for chunk in stream:
+                    generated += len(chunk)
+                    push(chunk)
+                    if stop.is_set():
+                        break
+        finally:
+            # Closing the generator releases the HTTP stream, so WatsonX stops generating
+            stream.close()
+            # The stream API doesn't report token counts
+            tokens_total.inc(len(prompt) // 4, direction="in")
+            tokens_total.inc(generated // 4, direction="out")
+            prompt_budget.record("stream", max_new_tokens, generated // 4)
+    
+    def _is_rate_limit_error(self, error: Exception) -> bool:
+        """Check whether an upstream error is a rate limit rejection"""
+        return upstream_status(error) == 429
+    
+    def _extract_generated_text(self, response) -> str:
+        """Get the generated text out of a model response"""
+        if isinstance(response, dict) and 'results' in response:
+            return response['results'][0]['generated_text']
+        return str(response)
+    
+    def _clean_translation(self, raw_text: str) -> str:
+        """Strip intro labels, quotes and trailing lines from a raw translation"""
+        with stage_seconds.time(stage="cleanup"):
+            return translation_cleaner.clean(raw_text)
+    
+    def translate_text(self, text: str, from_language: str, to_language: str) -> str:
+        """Translate text using the loaded model (blocking, for threads and scripts)"""
+        # No-op translations never reach the cache or the model
+        local_translation = translation_fast_path.check(text, from_language, to_language)
+        if local_translation is not None:
+            return local_translation
+        
+        # Check cache first
+        cached_translation = translation_cache.get(text, from_language, to_language)
+        if cached_translation:
+            return cached_translation
+        
+        plan = translation_memory.plan(text)
+        if plan is not None:
+            segments, separators = plan
+            translated = [
+                (self.translate_text(segment, from_language, to_language), False)
+                for segment in segments
+            ]
+            return self._join_segments(text, from_language, to_language, translated, separators)
+        
+        prompt = self._build_translation_prompt(text, to_language)
+        max_new_tokens = prompt_budget.translation(text, from_language, to_language)
+        try:
+            response = self._call_upstream(self._generate_translation, prompt, max_new_tokens)
+            if self._cut_off(response, max_new_tokens):
+                # The estimate was too tight for this text; one more call with the full budget
+                fallbacks_total.inc(kind="translation_budget")
+                response = self._call_upstream(self._generate_translation, prompt, TRANSLATION_MAX_NEW_TOKENS)
+                prompt_budget.record("translation", TRANSLATION_MAX_NEW_TOKENS, response)
+        except OverloadedError:
+            return "Error: Translation service is temporarily unavailable. Please try again in a moment."
+        except Exception as e:
+            if self._is_rate_limit_error(e):
+                return "Error: Rate limit exceeded. Please try again in a moment."
+            return f"Error: {str(e)}"
+        
+        cleaned_text = self._clean_translation(self._extract_generated_text(response))
+        
+        # Cache the successful translation
+        translation_cache.set(text, from_language, to_language, cleaned_text)
+        
+        return cleaned_text
+    
+    def _call_upstream(self, func, *args, max_retries: int = 3):
+        """Run one upstream call on the current thread, retrying transient failures on the best backend"""
+        for attempt in range(max_retries):
+            upstream_pool.admit()
+            # One token per upstream call, from whichever backend the pool picks
+            with stage_seconds.time(stage="limiter_wait"):
+                lease = upstream_pool.acquire_sync()
+            started = time.monotonic()
+            try:
+                # Already on the calling thread, so there is no executor queue to measure
+                result = timed_upstream_call(func, None, lease, *args)
+            except Exception as e:
+                status = upstream_status(e)
+                upstream_pool.failed(lease, status, time.monotonic() - started, upstream_retry_after(e))
+                if status not in RETRYABLE_STATUSES or attempt == max_retries - 1:
+                    raise
+                retries_total.inc(status=str(status))
+                time.sleep(upstream_pool.backoff(lease, attempt, upstream_retry_after(e)))
+                continue
+            except BaseException:
+                upstream_pool.release(lease)
+                raise
+            upstream_pool.succeeded(lease, time.monotonic() - started)
+            return result
+    
+    async def _acall_upstream(self, func, *args, pool: ThreadPoolExecutor | None = None, priority: str = "interactive", max_retries: int = 3):
+        """Run one scheduled upstream call, retrying transient failures on the best backend
+        
+        Backends with an async client are awaited on the loop, so cancelling the
+        caller aborts the request; the rest run on pool (default: executor).
+        """
+        loop = asyncio.get_running_loop()
+        # Retries share the first attempt's deadline
+        class_deadline = upstream_scheduler.deadlines[priority]
+        deadline = loop.time() + class_deadline if class_deadline is not None else None
+        
+        for attempt in range(max_retries):
+            # Fails fast while every backend's circuit is open, before taking a token or a thread
+            upstream_pool.admit()
+            lease = None
+            try:
+                # One token per upstream call, awaited on the loop instead of sleeping a thread
+                with stage_seconds.time(stage="limiter_wait"):
+                    lease = await upstream_scheduler.acquire(priority, deadline)
+                started = time.monotonic()
+                if lease.backend.async_client is not None:
+                    result = await atimed_upstream_call(func, lease, *args)
+                else:
+                    result = await loop.run_in_executor(pool or executor, timed_upstream_call, func, time.perf_counter(), lease, *args)
+            except Exception as e:
+                if lease is None:
+                    # Shed by the scheduler, WatsonX never saw it
+                    raise
+                status = upstream_status(e)
+                upstream_pool.failed(lease, status, time.monotonic() - started, upstream_retry_after(e))
+                # Another healthy backend takes the retry at once; otherwise back off
+                delay = upstream_pool.backoff(lease, attempt, upstream_retry_after(e))
+                if (
+                    status not in RETRYABLE_STATUSES
+                    or attempt == max_retries - 1
+                    or (deadline is not None and loop.time() + delay > deadline)
+                ):
+                    raise
+                retries_total.inc(status=str(status))
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled while queued or in flight; the outcome is unknown
+                if lease is not None:
+                    upstream_pool.release(lease)
+                raise
+            upstream_pool.succeeded(lease, time.monotonic() - started)
+            return result
+    
+    async def atranslate_text(self, text: str, from_language: str, to_language: str, check_cache: bool = True) -> str:
+        """Translate text from the event loop; without an async client only the upstream call runs in the executor"""
+        local_translation = translation_fast_path.check(text, from_language, to_language)
+        if local_translation is not None:
+            return local_translation
         
-        # Create credentials
-        self.credentials = Credentials(
-            url=f"https://{region}.ml.cloud.ibm.com",
-            api_key=api_key
-        )
+        # Check cache first (callers that already looked it up skip this so stats aren't counted twice)
+        if check_cache:
+            cached_translation = translation_cache.get(text, from_language, to_language)
+            if cached_translation:
+                return cached_translation
         
-        # Initialize the API client
-        self.client = APIClient(self.credentials)
-        
-        # Initialize the model inference with project_id - using 3.2B natural language model for translation
-        self.model_inference = ModelInference(
-            model_id="ibm/granite-3-2b-instruct",  # 3.2B parameter IBM natural language model
-            credentials={
-                "apikey": api_key,
-                "url": f"https://{region}.ml.cloud.ibm.com"
-            },
-            project_id=project_id
-        )
+        # Identical requests that miss together share one upstream call
+        cache_key = translation_cache._get_cache_key(text, from_language, to_language)
+        return await translation_flights.do(cache_key, self._atranslate_uncached, text, from_language, to_language)
     
-    def translate_text(self, text: str, from_language: str, to_language: str) -> str:
-        """Translate text using the loaded model"""
-        # Check cache first
-        cached_translation = translation_cache.get(text, from_language, to_language)
-        if cached_translation:
-            return cached_translation
+    async def _atranslate_uncached(self, text: str, from_language: str, to_language: str) -> str:
+        """Translate text that missed the cache with one upstream call, or segment by segment"""
+        plan = translation_memory.plan(text)
+        if plan is not None:
+            segments, separators = plan
+            translated = await self._atranslate_items([(segment, from_language, to_language) for segment in segments])
+            return self._join_segments(text, from_language, to_language, translated, separators)
+        
+        prompt = self._build_translation_prompt(text, to_language)
+        max_new_tokens = prompt_budget.translation(text, from_language, to_language)
+        try:
+            response = await self._acall_upstream(self._generate_translation, prompt, max_new_tokens)
+            if self._cut_off(response, max_new_tokens):
+                # The estimate was too tight for this text; one more call with the full budget
+                fallbacks_total.inc(kind="translation_budget")
+                response = await self._acall_upstream(self._generate_translation, prompt, TRANSLATION_MAX_NEW_TOKENS)
+                prompt_budget.record("translation", TRANSLATION_MAX_NEW_TOKENS, response)
+        except OverloadedError:
+            # Shed requests surface as 429s, not as an error string in the bubble
+            raise
+        except Exception as e:
+            if self._is_rate_limit_error(e):
+                return "Error: Rate limit exceeded. Please try again in a moment."
+            return f"Error: {str(e)}"
+        
+        cleaned_text = self._clean_translation(self._extract_generated_text(response))
+        
+        # Cache the successful translation
+        translation_cache.set(text, from_language, to_language, cleaned_text)
+        
+        return cleaned_text
+    
+    async def astream_translation(self, text: str, from_language: str, to_language: str):
+        """Translate text as a stream of cleaned deltas; the complete result is cached and shared with identical requests"""
+        cache_key = translation_cache._get_cache_key(text, from_language, to_language)
+        in_flight = translation_flights.join(cache_key)
+        if in_flight is not None:
+            yield await translation_flights.wait(in_flight, cache_key, self._atranslate_uncached, text, from_language, to_language)
+            return
+        
+        # Identical /translate requests wait for this stream instead of making their own call
+        flight = translation_flights.claim(cache_key)
+        try:
+            if translation_memory.plan(text) is not None:
+                # Segments are translated in parallel batches, so the text arrives in one piece
+                translation = await self._atranslate_uncached(text, from_language, to_language)
+                if translation.startswith("Error:"):
+                    raise Exception(translation.removeprefix("Error:").strip())
+                yield translation
+            else:
+                translation = ""
+                # Text already sent can't be retried with a bigger budget, so streams get twice the estimate
+                max_new_tokens = min(TRANSLATION_MAX_NEW_TOKENS, 2 * prompt_budget.translation(text, from_language, to_language))
+                async for delta in self._astream_uncached(self._build_translation_prompt(text, to_language), max_new_tokens):
+                    translation += delta
+                    yield delta
+                translation_cache.set(text, from_language, to_language, translation)
+            flight.set_result(translation)
+        except BaseException as e:
+            # A failed stream passes its error on; a closed one (the client left) lets the others make the call
+            translation_flights.abandon([flight], e)
+            raise
+    
+    async def _astream_uncached(self, prompt: str, max_new_tokens: int = TRANSLATION_MAX_NEW_TOKENS, priority: str = "interactive", max_retries: int = 3):
+        """Stream one scheduled upstream generation through the incremental cleaner
         
-        max_retries = 3
-        retry_delay = 1.0
+        Failures before the first chunk are retried like _acall_upstream; once
+        text has been sent, a failure ends the stream.
+        """
+        loop = asyncio.get_running_loop()
+        class_deadline = upstream_scheduler.deadlines[priority]
+        deadline = loop.time() + class_deadline if class_deadline is not None else None
+        cleaner = translation_cleaner.stream()
+        sent = ""
         
         for attempt in range(max_retries):
+            upstream_pool.admit()
+            with stage_seconds.time(stage="limiter_wait"):
+                lease = await upstream_scheduler.acquire(priority, deadline)
+            
+            started = time.monotonic()
+            chunks = self._astream_chunks(lease, prompt, max_new_tokens)
+            received = False
+            settled = False
             try:
-                # Wait if needed to respect the rate limit
-                rate_limiter.wait_if_needed()
-                
-                prompt = (
-                    f"Translate this exact text to {to_language}. Do not add any words, do not complete sentences, do not explain anything.\n"
-                    f"Input: {text}\n"
-                    f"Translation:"
-                )
-                
-                # Generate response using the model inference with optimized parameters for speed
-                response = self.model_inference.generate(
-                    prompt=prompt,
-                    params={
-                        "max_new_tokens": 300,  # Increased for longer translations
-                        "min_new_tokens": 1,
-                        "temperature": 0.05,    # Even lower temperature for more deterministic output
-                        "top_p": 0.8,           # Lower for more focused output
-                        "repetition_penalty": 1.1
-                    }
-                )
-                
-                # Extract the translated text
-                if isinstance(response, dict) and 'results' in response:
-                    raw_text = response['results'][0]['generated_text']
-                else:
-                    raw_text = str(response)
-                
-                # Clean the output: remove quotes, intro text, and extra whitespace
-                cleaned_text = raw_text.strip()
-                
-                # Remove intro phrases like "Here is the translation:", "Translation:", etc.
-                intro_patterns = [
-                    r'^[^\w]*Here is the translation:?\s*',
-                    r'^[^\w]*Translation:?\s*',
-                    r'^[^\w]*The translation is:?\s*',
-                    r'^[^\w]*Translated:?\s*',
-                    r'^[^\w]*Result:?\s*',
-                    r'^[^\w]*Output:?\s*',
-                    r'^[^\w]*Input:?\s*',
-                    r'^[^\w]*English:?\s*',
-                    r'^[^\w]*French:?\s*',
-                    r'^[^\w]*Spanish:?\s*',
-                    r'^[^\w]*German:?\s*',
-                    r'^[^\w]*Italian:?\s*',
-                    r'^[^\w]*Portuguese:?\s*',
-                    r'^[^\w]*Russian:?\s*',
-                    r'^[^\w]*Chinese:?\s*',
-                    r'^[^\w]*Japanese:?\s*',
-                    r'^[^\w]*Korean:?\s*',
-                    r'^[^\w]*Arabic:?\s*',
-                    r'^[^\w]*Hindi:?\s*',
-                    r'^[^\w]*Bengali:?\s*',
-                    r'^[^\w]*Urdu:?\s*',
-                    r'^[^\w]*Turkish:?\s*',
-                    r'^[^\w]*Dutch:?\s*',
-                    r'^[^\w]*Swedish:?\s*',
-                    r'^[^\w]*Norwegian:?\s*',
-                    r'^[^\w]*Danish:?\s*',
-                    r'^[^\w]*Finnish:?\s*',
-                    r'^[^\w]*Polish:?\s*',
-                    r'^[^\w]*Czech:?\s*',
-                    r'^[^\w]*Hungarian:?\s*',
-                    r'^[^\w]*Greek:?\s*',
-                    r'^[^\w]*Hebrew:?\s*',
-                    r'^[^\w]*Thai:?\s*',
-                    r'^[^\w]*Vietnamese:?\s*'
-                ]
-                
-                for pattern in intro_patterns:
-                    cleaned_text = re.sub(pattern, '', cleaned_text, flags=re.IGNORECASE)
-                
-                # Remove leading/trailing quotes (single and double)
-                cleaned_text = re.sub(r'^["\']+|["\']+$', '', cleaned_text)
-                
-                # Remove any remaining quotes around the text
-                cleaned_text = re.sub(r'^["\'](.+)["\']$', r'\1', cleaned_text)
-                
-                # Remove any text after newlines (stop at first line break)
-                cleaned_text = cleaned_text.split('\n')[0]
-                
-                # Final cleanup
-                cleaned_text = cleaned_text.strip()
-                
-                # Cache the successful translation
-                translation_cache.set(text, from_language, to_language, cleaned_text)
-                
-                return cleaned_text
-                    
-            except Exception as e:
-                error_str = str(e)
+                try:
+                    async for chunk in chunks:
+                        received = True
+                        delta = cleaner.feed(chunk)
+                        if delta:
+                            sent += delta
+                            yield delta
+                        if cleaner.done:
+                            # First line is complete; the rest would be thrown away by the cleaner
+                            break
+                    error = None
+                except Exception as e:
+                    error = e
+                finally:
+                    # Stops the upstream generation if the loop ended early
+                    await chunks.aclose()
                 
-                # Check if it's a rate limit error
-                if "429" in error_str or "rate_limit" in error_str.lower():
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                        continue
-                    else:
-                        return f"Error: Rate limit exceeded. Please try again in a moment."
+                if error is None:
+                    upstream_pool.succeeded(lease, time.monotonic() - started)
+                    settled = True
+                    final = cleaner.finish()
+                    if len(final) > len(sent) and final.startswith(sent):
+                        yield final[len(sent):]
+                    return
                 
-                # For other errors, return the error message
-                return f"Error: {error_str}"
+                status = upstream_status(error)
+                upstream_pool.failed(lease, status, time.monotonic() - started, upstream_retry_after(error))
+                settled = True
+                delay = upstream_pool.backoff(lease, attempt, upstream_retry_after(error))
+                if (
+                    received
+                    or status not in RETRYABLE_STATUSES
+                    or attempt == max_retries - 1
+                    or (deadline is not None and loop.time() + delay > deadline)
+                ):
+                    raise error
+                retries_total.inc(status=str(status))
+                await asyncio.sleep(delay)
+            finally:
+                if not settled:
+                    # Client went away mid-stream; the outcome is unknown
+                    upstream_pool.release(lease)
+    
+    async def _astream_chunks(self, lease: BackendLease, prompt: str, max_new_tokens: int):
+        """Raw chunks of one streamed generation, awaited from the async client or relayed from an executor thread"""
+        client = lease.backend.async_client
+        if client is not None:
+            generated = 0
+            stream = client.generate_text_stream(prompt=prompt, params=self._translation_params(max_new_tokens))
+            try:
+                with stage_seconds.time(stage="upstream_generate"):
+                    async for chunk in stream:
+                        generated += len(chunk)
+                        yield chunk
+            finally:
+                await stream.aclose()
+                # The stream API doesn't report token counts
+                tokens_total.inc(len(prompt) // 4, direction="in")
+                tokens_total.inc(generated // 4, direction="out")
+                prompt_budget.record("stream", max_new_tokens, generated // 4)
+            return
         
-        return f"Error: Translation failed after {max_retries} attempts"
-
-    def segment_job_description(self, description: str) -> JobSegments:
-        """Segment job description using the same model"""
+        # Chunks cross from the executor thread to the loop through the queue; None marks the end
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+        stop = Event()
+        call = loop.run_in_executor(
+            executor, self._stream_translation, lease, prompt, max_new_tokens,
+            lambda chunk: loop.call_soon_threadsafe(queue.put_nowait, chunk), stop, time.perf_counter()
+        )
+        call.add_done_callback(lambda _: queue.put_nowait(None))
         try:
-            # Wait if needed to respect the rate limit
-            rate_limiter.wait_if_needed()
-            
-            prompt = f"""You are a job description analyzer. Extract information from this job description and return ONLY a JSON object. Do not include any other text, explanations, or formatting.
-
-Job Description: "{description}"
-
-Extract these fields into a JSON object:
-- jobTitle: The job position/role
-- companyName: The business/company name  
-- location: The work location (city, state format)
-- salaryRange: The salary/wage with currency and period
-- workSchedule: Work days and hours (if mentioned)
-- contactInfo: Contact person (if mentioned)
-- description: A professional job description (create one if not provided)
-- qualifications: Required skills and experience (create comprehensive list if not provided)
-
-Rules:
-- For location, use "City, State" format, ignore street addresses
-- For salary, include currency symbol and period (e.g., "$35/hr", "$50,000/year")
-- For company names, preserve "The" if present
-- Extract only the job title, not surrounding words like "opportunity" or "position"
-- If description is missing or minimal, create a professional job description based on the job title
-- If qualifications are missing, create a comprehensive list of relevant skills and experience for the role
-- Make descriptions engaging and professional
-- Include typical responsibilities and expectations for the role
-
-IMPORTANT: Return ONLY the JSON object. Do not include any text before or after the JSON. Do not use markdown formatting.
-
-Example output format:
-{{"jobTitle": "Sous Chef", "companyName": "The Grandview Restaurant", "location": "San Jose, CA", "salaryRange": "$35/hr", "workSchedule": "", "contactInfo": "", "description": "We are seeking an experienced Sous Chef to join our culinary team at The Grandview Restaurant. The ideal candidate will assist the Head Chef in managing kitchen operations, supervising staff, and ensuring high-quality food preparation. This role involves menu planning, food cost management, and maintaining kitchen safety standards.", "qualifications": "Culinary degree or equivalent experience, 3+ years in professional kitchen, Food safety certification, Strong leadership skills, Menu planning experience, Knowledge of food cost management"}}
-
-Return the JSON object:"""
-
-            print(f"🤖 Sending prompt to AI model...")
-            
-            # Generate response using the model inference
-            response = self.model_inference.generate(
-                prompt=prompt,
-                params={
-                    "max_new_tokens": 800,  # Increased for longer descriptions
-                    "min_new_tokens": 1,
-                    "temperature": 0.1,
-                    "top_p": 0.9,
-                    "repetition_penalty": 1.1
-                }
-            )
-            
-            print(f"📥 Raw model response type: {type(response)}")
-            print(f"📥 Raw model response: {response}")
-            
-            # Extract the generated text
-            if isinstance(response, dict) and 'results' in response:
-                generated_text = response['results'][0]['generated_text']
-                print(f"📋 Extracted from results: {repr(generated_text)}")
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+            if call.exception() is not None:
+                raise call.exception()
+        finally:
+            stop.set()
+    
+    def _build_batch_translation_prompt(self, texts: list[str], to_language: str) -> str:
+        """Build one numbered prompt covering several texts with the same target language"""
+        # The numbering is the only thing that ties outputs back to inputs, so keep each text on one line
+        lines = "\n".join(f"{i}. {' '.join(text.split())}" for i, text in enumerate(texts, start=1))
+        return (
+            f"Translate each numbered line to {to_language}. Keep the same numbering and write exactly one translated line per number. "
+            f"Do not add any words, do not complete sentences, do not explain anything.\n"
+            f"{lines}\n"
+            f"Translations:\n"
+        )
+    
+    def _generate_batch_translation(self, client, prompt: str, max_new_tokens: int, count: int):
+        """Make a single upstream generate call for a numbered batch prompt with count lines"""
+        return client.generate(
+            prompt=prompt,
+            params={
+                "max_new_tokens": max_new_tokens,
+                "min_new_tokens": 1,
+                "temperature": 0.05,
+                "top_p": 0.8,
+                "repetition_penalty": 1.0,  # Numbered lines repeat by design
+                # Stop before the model invents a line past the last one
+                "stop_sequences": [f"\n{count + 1}."],
+                "include_stop_sequence": False
+            }
+        )
+    
+    def _split_batch_translation(self, raw_text: str, count: int) -> list[str | None]:
+        """Split a numbered batch response into cleaned per-item translations"""
+        results: list[str | None] = [None] * count
+        with stage_seconds.time(stage="cleanup"):
+            for line in raw_text.splitlines():
+                match = BATCH_LINE_PATTERN.match(line)
+                if not match:
+                    continue
+                index = int(match.group(1)) - 1
+                if 0 <= index < count and results[index] is None:
+                    cleaned = translation_cleaner.clean(match.group(2))
+                    results[index] = cleaned or None
+        return results
+    
+    async def _atranslate_chunk(self, texts: list[str], to_language: str) -> list[str | None]:
+        """Translate one chunk of texts with a single upstream call"""
+        prompt = self._build_batch_translation_prompt(texts, to_language)
+        # Source languages can differ within a chunk, so lines are estimated from English
+        max_new_tokens = prompt_budget.numbered([prompt_budget.line(text, None, to_language, BATCH_PREFIX_TOKENS) for text in texts])
+        response = await self._acall_upstream(self._generate_batch_translation, prompt, max_new_tokens, len(texts))
+        prompt_budget.record("batch", max_new_tokens, response)
+        return self._split_batch_translation(self._extract_generated_text(response), len(texts))
+    
+    async def atranslate_batch(self, items: list[tuple[str, str, str]]) -> list[tuple[str, bool]]:
+        """Translate (text, from_language, to_language) items, packing cache misses into few upstream calls
+        
+        Multi-sentence items that aren't cached whole are translated per segment
+        through the translation memory. Returns (translation, cached) pairs in input order.
+        """
+        results: list[tuple[str, bool] | None] = [None] * len(items)
+        flat: list[tuple[str, str, str]] = []
+        # Per item: where its segments start in flat and the separators to rejoin them, or None if sent whole
+        spans: list[tuple[int, int, list[str] | None]] = []
+        for i, (text, from_language, to_language) in enumerate(items):
+            local_translation = translation_fast_path.check(text, from_language, to_language)
+            if local_translation is not None:
+                results[i] = (local_translation, False)
+                spans.append((len(flat), 0, None))
+                continue
+            plan = translation_memory.plan(text)
+            if plan is not None:
+                cached_translation = translation_cache.get(text, from_language, to_language)
+                if cached_translation:
+                    results[i] = (cached_translation, True)
+                    spans.append((len(flat), 0, None))
+                    continue
+                segments, separators = plan
+                spans.append((len(flat), len(segments), separators))
+                flat.extend((segment, from_language, to_language) for segment in segments)
             else:
-                generated_text = str(response)
-                print(f"📋 Converted to string: {repr(generated_text)}")
+                spans.append((len(flat), 1, None))
+                flat.append((text, from_language, to_language))
+        
+        if all(separators is None and count == 1 for _, count, separators in spans):
+            # Nothing was segmented
+            return await self._atranslate_items(items)
+        flat_results = await self._atranslate_items(flat) if flat else []
+        
+        for i, (start, count, separators) in enumerate(spans):
+            if results[i] is not None:
+                continue
+            if separators is None:
+                results[i] = flat_results[start]
+                continue
+            text, from_language, to_language = items[i]
+            results[i] = (self._join_segments(text, from_language, to_language, flat_results[start:start + count], separators), False)
+        return results
+    
+    def _join_segments(self, text: str, from_language: str, to_language: str, translated: list[tuple[str, bool]], separators: list[str]) -> str:
+        """Reassemble a segmented translation and cache it whole; any failed segment fails the text"""
+        for translation, _ in translated:
+            if translation.startswith("Error:"):
+                return translation
+        translation_memory.record(len(translated), sum(1 for _, cached in translated if cached))
+        translation = translation_memory.join([translation for translation, _ in translated], separators)
+        translation_cache.set(text, from_language, to_language, translation)
+        return translation
+    
+    async def _atranslate_items(self, items: list[tuple[str, str, str]]) -> list[tuple[str, bool]]:
+        """Translate items as given: cache lookups, in-flight sharing and numbered batch prompts"""
+        results: list[tuple[str, bool] | None] = [None] * len(items)
+        # Cache misses grouped by target language; identical texts share one slot
+        pending: dict[str, dict[str, list[int]]] = {}
+        # Misses already being translated by another request
+        joined: list[tuple[int, str, asyncio.Future]] = []
+        # Misses this batch is responsible for, so concurrent requests can wait on them
+        claimed: dict[str, asyncio.Future] = {}
+        
+        for i, (text, from_language, to_language) in enumerate(items):
+            # Segments of a longer text can be no-ops on their own (a URL line, a signature already in the target language)
+            local_translation = translation_fast_path.check(text, from_language, to_language)
+            if local_translation is not None:
+                results[i] = (local_translation, False)
+                continue
+            cached_translation = translation_cache.get(text, from_language, to_language)
+            if cached_translation:
+                results[i] = (cached_translation, True)
+                continue
+            
+            cache_key = translation_cache._get_cache_key(text, from_language, to_language)
+            if cache_key not in claimed:
+                in_flight = translation_flights.join(cache_key)
+                if in_flight is not None:
+                    joined.append((i, cache_key, in_flight))
+                    continue
+                claimed[cache_key] = translation_flights.claim(cache_key)
+            by_text = pending.setdefault(normalize_language(to_language), {})
+            by_text.setdefault(text, []).append(i)
+        
+        async def run_chunk(to_language: str, texts: list[str]):
+            chunk_failed = False
+            try:
+                translations = await self._atranslate_chunk(texts, to_language)
+            except OverloadedError:
+                raise
+            except Exception as e:
+                log_event(logging.WARNING, "batch_chunk_failed", texts=len(texts), to_language=to_language, error=str(e))
+                fallbacks_total.inc(len(texts), kind="batch_chunk")
+                chunk_failed = True
+                translations = [None] * len(texts)
             
-            if not generated_text:
-                raise Exception("No generated text in response")
+            for text, translation in zip(texts, translations):
+                indexes = pending[to_language][text]
+                if translation is None:
+                    # The model skipped or mangled this line; translate it on its own (this batch holds its flight)
+                    if not chunk_failed:
+                        fallbacks_total.inc(kind="batch_line")
+                    _, from_language, item_to_language = items[indexes[0]]
+                    translation = await self._atranslate_uncached(text, from_language, item_to_language)
+                for index in indexes:
+                    _, from_language, item_to_language = items[index]
+                    if not translation.startswith("Error:"):
+                        translation_cache.set(text, from_language, item_to_language, translation)
+                    results[index] = (translation, False)
+                    future = claimed.get(translation_cache._get_cache_key(text, from_language, item_to_language))
+                    if future is not None and not future.done():
+                        future.set_result(translation)
+        
+        chunks = []
+        for to_language, by_text in pending.items():
+            chunk: list[str] = []
+            chunk_chars = 0
+            for text in by_text:
+                if chunk and (len(chunk) >= BATCH_MAX_ITEMS or chunk_chars + len(text) > BATCH_MAX_CHARS):
+                    chunks.append(run_chunk(to_language, chunk))
+                    chunk, chunk_chars = [], 0
+                chunk.append(text)
+                chunk_chars += len(text)
+            if chunk:
+                chunks.append(run_chunk(to_language, chunk))
+        
+        try:
+            await asyncio.gather(*chunks)
+        except BaseException as e:
+            # Never leave other requests waiting on a batch that failed or was cancelled
+            translation_flights.abandon(claimed.values(), e)
+            raise
+        for index, cache_key, future in joined:
+            results[index] = (await translation_flights.wait(future, cache_key, self._atranslate_uncached, *items[index]), False)
+        return results
+
+    def _build_fanout_translation_prompt(self, text: str, to_languages: list[str]) -> str:
+        """Build one numbered prompt translating a single text into several languages"""
+        languages = "\n".join(f"{i}. {language}" for i, language in enumerate(to_languages, start=1))
+        return (
+            f"Translate the text into each numbered language. Write exactly one line per number in the form \"N. Language: translation\". "
+            f"Do not add any words, do not complete sentences, do not explain anything.\n"
+            f"Text: {' '.join(text.split())}\n"
+            f"Languages:\n{languages}\n"
+            f"Translations:\n"
+        )
+    
+    def _split_fanout_translation(self, raw_text: str, to_languages: list[str]) -> list[str | None]:
+        """Split a numbered fanout response into cleaned per-language translations"""
+        results: list[str | None] = [None] * len(to_languages)
+        with stage_seconds.time(stage="cleanup"):
+            for line in raw_text.splitlines():
+                match = BATCH_LINE_PATTERN.match(line)
+                if not match:
+                    continue
+                index = int(match.group(1)) - 1
+                if not 0 <= index < len(to_languages) or results[index] is not None:
+                    continue
+                # The cleaner only knows registry names, so strip the label we asked for ("es:", "Tagalog:") here
+                translation = match.group(2).strip()
+                label = to_languages[index].strip()
+                if translation.lower().startswith(label.lower()) and translation[len(label):].lstrip().startswith(":"):
+                    translation = translation[len(label):].lstrip()[1:]
+                cleaned = translation_cleaner.clean(translation)
+                # A bare label means the model ran out of tokens or skipped the language
+                if cleaned and cleaned.lower() != label.lower():
+                    results[index] = cleaned
+        return results
+    
+    async def _atranslate_fanout_chunk(self, text: str, from_language: str, to_languages: list[str]) -> list[str | None]:
+        """Translate one text into a chunk of languages with a single upstream call"""
+        prompt = self._build_fanout_translation_prompt(text, to_languages)
+        max_new_tokens = prompt_budget.numbered([
+            prompt_budget.line(text, from_language, to_language, FANOUT_PREFIX_TOKENS) for to_language in to_languages
+        ])
+        response = await self._acall_upstream(self._generate_batch_translation, prompt, max_new_tokens, len(to_languages))
+        prompt_budget.record("fanout", max_new_tokens, response)
+        return self._split_fanout_translation(self._extract_generated_text(response), to_languages)
+    
+    async def atranslate_fanout(self, text: str, from_language: str, to_languages: list[str]) -> list[tuple[str, bool]]:
+        """Translate one text into several languages, covering as many targets per upstream call as fit
+        
+        Multi-sentence texts go through atranslate_batch instead, so their segments
+        share numbered batch prompts across all targets. Every translation is cached.
+        Returns (translation, cached) pairs in to_languages order.
+        """
+        if translation_memory.plan(text) is not None:
+            return await self.atranslate_batch([(text, from_language, to_language) for to_language in to_languages])
+        
+        results: list[tuple[str, bool] | None] = [None] * len(to_languages)
+        # Cache misses by cache key, so "Spanish" and "es" share one target
+        pending: dict[str, list[int]] = {}
+        joined: list[tuple[int, str, asyncio.Future]] = []
+        claimed: dict[str, asyncio.Future] = {}
+        
+        for i, to_language in enumerate(to_languages):
+            local_translation = translation_fast_path.check(text, from_language, to_language)
+            if local_translation is not None:
+                results[i] = (local_translation, False)
+                continue
+            cached_translation = translation_cache.get(text, from_language, to_language)
+            if cached_translation:
+                results[i] = (cached_translation, True)
+                continue
             
-            # Parse the JSON response
+            cache_key = translation_cache._get_cache_key(text, from_language, to_language)
+            if cache_key not in pending:
+                in_flight = translation_flights.join(cache_key)
+                if in_flight is not None:
+                    joined.append((i, cache_key, in_flight))
+                    continue
+                claimed[cache_key] = translation_flights.claim(cache_key)
+            pending.setdefault(cache_key, []).append(i)
+        
+        async def run_chunk(cache_keys: list[str]):
+            labels = [to_languages[pending[cache_key][0]] for cache_key in cache_keys]
+            chunk_failed = False
             try:
-                parsed_data = self.parse_ai_response(generated_text)
-            except Exception as parse_error:
-                print(f"⚠️ JSON parsing failed, creating fallback response: {parse_error}")
-                # Create a fallback response based on the job description
-                parsed_data = {
-                    "jobTitle": "Job Position",
-                    "companyName": "Company",
-                    "location": "Location",
-                    "salaryRange": "Salary TBD",
-                    "workSchedule": "",
-                    "contactInfo": "",
-                    "description": f"We are seeking a qualified candidate for this position. {description}",
-                    "qualifications": "Experience in relevant field, Strong communication skills, Team player"
-                }
+                translations = await self._atranslate_fanout_chunk(text, from_language, labels)
+            except OverloadedError:
+                raise
+            except Exception as e:
+                log_event(logging.WARNING, "fanout_chunk_failed", targets=len(labels), error=str(e))
+                fallbacks_total.inc(len(labels), kind="fanout_chunk")
+                chunk_failed = True
+                translations = [None] * len(labels)
             
-            # Capitalize company name if it exists
-            if parsed_data.get('companyName'):
-                parsed_data['companyName'] = self.capitalize_company_name(parsed_data['companyName'])
+            async def finish(cache_key: str, to_language: str, translation: str | None):
+                if translation is None:
+                    # Missing from the numbered output; translate this target on its own (this request holds its flight)
+                    if not chunk_failed:
+                        fallbacks_total.inc(kind="fanout_target")
+                    translation = await self._atranslate_uncached(text, from_language, to_language)
+                elif not translation.startswith("Error:"):
+                    translation_cache.set(text, from_language, to_language, translation)
+                for index in pending[cache_key]:
+                    results[index] = (translation, False)
+                # Already settled if another chunk failed first
+                if not claimed[cache_key].done():
+                    claimed[cache_key].set_result(translation)
             
-            return JobSegments(**parsed_data)
+            await asyncio.gather(*(
+                finish(cache_key, label, translation)
+                for cache_key, label, translation in zip(cache_keys, labels, translations)
+            ))
+        
+        cache_keys = list(pending)
+        # Each target's line is about as long as the text, so long texts get fewer targets per call
+        longest_line = max((
+            prompt_budget.line(text, from_language, to_languages[indexes[0]], FANOUT_PREFIX_TOKENS) for indexes in pending.values()
+        ), default=1)
+        per_call = max(1, min(FANOUT_MAX_TARGETS, (BATCH_MAX_NEW_TOKENS - prompt_budget.slack) // longest_line))
+        try:
+            await asyncio.gather(*(
+                run_chunk(cache_keys[start:start + per_call])
+                for start in range(0, len(cache_keys), per_call)
+            ))
+        except BaseException as e:
+            # Never leave other requests waiting on a fanout that failed or was cancelled
+            translation_flights.abandon(claimed.values(), e)
+            raise
+        for index, cache_key, future in joined:
+            results[index] = (await translation_flights.wait(future, cache_key, self._atranslate_uncached, text, from_language, to_languages[index]), False)
+        return results
+
+    def _build_segmentation_prompt(self, description: str, fields: list[str] | None = None) -> str:
+        """Build the segmentation prompt for a job description, asking only for the given fields"""
+        return prompt_budget.segmentation_prompt(description, fields or list(SEGMENTATION_FIELD_PROMPTS))
+    
+    def _generate_segmentation(self, client, prompt: str, max_new_tokens: int = SEGMENTATION_MAX_NEW_TOKENS):
+        """Make a single upstream generate call for a segmentation prompt"""
+        log_event(logging.DEBUG, "segmentation_prompt", sample=LOG_SAMPLE_RATE, prompt=prompt)
+        
+        # Generate response using the model inference
+        return client.generate(
+            prompt=prompt,
+            params={
+                "max_new_tokens": max_new_tokens,
+                "min_new_tokens": 1,
+                "temperature": 0.1,
+                "top_p": 0.9,
+                "repetition_penalty": 1.1
+            }
+        )
+    
+    def _plan_segmentation(self, description: str) -> tuple[str, int, dict[str, str]]:
+        """Prompt, token budget and rule-extracted fields for a description; the model only gets the rest"""
+        known = job_field_extractor.extract(description)
+        for field in known:
+            rule_fields_total.inc(field=field)
+        fields = [field for field in SEGMENTATION_FIELD_PROMPTS if field not in known]
+        max_new_tokens = prompt_budget.segmentation(description, fields)
+        return self._build_segmentation_prompt(description, fields), max_new_tokens, known
+    
+    def _segments_from_response(self, response, description: str, known: dict[str, str] | None = None, placeholder: bool = True) -> JobSegments:
+        """Turn a segmentation response into JobSegments, falling back to placeholders; known fields take precedence"""
+        # Extract the generated text
+        generated_text = self._extract_generated_text(response)
+        log_event(logging.DEBUG, "segmentation_response", sample=LOG_SAMPLE_RATE, text=generated_text)
+        
+        if not generated_text:
+            raise Exception("No generated text in response")
+        
+        # Parse the JSON response
+        try:
+            segments = self.parse_ai_response(generated_text)
+        except Exception as parse_error:
+            if not placeholder:
+                raise SegmentationParseError(str(parse_error)) from parse_error
+            return self.placeholder_segments(description, str(parse_error), known)
+        
+        if known:
+            segments = segments.model_copy(update=known)
+        
+        # Capitalize company name if it exists
+        if segments.companyName:
+            segments.companyName = self.capitalize_company_name(segments.companyName)
+        
+        return segments
+    
+    def placeholder_segments(self, description: str, error: str, known: dict[str, str] | None = None) -> JobSegments:
+        """Generic JobSegments for a description whose model output couldn't be parsed"""
+        log_event(logging.WARNING, "segmentation_placeholder", error=error)
+        fallbacks_total.inc(kind="segmentation_placeholder")
+        # Create a fallback response based on the job description
+        segments = JobSegments(
+            jobTitle="Job Position",
+            companyName="Company",
+            location="Location",
+            salaryRange="Salary TBD",
+            workSchedule="",
+            contactInfo="",
+            description=f"We are seeking a qualified candidate for this position. {description}",
+            qualifications="Experience in relevant field, Strong communication skills, Team player"
+        )
+        if known is None:
+            known = job_field_extractor.extract(description)
+        return segments.model_copy(update=known)
+    
+    def segment_job_description(self, description: str, placeholder: bool = True) -> JobSegments:
+        """Segment job description using the same model (blocking, for threads and scripts)"""
+        try:
+            prompt, max_new_tokens, known = self._plan_segmentation(description)
+            response = self._call_upstream(self._generate_segmentation, prompt, max_new_tokens)
+            prompt_budget.record("segmentation", max_new_tokens, response)
+            return self._segments_from_response(response, description, known, placeholder)
             
         except Exception as e:
-            print(f"Error in job segmentation: {e}")
+            log_event(logging.ERROR, "segmentation_failed", error=str(e))
             raise e
     
-    def parse_ai_response(self, response_text: str) -> dict:
-        """Parse the AI response and extract JSON"""
+    async def asegment_job_description(self, description: str, priority: str = "ui", placeholder: bool = True) -> JobSegments:
+        """Segment a job description from the event loop (on the segmentation thread pool without an async client)"""
         try:
-            print(f"🔍 Raw AI response: {repr(response_text)}")
-            
-            # Method 1: Try direct JSON parsing first
-            try:
-                result = json.loads(response_text.strip())
-                print(f"✅ Direct JSON parsing successful")
-                return result
-            except json.JSONDecodeError:
-                print(f"❌ Direct parsing failed, trying cleaning methods...")
-            
-            # Method 2: Clean up the response - remove any markdown formatting
-            clean_text = re.sub(r'```json\n?|\n?```', '', response_text).strip()
-            
-            # Method 3: Remove any leading/trailing text that's not JSON
-            # Find the first occurrence of { and last occurrence of }
-            start_idx = clean_text.find('{')
-            end_idx = clean_text.rfind('}')
+            prompt, max_new_tokens, known = self._plan_segmentation(description)
+            response = await self._acall_upstream(
+                self._generate_segmentation,
+                prompt,
+                max_new_tokens,
+                pool=segmentation_executor,
+                priority=priority
+            )
+            prompt_budget.record("segmentation", max_new_tokens, response)
+            return self._segments_from_response(response, description, known, placeholder)
             
-            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                json_str = clean_text[start_idx:end_idx + 1]
-                print(f"📋 Extracted JSON: {repr(json_str)}")
+        except Exception as e:
+            log_event(logging.ERROR, "segmentation_failed", error=str(e))
+            raise e
+    
+    def parse_ai_response(self, response_text: str) -> JobSegments:
+        """Parse the AI response into JobSegments"""
+        try:
+            # Well-formed output parses directly; anything else goes through the repairing scanner
+            repaired = False
+            with stage_seconds.time(stage="json_parse"):
                 try:
-                    result = json.loads(json_str)
-                    print(f"✅ Successfully parsed JSON from extraction")
-                    return result
-                except json.JSONDecodeError as e:
-                    print(f"❌ Extraction parsing failed: {e}")
-            
-            # Method 4: Try regex extraction with more patterns
-            json_patterns = [
-                r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}',  # Nested JSON
-                r'\{.*?\}',  # Simple JSON
-                r'\{[^}]*\}',  # Basic JSON
-            ]
-            
-            for pattern in json_patterns:
-                matches = re.findall(pattern, clean_text, re.DOTALL)
-                for match in matches:
-                    print(f"📋 Regex pattern '{pattern}' found: {repr(match)}")
-                    try:
-                        result = json.loads(match)
-                        print(f"✅ Successfully parsed JSON from regex pattern '{pattern}'")
-                        return result
-                    except json.JSONDecodeError:
-                        continue
-            
-            # Method 5: Remove any potential invisible characters and try again
-            try:
-                # Remove any non-printable characters except newlines and tabs
-                cleaned_json = ''.join(char for char in clean_text if char.isprintable() or char in '\n\t')
-                # Try to extract JSON from cleaned text
-                start_idx = cleaned_json.find('{')
-                end_idx = cleaned_json.rfind('}')
-                if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                    json_str = cleaned_json[start_idx:end_idx + 1]
-                    result = json.loads(json_str)
-                    print(f"✅ Successfully parsed JSON after character cleaning")
-                    return result
-            except json.JSONDecodeError as e:
-                print(f"❌ Character cleaning failed: {e}")
+                    parsed = json.loads(response_text.strip())
+                except json.JSONDecodeError:
+                    parsed = json_extractor.extract(
+                        response_text,
+                        accept=lambda obj: any(re.sub(r'[\s_-]', '', str(key)).lower() in SEGMENT_FIELD_NAMES for key in obj)
+                    )
+                    repaired = True
+            if not isinstance(parsed, dict):
+                raise ValueError("Model output is not a JSON object")
             
-            # Method 6: Try to fix common JSON issues
-            try:
-                # Replace smart quotes with regular quotes
-                fixed_text = clean_text.replace('"', '"').replace('"', '"')
-                # Replace single quotes with double quotes for JSON keys
-                fixed_text = re.sub(r"'([^']+)':", r'"\1":', fixed_text)
-                # Try to extract JSON from fixed text
-                start_idx = fixed_text.find('{')
-                end_idx = fixed_text.rfind('}')
-                if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                    json_str = fixed_text[start_idx:end_idx + 1]
-                    result = json.loads(json_str)
-                    print(f"✅ Successfully parsed JSON after quote fixing")
-                    return result
-            except json.JSONDecodeError as e:
-                print(f"❌ Quote fixing failed: {e}")
+            fields = {}
+            for key, value in parsed.items():
+                field = SEGMENT_FIELD_NAMES.get(re.sub(r'[\s_-]', '', str(key)).lower())
+                if field is None or field in fields:
+                    continue
+                if isinstance(value, list):
+                    value = ", ".join(str(item).strip() for item in value if item is not None)
+                elif isinstance(value, dict):
+                    value = ", ".join(f"{k}: {v}" for k, v in value.items())
+                elif value is not None:
+                    value = str(value).strip()
+                fields[field] = value
             
-            # If all parsing attempts fail, log the response and raise an error
-            print(f"❌ All parsing attempts failed")
-            print(f"Failed to parse AI response. Raw response: {response_text}")
-            print(f"Cleaned response: {clean_text}")
-            raise Exception("Could not extract valid JSON from AI response")
+            if not fields:
+                raise ValueError("Model output has none of the job fields")
+            if repaired:
+                fallbacks_total.inc(kind="json_repaired")
+            return JobSegments(**fields)
                 
         except Exception as e:
-            print(f"❌ Exception in parse_ai_response: {e}")
-            print(f"Failed to parse AI response: {response_text}")
+            log_event(logging.WARNING, "segmentation_parse_failed", error=str(e), text=response_text)
             raise Exception(f"Invalid JSON response from AI model: {e}")
     
     def capitalize_company_name(self, company_name: str) -> str:
@@ -475,36 +3815,376 @@ Return the JSON object:"""
         
         return " ".join(capitalized_words)
 
-# Initialize the model at startup
-@app.on_event("startup")
-async def startup_event():
-    global model_inference, granite_service
+# Background segmentation jobs
+class SegmentationJob:
+    def __init__(self, job_id: str, key: str, description: str):
+        self.id = job_id
+        self.key = key
+        self.description = description
+        self.status = "queued"  # queued -> running -> done | failed | cancelled
+        self.result: JobSegments | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.done = asyncio.get_running_loop().create_future()
+        # /segment requests waiting on the result; a job nobody can poll is dropped when the last one disconnects
+        self.waiters = 0
+        self.pollable = False
+        self.task: asyncio.Task | None = None
+
+class QueueFullError(OverloadedError):
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after, f"Segmentation queue is full, retry in {max(1, math.ceil(retry_after))}s")
+
+class SegmentationJobQueue:
+    """Bounded queue of segmentation jobs drained by a few worker tasks.
+    
+    Workers await the rate limiter and, with an async client, the upstream call
+    on the event loop; otherwise the call runs on segmentation_executor, so
+    segmentation never holds the translation threads. Finished jobs are kept
+    for result_ttl seconds for polling.
+    """
+    def __init__(self, workers: int = 2, max_queued: int = 100, result_ttl: float = 600.0):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.queue: asyncio.Queue | None = None
+        self.tasks: list[asyncio.Task] = []
+        self.jobs: dict[str, SegmentationJob] = {}
+        # Unfinished job per description key, so identical submissions share one job
+        self.active: dict[str, SegmentationJob] = {}
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.avg_duration = 10.0  # seconds, EWMA of finished jobs
+    
+    def start(self):
+        """Create the queue and worker tasks on the running loop"""
+        self.queue = asyncio.Queue(maxsize=self.max_queued)
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self._expire_loop()))
+    
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+    
+    def retry_after(self) -> float:
+        """Rough seconds until a new job could be accepted"""
+        backlog = self.queue.qsize() if self.queue is not None else 0
+        return backlog * self.avg_duration / self.workers
     
-    # Configuration
-    API_KEY = os.getenv("VITE_IBM_API_KEY")
-    PROJECT_ID = os.getenv("VITE_IBM_PROJECT_ID")
-    REGION = os.getenv("VITE_IBM_REGION", "us-south")
+    def submit(self, description: str, pollable: bool = True) -> SegmentationJob:
+        """Queue a description for segmentation, or join the identical job already queued
+        
+        Jobs submitted with pollable=False are only awaited through run(), so they can be dropped once nobody waits.
+        """
+        key = segmentation_key(description)
+        job = self.active.get(key)
+        if job is not None:
+            self.coalesced += 1
+            job.pollable = job.pollable or pollable
+            return job
+        
+        job = SegmentationJob(uuid.uuid4().hex, key, description)
+        job.pollable = pollable
+        # Repeat and re-posted ads are answered from the cache without queueing
+        cached = segmentation_cache.get(description)
+        if cached is not None:
+            job.status = "done"
+            job.result = cached
+            job.started_at = job.finished_at = job.created_at
+            job.done.set_result(cached)
+            self.jobs[job.id] = job
+            return job
+        
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+        self.jobs[job.id] = job
+        self.active[key] = job
+        return job
     
-    # Initialize WatsonXAI service for both translation and job segmentation
-    if API_KEY and PROJECT_ID:
+    def get(self, job_id: str) -> SegmentationJob | None:
+        return self.jobs.get(job_id)
+    
+    async def run(self, description: str) -> JobSegments:
+        """Submit and wait for the result (the synchronous /segment contract)"""
+        job = self.submit(description, pollable=False)
+        job.waiters += 1
         try:
-            watsonx = WatsonXAI(api_key=API_KEY, project_id=PROJECT_ID, region=REGION)
-            model_inference = watsonx
-            granite_service = watsonx  # Use the same instance for both services
+            # Shield so a client disconnecting doesn't cancel a job others may be waiting on
+            return await asyncio.shield(job.done)
+        except asyncio.CancelledError:
+            job.waiters -= 1
+            if job.waiters == 0 and not job.pollable:
+                self._cancel(job)
+            raise
+    
+    def _cancel(self, job: SegmentationJob):
+        """Drop a job nobody is waiting for: skip it if queued, stop its upstream call if running"""
+        if job.done.done():
+            return
+        self.cancelled += 1
+        job.status = "cancelled"
+        job.done.cancel()
+        self.active.pop(job.key, None)
+        self.jobs.pop(job.id, None)
+        if job.task is not None:
+            job.task.cancel()
+    
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            if job.status == "cancelled":
+                self.queue.task_done()
+                continue
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.task = asyncio.ensure_future(granite_service.asegment_job_description(job.description, placeholder=False))
+                try:
+                    # wait() doesn't raise when only the job's task is cancelled, so the worker survives _cancel
+                    await asyncio.wait({job.task})
+                except asyncio.CancelledError:
+                    job.task.cancel()
+                    raise
+                if job.status == "cancelled":
+                    continue
+                try:
+                    job.result = job.task.result()
+                    segmentation_cache.set(job.description, job.result)
+                except SegmentationParseError as e:
+                    # Placeholders are still better than an error for the UI, but aren't worth caching
+                    job.result = granite_service.placeholder_segments(job.description, str(e))
+                job.status = "done"
+                self.completed += 1
+                job.done.set_result(job.result)
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+                self.failed += 1
+                job.done.set_exception(e)
+                # Mark retrieved so nobody polling only by id triggers "exception never retrieved"
+                job.done.exception()
+            finally:
+                job.finished_at = time.time()
+                if job.status != "cancelled":
+                    self.avg_duration = 0.8 * self.avg_duration + 0.2 * (job.finished_at - job.started_at)
+                    self.active.pop(job.key, None)
+                self.queue.task_done()
+    
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(min(60.0, self.result_ttl))
+            cutoff = time.time() - self.result_ttl
+            for job_id in [job_id for job_id, job in self.jobs.items() if job.finished_at and job.finished_at < cutoff]:
+                del self.jobs[job_id]
+    
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "running": sum(1 for job in self.active.values() if job.status == "running"),
+            "max_queued": self.max_queued,
+            "workers": self.workers,
+            "stored_results": len(self.jobs),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "coalesced": self.coalesced,
+            "avg_duration": round(self.avg_duration, 3)
+        }
+
+# Global segmentation job queue
+segmentation_jobs = SegmentationJobQueue(
+    workers=SEGMENTATION_WORKERS,
+    max_queued=int(os.getenv("SEGMENTATION_MAX_QUEUED", "100")),
+    result_ttl=float(os.getenv("SEGMENTATION_RESULT_TTL", "600"))
+)
+
+class ModelWarmup:
+    """Connect the WatsonX backends in the background, retrying until all of them work
+    
+    Startup only schedules this, so the server takes traffic (cache hits,
+    fast-path answers, health checks) immediately. Connecting imports the SDK
+    and authenticates with IBM, both slow. The service is installed as soon as
+    one backend connects; failed backends are retried with jittered exponential
+    backoff instead of leaving the service without a model.
+    """
+    def __init__(self, service: "WatsonXAI", on_ready, prime=None, retry_base: float = 1.0, retry_cap: float = 60.0):
+        # service.connect() runs on a thread; on_ready(service) installs it; prime(service) is an optional first call
+        self.service = service
+        self.on_ready = on_ready
+        self.prime = prime
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        self.state = "initializing"  # initializing -> ready, retrying in between failures
+        self.attempts = 0
+        self.last_error: str | None = None
+        self.started_at = time.monotonic()
+        self.ready_after: float | None = None
+        self.task: asyncio.Task | None = None
+    
+    def start(self):
+        """Start initializing on the running loop"""
+        self.started_at = time.monotonic()
+        self.task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.attempts += 1
+            try:
+                # Default executor, so a slow IBM login never holds a translation thread
+                pending = await loop.run_in_executor(None, self.service.connect)
+            except Exception as e:
+                # Nothing connected yet
+                pending = None
+                self.last_error = str(e)
             
-            # Test the model
-            test_result = model_inference.translate_text("Hello", "english", "spanish")
-            print("Translation service initialized successfully")
-            print("Job segmentation service initialized successfully")
+            if pending is not None and self.state != "ready":
+                await self._ready()
+            if pending == 0:
+                self.last_error = None
+                return
             
-        except Exception as e:
-            print(f"Failed to initialize WatsonXAI service: {e}")
-            model_inference = None
-            granite_service = None
+            if self.state != "ready":
+                self.state = "retrying"
+            delay = random.uniform(0.5, 1.0) * min(self.retry_cap, self.retry_base * 2 ** (self.attempts - 1))
+            log_event(logging.WARNING, "watsonx_connect_retry", attempt=self.attempts, unconnected=pending, retry_in=round(delay, 1), error=self.last_error)
+            await asyncio.sleep(delay)
+    
+    async def _ready(self):
+        self.on_ready(self.service)
+        self.state = "ready"
+        self.ready_after = time.monotonic() - self.started_at
+        log_event(logging.INFO, "watsonx_initialized", attempts=self.attempts, seconds=round(self.ready_after, 3))
+        
+        if self.prime is not None:
+            # Opens the connection pool and caches a common phrase; a failure here is only logged
+            try:
+                await self.prime(self.service)
+            except Exception as e:
+                log_event(logging.WARNING, "watsonx_prime_failed", error=str(e))
+    
+    def unavailable(self, detail: str) -> HTTPException:
+        """Error for a request that needs the model before it is ready"""
+        retry_after = max(1, math.ceil(self.retry_base))
+        return HTTPException(status_code=503, detail=f"{detail}, retry in {retry_after}s", headers={"Retry-After": str(retry_after)})
+    
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "ready_after": round(self.ready_after, 3) if self.ready_after is not None else None
+        }
+
+def install_model(service: "WatsonXAI"):
+    """Serve translation and job segmentation from service"""
+    global model_inference, granite_service
+    model_inference = service
+    granite_service = service  # Use the same instance for both services
+
+async def prime_model(service: "WatsonXAI"):
+    """Make one translation so the first user request finds a warm connection and token"""
+    await service.atranslate_text("Hello", "english", "spanish")
+
+# Global model warm-up (None when WatsonX isn't configured)
+model_warmup: ModelWarmup | None = None
+# Readiness also waits for the model; off by default so replicas take cache and fast-path traffic at once
+READY_REQUIRES_MODEL = os.getenv("READY_REQUIRES_MODEL", "0") == "1"
+# Set once startup_event has run
+app_started = False
+
+def model_unavailable(detail: str) -> HTTPException:
+    """Error for a request that needs the model: 503 while it is warming up, 500 if it isn't configured"""
+    if model_warmup is not None:
+        return model_warmup.unavailable(detail)
+    return HTTPException(status_code=500, detail=detail)
+
+async def cancel_on_disconnect(request: Request, awaitable):
+    """Await awaitable, cancelling it if the client disconnects first
+    
+    The body has already been read, so the next ASGI message is the
+    disconnect. Cancellation reaches the upstream call through SingleFlight and
+    the segmentation queue, which drop the call once nobody else waits on it.
+    """
+    task = asyncio.ensure_future(awaitable)
+    
+    async def disconnected():
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+    
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+    if task in done:
+        return task.result()
+    disconnects_total.inc(route=request.url.path)
+    # Nobody reads the response; 499 is the conventional "client closed request" for the access log and metrics
+    raise HTTPException(status_code=499, detail="Client closed request")
+
+# Initialize the model at startup
+@app.on_event("startup")
+async def startup_event():
+    global model_warmup, app_started
+    
+    # Counted by the rate controller, which splits its increases between the workers sharing a bucket
+    if shared_state is not None:
+        shared_state.register_worker(os.getpid())
+    upstream_scheduler.start()
+    segmentation_jobs.start()
+    
+    # Pull recently used translations from the disk tier in the background
+    if translation_cache.backing is not None:
+        asyncio.get_running_loop().run_in_executor(executor, translation_cache.warm, TRANSLATION_CACHE_WARM_ENTRIES)
+    
+    # Initialize WatsonXAI service for both translation and job segmentation, without holding up startup
+    # (backends come from WATSONX_BACKENDS or VITE_IBM_API_KEY / VITE_IBM_PROJECT_ID / VITE_IBM_REGION)
+    if upstream_pool.backends:
+        model_warmup = ModelWarmup(
+            WatsonXAI(upstream_pool),
+            install_model,
+            prime=prime_model if os.getenv("WATSONX_PRIME", "1") == "1" else None,
+            retry_cap=float(os.getenv("WATSONX_INIT_RETRY_CAP", "60"))
+        )
+        model_warmup.start()
     else:
-        print("WatsonXAI service not configured - missing API_KEY or PROJECT_ID")
-        model_inference = None
-        granite_service = None
+        log_event(logging.WARNING, "watsonx_not_configured", detail="missing WATSONX_BACKENDS or API_KEY and PROJECT_ID")
+    
+    app_started = True
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if model_warmup is not None:
+        await model_warmup.stop()
+    await segmentation_jobs.stop()
+    await upstream_scheduler.stop()
+    await upstream_pool.aclose()
+    
+    # Flush queued cache writes so the next start is warm
+    if translation_cache.backing is not None:
+        translation_cache.backing.close()
+    if shared_state is not None:
+        shared_state.unregister_worker(os.getpid())
 
 @app.get("/")
 async def root():
@@ -515,9 +4195,21 @@ async def root():
     }
 
 @app.post("/translate", response_model=TranslationResponse)
-async def translate_text(request: TranslationRequest):
+async def translate_text(request: TranslationRequest, http_request: Request):
+    # No-op translations are answered locally, even without a model
+    local_translation = translation_fast_path.check(request.text, request.fromLanguage, request.toLanguage)
+    if local_translation is not None:
+        return TranslationResponse(
+            success=True,
+            originalText=request.text,
+            translatedText=local_translation,
+            fromLanguage=request.fromLanguage,
+            toLanguage=request.toLanguage,
+            cached=False
+        )
+    
     if not model_inference:
-        raise HTTPException(status_code=500, detail="Translation model not loaded")
+        raise model_unavailable("Translation model not loaded")
     
     try:
         # Check cache first
@@ -532,18 +4224,13 @@ async def translate_text(request: TranslationRequest):
                 cached=True
             )
         
-        # Wait if needed to respect the rate limit
-        rate_limiter.wait_if_needed()
-        
-        # Run translation in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        translated_text = await loop.run_in_executor(
-            executor, 
-            model_inference.translate_text, 
+        # Awaited on the loop and dropped upstream if the client goes away
+        translated_text = await cancel_on_disconnect(http_request, model_inference.atranslate_text(
             request.text, 
             request.fromLanguage, 
-            request.toLanguage
-        )
+            request.toLanguage,
+            check_cache=False
+        ))
         
         return TranslationResponse(
             success=True,
@@ -554,16 +4241,170 @@ async def translate_text(request: TranslationRequest):
             cached=False
         )
         
+    except OverloadedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
 
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/translate/stream")
+async def translate_stream(request: TranslationRequest, http_request: Request):
+    """Stream a translation as Server-Sent Events: delta events with cleaned text, then done or error"""
+    stream = None
+    local_translation = translation_fast_path.check(request.text, request.fromLanguage, request.toLanguage)
+    cached_translation = None
+    if local_translation is not None:
+        first = local_translation
+    elif not model_inference:
+        raise model_unavailable("Translation model not loaded")
+    elif cached_translation := translation_cache.get(request.text, request.fromLanguage, request.toLanguage):
+        first = cached_translation
+    else:
+        stream = model_inference.astream_translation(request.text, request.fromLanguage, request.toLanguage)
+        try:
+            # Wait for the first delta before answering so shedding and upstream failures keep their status codes
+            first = await cancel_on_disconnect(http_request, anext(stream))
+        except StopAsyncIteration:
+            first = ""
+        except OverloadedError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Translation failed: {str(e)}")
+    
+    async def events():
+        translated_text = first
+        try:
+            if first:
+                yield sse_event("delta", {"text": first})
+            if stream is not None:
+                async for delta in stream:
+                    translated_text += delta
+                    yield sse_event("delta", {"text": delta})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Translation failed: {str(e)}"})
+            return
+        finally:
+            # Stops the upstream generation if the client disconnected
+            if stream is not None:
+                await stream.aclose()
+        
+        yield sse_event("done", TranslationResponse(
+            success=True,
+            originalText=request.text,
+            translatedText=translated_text,
+            fromLanguage=request.fromLanguage,
+            toLanguage=request.toLanguage,
+            cached=cached_translation is not None
+        ).model_dump())
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/translate/batch", response_model=BatchTranslationResponse)
+async def translate_batch(request: BatchTranslationRequest, http_request: Request):
+    """Translate many texts at once; cache misses share as few upstream calls as possible"""
+    if not model_inference:
+        raise model_unavailable("Translation model not loaded")
+    
+    if len(request.items) > MAX_BATCH_REQUEST_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_REQUEST_ITEMS} items per batch")
+    
+    try:
+        translations = await cancel_on_disconnect(http_request, model_inference.atranslate_batch(
+            [(item.text, item.fromLanguage, item.toLanguage) for item in request.items]
+        ))
+        
+        return BatchTranslationResponse(
+            success=True,
+            results=[
+                TranslationResponse(
+                    success=True,
+                    originalText=item.text,
+                    translatedText=translated_text,
+                    fromLanguage=item.fromLanguage,
+                    toLanguage=item.toLanguage,
+                    cached=cached
+                )
+                for item, (translated_text, cached) in zip(request.items, translations)
+            ]
+        )
+        
+    except OverloadedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch translation failed: {str(e)}")
+
+@app.post("/translate/fanout", response_model=FanoutTranslationResponse)
+async def translate_fanout(request: FanoutTranslationRequest, http_request: Request):
+    """Translate one text into every listed language, filling the cache for each pair"""
+    if len(request.toLanguages) > MAX_FANOUT_REQUEST_TARGETS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_FANOUT_REQUEST_TARGETS} target languages per request")
+    
+    def response(translations: list[tuple[str, bool]]) -> FanoutTranslationResponse:
+        return FanoutTranslationResponse(
+            success=True,
+            originalText=request.text,
+            fromLanguage=request.fromLanguage,
+            translations=[
+                TranslationResponse(
+                    success=True,
+                    originalText=request.text,
+                    translatedText=translated_text,
+                    fromLanguage=request.fromLanguage,
+                    toLanguage=to_language,
+                    cached=cached
+                )
+                for to_language, (translated_text, cached) in zip(request.toLanguages, translations)
+            ]
+        )
+    
+    # Senders fan out to their own language too; no-op targets are answered locally, even without a model
+    local_translations = [
+        translation_fast_path.check(request.text, request.fromLanguage, to_language)
+        for to_language in request.toLanguages
+    ]
+    if all(translation is not None for translation in local_translations):
+        return response([(translation, False) for translation in local_translations])
+    
+    if not model_inference:
+        raise model_unavailable("Translation model not loaded")
+    
+    try:
+        translations = await cancel_on_disconnect(
+            http_request, model_inference.atranslate_fanout(request.text, request.fromLanguage, request.toLanguages)
+        )
+        return response(translations)
+        
+    except OverloadedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Fanout translation failed: {str(e)}")
+
 @app.post("/segment", response_model=JobSegmentationResponse)
-async def segment_job_description(request: JobSegmentationRequest):
+async def segment_job_description(request: JobSegmentationRequest, http_request: Request):
     """Segment job description using WatsonXAI"""
     try:
         if not request.description.strip():
             raise HTTPException(status_code=400, detail="Job description is required")
         
+        if granite_service is None and model_warmup is not None:
+            # Configured but still connecting; placeholders would look like a real result
+            raise model_warmup.unavailable("Job segmentation model not loaded")
+        
         if granite_service is None:
             # Return mock data for testing
             mock_response = JobSegments(
@@ -583,18 +4424,136 @@ async def segment_job_description(request: JobSegmentationRequest):
                 message="Using mock data - WatsonXAI not configured"
             )
         
-        # Use the WatsonXAI service for job segmentation
-        segments = granite_service.segment_job_description(request.description)
+        # Run through the job queue; identical descriptions share one job, dropped once every waiter disconnects
+        segments = await cancel_on_disconnect(http_request, segmentation_jobs.run(request.description))
         
         return JobSegmentationResponse(
             success=True,
             data=segments
         )
         
+    except OverloadedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in segmentation endpoint: {e}")
+        log_event(logging.ERROR, "segmentation_endpoint_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+def job_response(job: SegmentationJob) -> SegmentationJobResponse:
+    return SegmentationJobResponse(
+        jobId=job.id,
+        status=job.status,
+        data=job.result,
+        message=job.error,
+        createdAt=job.created_at,
+        finishedAt=job.finished_at
+    )
+
+@app.post("/segment/jobs", response_model=SegmentationJobResponse, status_code=202)
+async def submit_segmentation_job(request: JobSegmentationRequest):
+    """Queue a job description for segmentation and return a job id to poll"""
+    if not request.description.strip():
+        raise HTTPException(status_code=400, detail="Job description is required")
+    
+    if granite_service is None:
+        raise model_unavailable("Job segmentation model not loaded")
+    
+    try:
+        job = segmentation_jobs.submit(request.description)
+    except OverloadedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    return job_response(job)
+
+@app.get("/segment/jobs/{job_id}", response_model=SegmentationJobResponse)
+async def get_segmentation_job(job_id: str):
+    """Get the status, or the result once finished, of a segmentation job"""
+    job = segmentation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired segmentation job")
+    
+    return job_response(job)
+
+# Gauges read from the live objects on each scrape
+metrics.register(MetricGauge("ai_cache_entries", "Translations in the memory tier", lambda: {(): translation_cache.size()}))
+metrics.register(MetricGauge("ai_in_flight_translations", "Distinct translations waiting on an upstream call", lambda: {(): translation_flights.in_flight()}))
+metrics.register(MetricGauge(
+    "ai_scheduler_waiting", "Upstream calls waiting for a rate limiter token by priority",
+    lambda: {(("priority", name),): stats["waiting"] for name, stats in upstream_scheduler.stats().items()}
+))
+metrics.register(MetricGauge(
+    "ai_upstream_rate", "Current adaptive upstream rate in requests per second by backend",
+    lambda: {(("backend", backend.name),): backend.limiter.rate for backend in upstream_pool.backends}
+))
+metrics.register(MetricGauge(
+    "ai_upstream_in_flight", "Upstream calls leased to each backend and not yet settled",
+    lambda: {(("backend", backend.name),): backend.in_flight for backend in upstream_pool.backends}
+))
+metrics.register(MetricGauge(
+    "ai_circuit_state", "Upstream circuit breaker state by backend (1 for the current state)",
+    lambda: {
+        (("backend", backend.name), ("state", state)): float(backend.guard.state == state)
+        for backend in upstream_pool.backends for state in ("closed", "open", "half_open")
+    }
+))
+metrics.register(MetricGauge("ai_segmentation_queued", "Segmentation jobs waiting for a worker", lambda: {(): segmentation_jobs.stats()["queued"]}))
+
+class RequestTimingMiddleware:
+    """Observe request latency per route template, through the last byte of streamed responses
+    
+    Plain ASGI rather than @app.middleware("http"): BaseHTTPMiddleware's extra task
+    and stream per request costs more than a cached translation does.
+    """
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the shared scope
+            route = scope.get("route")
+            request_seconds.observe(
+                time.perf_counter() - started,
+                route=getattr(route, "path", "unmatched"),
+                status=str(status)
+            )
+
+app.add_middleware(RequestTimingMiddleware)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics: per-stage latency histograms, token, retry, error, fallback and cache counters"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness: the process is up and its event loop is answering"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness: startup has run (and, with READY_REQUIRES_MODEL=1, the model is initialized)"""
+    model_state = model_warmup.stats() if model_warmup is not None else {"state": "unconfigured"}
+    ready = app_started and (not READY_REQUIRES_MODEL or model_inference is not None)
+    body = {"status": "ready" if ready else "starting", "model": model_state}
+    if not ready:
+        raise HTTPException(status_code=503, detail=body)
+    return body
+
 @app.get("/health")
 async def health_check():
     return {
@@ -602,22 +4561,54 @@ async def health_check():
         "translation_service": model_inference is not None,
         "job_segmentation_service": granite_service is not None,
         "cache_size": translation_cache.size(),
+        "in_flight_translations": translation_flights.in_flight(),
+        "segmentation_jobs": segmentation_jobs.stats(),
+        "scheduler": upstream_scheduler.stats(),
+        "upstream": upstream_pool.stats(),
+        "token_budget": prompt_budget.stats(),
+        "shared_state": SHARED_STATE_FILE or None,
+        "workers": shared_state.workers() if shared_state is not None else 1,
+        "model": model_warmup.stats() if model_warmup is not None else {"state": "unconfigured"},
         "timestamp": asyncio.get_event_loop().time()
     }
 
 @app.post("/cache/clear")
-async def clear_cache():
-    """Clear the translation cache"""
-    translation_cache.clear()
-    return {"message": "Translation cache cleared", "cache_size": 0}
+async def clear_cache(tier: str = "all"):
+    """Clear the translation cache (tier: memory, disk or all) and, unless tier is disk, the segmentation cache"""
+    if tier not in ("memory", "disk", "all"):
+        raise HTTPException(status_code=400, detail="tier must be one of: memory, disk, all")
+    
+    # Clearing the disk tier touches SQLite, so keep it off the event loop
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(executor, translation_cache.clear, tier)
+    # Segmentation results only live in memory
+    if tier != "disk":
+        segmentation_cache.clear()
+    return {"message": f"Translation cache cleared ({tier})", "cache_size": translation_cache.size()}
 
 @app.get("/cache/stats")
 async def cache_stats():
     """Get cache statistics"""
     return {
-        "cache_size": translation_cache.size(),
-        "max_size": translation_cache.max_size
+        **translation_cache.stats(),
+        "coalesced_translations": translation_flights.coalesced,
+        "cancelled_translations": translation_flights.cancelled,
+        "translation_memory": translation_memory.stats(),
+        "fast_path": translation_fast_path.stats(),
+        "coalesced_segmentations": segmentation_jobs.coalesced,
+        "segmentation": segmentation_cache.stats()
     }
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="error") 
\ No newline at end of file
+    if UVICORN_WORKERS > 1:
+        # Worker processes import the app by name and share the rate limit and cache through SHARED_STATE_FILE
+        uvicorn.run(
+            "model:app",
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+            host="0.0.0.0",
+            port=8001,
+            log_level="error",
+            workers=UVICORN_WORKERS
+        )
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8001, log_level="error") 
\ No newline at end of file
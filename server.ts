@@ -36,6 +36,44 @@ const updatePerformanceStats = (messageTime: number) => {
   performanceStats.lastMessageTime = messageTime;
 };
 
+// Translate a new message into every other member's language as soon as it is stored,
+// so recipients' translate calls hit a warm cache (or join the call already in flight)
+const pretranslateMessage = async (messageContent: string, senderId: number | string, groupChatId: number | string) => {
+  try {
+    const members = await executeQuery(
+      'SELECT u.user_id, u.preferred_language FROM joins j JOIN users u ON u.user_id = j.user_id WHERE j.groupchat_id = ?',
+      [groupChatId]
+    );
+    const senderLanguage = members.find((member: any) => String(member.user_id) === String(senderId))?.preferred_language || 'english';
+    const toLanguages = [...new Set<string>(
+      members
+        .filter((member: any) => String(member.user_id) !== String(senderId))
+        .map((member: any) => member.preferred_language || 'english')
+    )].filter((language) => language !== senderLanguage);
+
+    if (!toLanguages.length) return;
+
+    const response = await fetch('http://127.0.0.1:8001/translate/fanout', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        text: messageContent,
+        fromLanguage: senderLanguage,
+        toLanguages
+      }),
+    });
+
+    if (!response.ok) {
+      throw new Error(`FastAPI server responded with status: ${response.status}`);
+    }
+  } catch (error) {
+    // Recipients still translate on demand, so this is only logged
+    console.error('Pre-translation error:', error);
+  }
+};
+
 // Socket.IO connection handling
 io.on('connection', (socket) => {
   console.log('User connected:', socket.id);
@@ -131,6 +169,9 @@ io.on('connection', (socket) => {
         [userId, targetGroupChatId, messageId]
       );
 
+      // Fire and forget: recipients get the message now and a cached translation shortly after
+      pretranslateMessage(messageContent, userId, targetGroupChatId);
+
       // Optimize: Update groupchat status and get message info in parallel
       const [updateResult, message] = await Promise.all([
         // Update groupchat status from pending (0) to active (1)
@@ -836,6 +877,8 @@ app.post('/api/job-posters/:posterId/messages', async (req: any, res: any) => {
       [user_id, groupChat.groupchat_id, messageId]
     );
 
+    pretranslateMessage(message_content, user_id, groupChat.groupchat_id);
+
     // Update groupchat status to active if it was pending
     await executeQuery('UPDATE groupchat SET groupchat_status=1 WHERE groupchat_id=? AND groupchat_status=0', [groupChat.groupchat_id]);
 
@@ -1066,6 +1109,8 @@ app.post('/api/group-chat/:groupChatId/messages', async (req: any, res: any) =>
       [user_id, groupChatId, messageId]
     );
 
+    pretranslateMessage(message_content, user_id, groupChatId);
+
     // Update groupchat status to active if it was pending
     await executeQuery('UPDATE groupchat SET groupchat_status=1 WHERE groupchat_id=? AND groupchat_status=0', [groupChatId]);
 
@@ -1450,6 +1495,158 @@ app.post('/api/translate', async (req: any, res: any) => {
   }
 });
 
+// Translate several messages in one call (e.g. a chat history)
+app.post('/api/translate/batch', async (req: any, res: any) => {
+  try {
+    const { items } = req.body;
+    
+    if (!Array.isArray(items) || items.some((item: any) => !item?.text || !item?.fromLanguage || !item?.toLanguage)) {
+      return res.status(400).json({
+        success: false,
+        message: 'items must be a list of { text, fromLanguage, toLanguage }'
+      });
+    }
+
+    // Call the FastAPI batch translation endpoint
+    const response = await fetch('http://127.0.0.1:8001/translate/batch', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ items }),
+    });
+
+    if (!response.ok) {
+      throw new Error(`FastAPI server responded with status: ${response.status}`);
+    }
+
+    const result = await response.json();
+    
+    res.json({
+      success: true,
+      data: result.results.map((item: any) => ({
+        originalText: item.originalText,
+        translatedText: item.translatedText,
+        fromLanguage: item.fromLanguage,
+        toLanguage: item.toLanguage
+      }))
+    });
+  } catch (error) {
+    console.error('Batch translation error:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Failed to translate messages',
+      error: error instanceof Error ? error.message : 'Unknown error'
+    });
+  }
+});
+
+// Translate one message into several languages in one call (e.g. for every member of a chat)
+app.post('/api/translate/fanout', async (req: any, res: any) => {
+  try {
+    const { text, fromLanguage, toLanguages } = req.body;
+    
+    if (!text || !fromLanguage || !Array.isArray(toLanguages) || !toLanguages.length) {
+      return res.status(400).json({
+        success: false,
+        message: 'text, fromLanguage and a list of toLanguages are required'
+      });
+    }
+
+    // Call the FastAPI fanout translation endpoint
+    const response = await fetch('http://127.0.0.1:8001/translate/fanout', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ text, fromLanguage, toLanguages }),
+    });
+
+    if (!response.ok) {
+      throw new Error(`FastAPI server responded with status: ${response.status}`);
+    }
+
+    const result = await response.json();
+    
+    res.json({
+      success: true,
+      data: result.translations.map((item: any) => ({
+        originalText: item.originalText,
+        translatedText: item.translatedText,
+        fromLanguage: item.fromLanguage,
+        toLanguage: item.toLanguage
+      }))
+    });
+  } catch (error) {
+    console.error('Fanout translation error:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Failed to translate message',
+      error: error instanceof Error ? error.message : 'Unknown error'
+    });
+  }
+});
+
+// Stream a translation as Server-Sent Events (delta events, then done or error)
+app.post('/api/translate/stream', async (req: any, res: any) => {
+  try {
+    const { text, fromLanguage, toLanguage } = req.body;
+
+    if (!text || !fromLanguage || !toLanguage) {
+      return res.status(400).json({
+        success: false,
+        message: 'Text, fromLanguage, and toLanguage are required'
+      });
+    }
+
+    // Abort the upstream stream if the browser goes away
+    const controller = new AbortController();
+    res.on('close', () => controller.abort());
+
+    const response = await fetch('http://127.0.0.1:8001/translate/stream', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ text, fromLanguage, toLanguage }),
+      signal: controller.signal,
+    });
+
+    if (!response.ok || !response.body) {
+      const retryAfter = response.headers.get('Retry-After');
+      if (retryAfter) {
+        res.set('Retry-After', retryAfter);
+      }
+      return res.status(response.status).json({
+        success: false,
+        message: 'Failed to translate message',
+        error: await response.text()
+      });
+    }
+
+    res.writeHead(200, {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      'Connection': 'keep-alive',
+    });
+    for await (const chunk of response.body as any) {
+      res.write(chunk);
+    }
+    res.end();
+  } catch (error) {
+    if (res.headersSent) {
+      res.end();
+      return;
+    }
+    console.error('Streaming translation error:', error);
+    res.status(500).json({
+      success: false,
+      message: 'Failed to translate message',
+      error: error instanceof Error ? error.message : 'Unknown error'
+    });
+  }
+});
+
 // Get user's preferred language
 app.get('/api/user/:userId/preferred-language', async (req: any, res: any) => {
   try {
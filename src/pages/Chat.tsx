@@ -41,6 +41,9 @@ const SUPPORTED_LANGUAGES = [
   { code: 'vietnamese', name: 'Vietnamese', countryCode: 'VN' }
 ];
 
+// Most items the translation service accepts in one batch request (MAX_BATCH_REQUEST_ITEMS in model.py)
+const MAX_BATCH_TRANSLATION_ITEMS = 200;
+
 // Flag Image Component
 const FlagImage = ({ languageCode, size = 20 }: { languageCode: string; size?: number }) => {
   const language = SUPPORTED_LANGUAGES.find(lang => lang.code === languageCode);
@@ -1143,6 +1146,38 @@ const Chat = () => {
     return text; // Return original text if translation fails
   };
 
+  // Function to translate several messages with as few requests as the service allows
+  // (null for messages that could not be translated, so they are tried again later)
+  const translateMessagesBatch = async (items: { text: string; fromLanguage: string; toLanguage: string }[]): Promise<(string | null)[]> => {
+    const chunks: (typeof items)[] = [];
+    for (let start = 0; start < items.length; start += MAX_BATCH_TRANSLATION_ITEMS) {
+      chunks.push(items.slice(start, start + MAX_BATCH_TRANSLATION_ITEMS));
+    }
+
+    const results = await Promise.all(chunks.map(async (chunk): Promise<(string | null)[]> => {
+      try {
+        const response = await fetch('http://localhost:3001/api/translate/batch', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ items: chunk }),
+        });
+
+        const result = await response.json();
+        if (result.success) {
+          return result.data.map((item: { translatedText: string }) =>
+            item.translatedText.startsWith('Error:') ? null : item.translatedText
+          );
+        }
+      } catch (error) {
+        console.error('Batch translation error:', error);
+      }
+      return chunk.map(() => null);
+    }));
+    return results.flat();
+  };
+
   // Function to detect language from text content
   const detectLanguage = (text: string): string => {
     // Simple French detection patterns
@@ -1215,6 +1250,8 @@ const Chat = () => {
     const translateMessages = async () => {
       if (!currentUser || !messages.length) return;
       
+      const pending: { message: Message; senderLanguage: string }[] = [];
+      
       for (const message of messages) {
         // Only translate messages from other users
         if (message.user_id !== currentUser.user_id) {
@@ -1233,23 +1270,40 @@ const Chat = () => {
           
           // Only translate if languages are different
           if (senderLanguage !== currentUserLanguage) {
-            try {
-              console.log(`🔄 Translating message ${message.message_id} from ${senderLanguage} to ${currentUserLanguage}`);
-              const translatedText = await translateMessage(message.message_content, senderLanguage, currentUserLanguage);
-              
-              // Store the translated message
-              setTranslatedMessages(prev => ({
-                ...prev,
-                [message.message_id]: translatedText
-              }));
-              
-              console.log(`✅ Message translated: "${message.message_content}" -> "${translatedText}"`);
-            } catch (error) {
-              console.error('Translation failed:', error);
-            }
+            pending.push({ message, senderLanguage });
           }
         }
       }
+      
+      if (!pending.length) return;
+      
+      try {
+        // Translate everything that is missing with as few requests as possible
+        console.log(`🔄 Translating ${pending.length} messages to ${currentUserLanguage}`);
+        const translatedTexts = await translateMessagesBatch(
+          pending.map(({ message, senderLanguage }) => ({
+            text: message.message_content,
+            fromLanguage: senderLanguage,
+            toLanguage: currentUserLanguage
+          }))
+        );
+        
+        // Store the translated messages; failed ones keep showing the original and are retried next time
+        setTranslatedMessages(prev => {
+          const next = { ...prev };
+          pending.forEach(({ message }, index) => {
+            const translatedText = translatedTexts[index];
+            if (translatedText !== null) {
+              next[message.message_id] = translatedText;
+            }
+          });
+          return next;
+        });
+        
+        console.log(`✅ Translated ${translatedTexts.filter(text => text !== null).length} of ${pending.length} messages`);
+      } catch (error) {
+        console.error('Translation failed:', error);
+      }
     };
     
     translateMessages();
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Keep importing model side-effect free: no disk cache, no shared state file
+os.environ["TRANSLATION_CACHE_DB"] = ""
+os.environ["SHARED_STATE_FILE"] = ""
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import model
+from backfill_segments import Backfill, Checkpoint, parse_args
+from model import JobSegments, SegmentationParseError
+
+
+class FakeService:
+    def __init__(self):
+        self.calls = []
+
+    async def asegment_job_description(self, description, priority="interactive", placeholder=True):
+        self.calls.append(description)
+        if "garbled" in description:
+            raise SegmentationParseError("Could not parse model output")
+        return JobSegments(jobTitle=description)
+
+
+def write_input(path, records):
+    path.write_text("".join(f"{json.dumps(record)}\n" for record in records))
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def backfill(tmp_path, service, *extra):
+    args = parse_args([str(tmp_path / "postings.jsonl"), str(tmp_path / "segments.jsonl"), *extra])
+    checkpoint = Checkpoint.load(args.checkpoint, args.input) or Checkpoint(args.checkpoint, args.input)
+    asyncio.run(Backfill(model, service, args, checkpoint).run())
+    return Checkpoint.load(args.checkpoint, args.input)
+
+
+def test_watermark_advances_past_lines_finished_out_of_order(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"), "postings.jsonl")
+    checkpoint.finish(1)
+    checkpoint.finish(3)
+    assert checkpoint.watermark == 0 and checkpoint.done == {1, 3}
+    checkpoint.finish(0)
+    assert checkpoint.watermark == 2 and checkpoint.done == {3}
+    assert checkpoint.is_done(1) and checkpoint.is_done(3) and not checkpoint.is_done(2)
+
+    checkpoint.output_bytes = 42
+    checkpoint.save()
+    loaded = Checkpoint.load(checkpoint.path, "postings.jsonl")
+    assert (loaded.watermark, loaded.done, loaded.output_bytes) == (2, {3}, 42)
+
+
+def test_results_and_failures_go_to_separate_files(tmp_path):
+    write_input(tmp_path / "postings.jsonl", [
+        {"id": "a", "title": "Cook", "description": "Line cook"},
+        {"id": "b", "description": "garbled"},
+        {"id": "c"},
+    ])
+    checkpoint = backfill(tmp_path, FakeService())
+
+    assert read_lines(tmp_path / "segments.jsonl") == [{"id": "a", "segments": JobSegments(jobTitle="Cook\nLine cook").model_dump()}]
+    assert [(record["id"], record["error"]) for record in read_lines(tmp_path / "segments.retry.jsonl")] == [
+        ("b", "Could not parse model output"),
+        ("c", "Invalid input: no job description"),
+    ]
+    assert checkpoint.complete and checkpoint.watermark == 3
+    assert checkpoint.counters == {"succeeded": 1, "failed": 1, "parse_failed": 1, "skipped": 0}
+
+
+def test_resume_redoes_unsaved_lines_without_duplicating_output(tmp_path):
+    write_input(tmp_path / "postings.jsonl", [{"id": i, "description": f"Job {i}"} for i in range(4)])
+    output = tmp_path / "segments.jsonl"
+    saved = "".join(json.dumps({"id": i, "segments": JobSegments(jobTitle=f"Job {i}").model_dump()}) + "\n" for i in (0, 2))
+    # The interrupted run wrote line 1 after its last checkpoint
+    output.write_text(saved + json.dumps({"id": 1, "segments": {}}) + "\n")
+    interrupted = Checkpoint(str(tmp_path / "segments.checkpoint.json"), str(tmp_path / "postings.jsonl"))
+    interrupted.finish(0)
+    interrupted.finish(2)
+    interrupted.output_bytes = len(saved.encode())
+    interrupted.save()
+
+    service = FakeService()
+    checkpoint = backfill(tmp_path, service)
+
+    assert service.calls == ["Job 1", "Job 3"]
+    assert [record["id"] for record in read_lines(output)] == [0, 2, 1, 3]
+    assert read_lines(output)[2]["segments"]["jobTitle"] == "Job 1"
+    assert checkpoint.complete and checkpoint.watermark == 4
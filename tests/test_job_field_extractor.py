@@ -0,0 +1,34 @@
+import pytest
+
+from model import job_field_extractor
+
+
+@pytest.mark.parametrize("description, location", [
+    ("Barista, New York, NY", "New York, NY"),
+    ("Server, Washington, DC", "Washington, DC"),
+    ("Line cook needed in Austin, TX. $18/hr", "Austin, TX"),
+    ("We're hiring in Austin, Texas", "Austin, TX"),
+    ("Barista - Blue Door Cafe\nDowntown Seattle, WA", "Seattle, WA"),
+])
+def test_location_is_the_city_and_state(description, location):
+    assert job_field_extractor.extract(description)["location"] == location
+
+
+@pytest.mark.parametrize("description", [
+    "Barista, NY",
+    "Barista, New York",
+    "Texas, Oklahoma",
+    "Barista\nGreat team, Competitive pay",
+])
+def test_title_or_state_is_not_taken_for_a_city(description):
+    assert "location" not in job_field_extractor.extract(description)
+
+
+def test_fields_are_normalized():
+    fields = job_field_extractor.extract("Cook in Austin, TX. $18-22 per hour, Mon-Fri 9am-5pm. Call Maria at 512-555-0100.")
+    assert fields == {
+        "salaryRange": "$18-$22/hr",
+        "location": "Austin, TX",
+        "contactInfo": "Maria, 512-555-0100",
+        "workSchedule": "Monday to Friday, 9am-5pm",
+    }
@@ -0,0 +1,30 @@
+import pytest
+
+from model import json_extractor
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('Here you go:\n```json\n{"jobTitle": "Cook", "salaryRange": "$18/hr"}\n```', {"jobTitle": "Cook", "salaryRange": "$18/hr"}),
+    ("{'jobTitle': 'Cook', 'location': 'Austin, TX'}", {"jobTitle": "Cook", "location": "Austin, TX"}),
+    ("{“jobTitle”: “Cook”}", {"jobTitle": "Cook"}),
+    ('{jobTitle: Cook, location: Austin}', {"jobTitle": "Cook", "location": "Austin"}),
+    ('{"jobTitle": "Cook" "location": "Austin"}', {"jobTitle": "Cook", "location": "Austin"}),
+    ('{"jobTitle": "Cook", "location": "Austin",}', {"jobTitle": "Cook", "location": "Austin"}),
+    ('{"description": "Say "hi" to the team\nand smile"}', {"description": 'Say "hi" to the team\nand smile'}),
+    ('{"jobTitle": "Cook", "description": "We need a co', {"jobTitle": "Cook", "description": "We need a co"}),
+    ('{"remote": True, "benefits": None}', {"remote": True, "benefits": None}),
+    ('{"salaryRange": "{18-22}/hr", "jobTitle": "Cook"}', {"salaryRange": "{18-22}/hr", "jobTitle": "Cook"}),
+])
+def test_model_output_is_repaired(text, expected):
+    assert json_extractor.extract(text) == expected
+
+
+def test_accept_skips_objects_it_rejects():
+    text = 'Example: {"name": "field"}\nAnswer: {"jobTitle": "Cook"}'
+    assert json_extractor.extract(text, accept=lambda obj: "jobTitle" in obj) == {"jobTitle": "Cook"}
+
+
+@pytest.mark.parametrize("text", ["no json here", '{"name": "field"}'])
+def test_missing_or_rejected_object_raises(text):
+    with pytest.raises(ValueError):
+        json_extractor.extract(text, accept=lambda obj: "jobTitle" in obj)
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from model import PersistentTranslationStore, TranslationCache
+
+
+@pytest.fixture
+def store(tmp_path):
+    # A long flush interval so writes only happen when a test flushes or closes
+    store = PersistentTranslationStore(str(tmp_path / "translation_cache.db"), flush_interval=60)
+    yield store
+    store.close()
+
+
+def test_queued_writes_are_readable_before_the_flush(store):
+    store.put("key", "english->spanish", "hola", None)
+    assert store.get("key") == ("hola", None)
+    assert store.stats()["pending_writes"] == 1
+    store.flush()
+    assert store.stats()["pending_writes"] == 0
+    assert store.get("key") == ("hola", None)
+
+
+def test_translations_survive_a_restart(tmp_path):
+    path = str(tmp_path / "translation_cache.db")
+    cache = TranslationCache(backing=PersistentTranslationStore(path, flush_interval=60))
+    cache.set("Hello", "english", "spanish", "Hola")
+    cache.backing.close()
+
+    restarted = TranslationCache(backing=PersistentTranslationStore(path, flush_interval=60))
+    assert restarted.get("Hello", "english", "spanish") == "Hola"
+    assert restarted.stats()["disk_hits"] == 1
+    # Read through into memory, so the next lookup doesn't touch the disk
+    assert restarted.get("Hello", "english", "spanish") == "Hola"
+    assert restarted.stats()["disk_hits"] == 1
+    restarted.backing.close()
+
+
+def test_warm_loads_recent_entries_into_memory(tmp_path):
+    path = str(tmp_path / "translation_cache.db")
+    store = PersistentTranslationStore(path, flush_interval=60)
+    for i in range(3):
+        store.put(f"key{i}", "english->spanish", f"uno{i}", None)
+        store.flush()
+    store.close()
+
+    cache = TranslationCache(backing=PersistentTranslationStore(path, flush_interval=60))
+    assert cache.warm(2) == 2
+    assert set(cache.cache) == {"key1", "key2"}
+    cache.backing.close()
+
+
+def test_compact_drops_expired_and_oldest_rows(tmp_path):
+    store = PersistentTranslationStore(str(tmp_path / "translation_cache.db"), max_rows=2, flush_interval=60)
+    store.put("expired", "english->spanish", "viejo", time.time() - 1)
+    store.flush()
+    assert store.get("expired") is None
+    for i in range(3):
+        store.put(f"key{i}", "english->spanish", f"uno{i}", None)
+        store.flush()
+    store.compact()
+    assert store.stats()["rows"] == 2
+    assert store.get("key0") is None
+    assert store.get("key2") == ("uno2", None)
+    store.close()
+
+
+def test_clear_removes_queued_and_stored_rows(store):
+    store.put("stored", "english->spanish", "hola", None)
+    store.flush()
+    store.put("queued", "english->spanish", "adios", None)
+    store.clear()
+    assert store.get("stored") is None
+    assert store.get("queued") is None
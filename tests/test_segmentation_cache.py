@@ -0,0 +1,66 @@
+import model
+from model import JobSegments, SegmentationCache
+
+POSTING = (
+    "Line cook wanted at Blue Door Cafe in Austin, TX. Pay $18/hr, shifts start 6am. "
+    "We offer free meals, paid time off and a friendly team. Call Maria at 512-555-0100 to apply."
+)
+SEGMENTS = JobSegments(
+    jobTitle="Line cook",
+    companyName="Blue Door Cafe",
+    location="Austin, TX",
+    salaryRange="$18/hr",
+    contactInfo="Maria, 512-555-0100",
+)
+
+
+def cache_with_posting(**kwargs):
+    cache = SegmentationCache(**kwargs)
+    cache.set(POSTING, SEGMENTS)
+    return cache
+
+
+def test_whitespace_changes_are_exact_hits():
+    cache = cache_with_posting()
+    assert cache.get("  " + POSTING.replace(" ", "\n")) == SEGMENTS
+    assert cache.stats()["hits"] == 1
+
+
+def test_reposting_with_new_values_reuses_segments_with_those_values():
+    cache = cache_with_posting()
+    segments = cache.get(POSTING.replace("$18", "$20").replace("0100", "0199"))
+    assert segments.salaryRange == "$20/hr"
+    assert segments.contactInfo == "Maria, 512-555-0199"
+    assert segments.companyName == "Blue Door Cafe"
+    assert cache.stats()["template_hits"] == 1
+
+
+def test_lightly_edited_posting_is_a_near_hit():
+    cache = cache_with_posting()
+    assert cache.get(POSTING.replace("friendly team", "friendly and supportive team")) == SEGMENTS
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_near_duplicate_matching_can_be_turned_off():
+    cache = cache_with_posting(min_similarity=0)
+    assert cache.get(POSTING.replace("friendly team", "friendly and supportive team")) is None
+
+
+def test_different_posting_is_a_miss():
+    cache = cache_with_posting()
+    assert cache.get("Barista needed in downtown Seattle, WA. Flexible hours, tips and training for the right candidate.") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicted_and_expired_entries_are_not_reused(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(model.time, "time", lambda: now[0])
+    cache = cache_with_posting(max_size=1, ttl=60)
+    now[0] += 61
+    assert cache.get(POSTING) is None
+    assert cache.stats()["expirations"] == 1
+
+    cache.set(POSTING, SEGMENTS)
+    cache.set("Barista needed in downtown Seattle, WA.", JobSegments(jobTitle="Barista"))
+    assert cache.get(POSTING.replace("$18", "$20")) is None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+import model
+from model import JobSegments, QueueFullError, SegmentationCache, SegmentationJobQueue
+
+
+class FakeGranite:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = []
+        self.cancelled = 0
+
+    async def asegment_job_description(self, description, placeholder=True):
+        self.calls.append(description)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if description == "fail":
+            raise RuntimeError("upstream failed")
+        return JobSegments(jobTitle=description)
+
+
+@pytest.fixture
+def granite(monkeypatch):
+    granite = FakeGranite()
+    monkeypatch.setattr(model, "granite_service", granite)
+    monkeypatch.setattr(model, "segmentation_cache", SegmentationCache())
+    return granite
+
+
+def test_submitted_job_is_processed_and_cached(granite):
+    async def scenario():
+        jobs = SegmentationJobQueue(workers=1)
+        jobs.start()
+        job = jobs.submit("Cook")
+        assert job.status == "queued"
+        result = await job.done
+        # The repeat is answered from the cache without reaching a worker
+        repeat = jobs.submit("Cook")
+        await jobs.stop()
+        return job, result, repeat, jobs.stats()
+
+    job, result, repeat, stats = asyncio.run(scenario())
+    assert job.status == "done" and result.jobTitle == "Cook"
+    assert repeat.status == "done" and repeat.result.jobTitle == "Cook"
+    assert granite.calls == ["Cook"]
+    assert stats["completed"] == 1 and stats["stored_results"] == 2
+
+
+def test_identical_submissions_share_one_job(granite):
+    async def scenario():
+        jobs = SegmentationJobQueue(workers=2)
+        jobs.start()
+        results = await asyncio.gather(jobs.run("Cook"), jobs.run(" Cook "), jobs.run("Cook"))
+        await jobs.stop()
+        return results, jobs.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert [result.jobTitle for result in results] == ["Cook"] * 3
+    assert granite.calls == ["Cook"]
+    assert stats["coalesced"] == 2
+
+
+def test_failure_reaches_every_waiter(granite):
+    async def scenario():
+        jobs = SegmentationJobQueue(workers=1)
+        jobs.start()
+        results = await asyncio.gather(jobs.run("fail"), jobs.run("fail"), return_exceptions=True)
+        await jobs.stop()
+        return results, jobs.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert stats["failed"] == 1 and stats["running"] == 0
+
+
+def test_full_queue_rejects_new_jobs(granite):
+    async def scenario():
+        # No workers are started, so the queue only fills
+        jobs = SegmentationJobQueue(workers=1, max_queued=1)
+        jobs.queue = asyncio.Queue(maxsize=1)
+        jobs.submit("Cook")
+        with pytest.raises(QueueFullError):
+            jobs.submit("Barista")
+        return jobs.stats()
+
+    assert asyncio.run(scenario())["rejected"] == 1
+
+
+def test_unpollable_job_is_cancelled_when_its_last_waiter_leaves(granite):
+    granite.delay = 10
+
+    async def scenario():
+        jobs = SegmentationJobQueue(workers=1)
+        jobs.start()
+        waiters = [asyncio.ensure_future(jobs.run("Cook")) for _ in range(2)]
+        while not granite.calls:
+            await asyncio.sleep(0)
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        assert granite.cancelled == 0
+        waiters[1].cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        # The worker survives and takes the next job
+        granite.delay = 0.01
+        result = await jobs.run("Barista")
+        await jobs.stop()
+        return result, jobs.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert granite.cancelled == 1
+    assert result.jobTitle == "Barista"
+    assert stats["cancelled"] == 1 and stats["completed"] == 1
+
+
+def test_pollable_job_outlives_its_waiters(granite):
+    async def scenario():
+        jobs = SegmentationJobQueue(workers=1)
+        jobs.start()
+        job = jobs.submit("Cook")
+        waiter = asyncio.ensure_future(jobs.run("Cook"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        result = await job.done
+        await jobs.stop()
+        return result
+
+    assert asyncio.run(scenario()).jobTitle == "Cook"
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from model import FlightAbandoned, OverloadedError, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def translate(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return text.upper()
+
+    async def scenario():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("key", translate, "hola") for _ in range(3)))
+        return results, flights
+
+    results, flights = asyncio.run(scenario())
+    assert results == ["HOLA"] * 3
+    assert calls == ["hola"]
+    assert flights.coalesced == 2
+    assert flights.in_flight() == 0
+
+
+def test_call_is_cancelled_only_when_every_caller_leaves():
+    async def scenario():
+        flights = SingleFlight()
+        started = asyncio.Event()
+
+        async def translate():
+            started.set()
+            await asyncio.sleep(10)
+
+        callers = [asyncio.ensure_future(flights.do("key", translate)) for _ in range(2)]
+        await started.wait()
+        shared = flights.calls["key"]
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        assert not shared.cancelled()
+        callers[1].cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return shared.cancelled(), flights.cancelled
+
+    assert asyncio.run(scenario()) == (True, 1)
+
+
+def test_owner_failure_reaches_joiner():
+    async def scenario():
+        flights = SingleFlight()
+        claimed = flights.claim("key")
+        joiner = asyncio.ensure_future(flights.do("key", lambda: pytest.fail("joiner should get the owner's error")))
+        await asyncio.sleep(0)
+        flights.abandon([claimed], OverloadedError(3))
+        with pytest.raises(OverloadedError) as error:
+            await joiner
+        return error.value.retry_after
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_joiner_makes_its_own_call_when_owner_is_cancelled():
+    async def scenario():
+        flights = SingleFlight()
+        claimed = flights.claim("key")
+
+        async def translate():
+            return "hola"
+
+        joiner = asyncio.ensure_future(flights.do("key", translate))
+        joined = asyncio.ensure_future(flights.wait(flights.join("key"), "key", translate))
+        await asyncio.sleep(0)
+        flights.abandon([claimed], asyncio.CancelledError())
+        assert isinstance(claimed.exception(), FlightAbandoned)
+        return await joiner, await joined
+
+    assert asyncio.run(scenario()) == ("hola", "hola")
+
+
+def test_joiner_survives_a_cancelled_claimed_future():
+    async def scenario():
+        flights = SingleFlight()
+        claimed = flights.claim("key")
+
+        async def translate():
+            return "hola"
+
+        joiner = asyncio.ensure_future(flights.do("key", translate))
+        await asyncio.sleep(0)
+        claimed.cancel()
+        return await joiner
+
+    assert asyncio.run(scenario()) == "hola"
+
+
+def test_claimed_result_reaches_joiner():
+    async def scenario():
+        flights = SingleFlight()
+        claimed = flights.claim("key")
+        joined = flights.join("key")
+        claimed.set_result("hola")
+        return await flights.wait(joined, "key", lambda: pytest.fail("joiner should get the owner's result"))
+
+    assert asyncio.run(scenario()) == "hola"
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+import model
+from model import SharedState, SharedTokenBucket, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model.time, "monotonic", clock)
+    return clock
+
+
+def test_reservations_past_capacity_wait_in_order(clock):
+    bucket = TokenBucket(rate=2.0, capacity=2.0)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+
+    clock.now += 1.0
+    # The two owed tokens have been earned and spent
+    assert bucket.available() == 0.0
+
+
+def test_refund_returns_an_unused_token(clock):
+    bucket = TokenBucket(rate=1.0, capacity=1.0)
+    bucket.reserve()
+    assert bucket.reserve() == 1.0
+    bucket.refund()
+    assert bucket.available() == 0.0
+
+
+def test_cancelled_acquire_refunds_its_token():
+    async def scenario():
+        bucket = TokenBucket(rate=0.5, capacity=1.0)
+        await bucket.acquire()
+        waiter = asyncio.ensure_future(bucket.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return bucket.available()
+
+    assert -0.1 < asyncio.run(scenario()) < 0.1
+
+
+def test_decrease_rate_applies_once_per_interval(clock):
+    bucket = TokenBucket(rate=4.0)
+    assert bucket.decrease_rate(0.5, min_rate=0.25, interval=2.0)
+    assert not bucket.decrease_rate(0.5, min_rate=0.25, interval=2.0)
+    clock.now += 2.0
+    assert bucket.decrease_rate(0.5, min_rate=1.5, interval=2.0)
+    assert bucket.rate == 1.5
+
+
+def test_increase_rate_stops_at_max_rate(clock):
+    bucket = TokenBucket(rate=1.0)
+    bucket.increase_rate(0.5, max_rate=8.0)
+    assert bucket.rate == 1.5
+    bucket.increase_rate(100.0, max_rate=8.0)
+    assert bucket.rate == 8.0
+
+
+def test_shared_buckets_draw_from_one_budget(tmp_path, clock):
+    path = str(tmp_path / "shared_state.bin")
+    first = SharedTokenBucket(SharedState(path), rate=1.0, capacity=2.0, slot=2)
+    second = SharedTokenBucket(SharedState(path), rate=1.0, capacity=2.0, slot=2)
+    other_slot = SharedTokenBucket(SharedState(path), rate=1.0, capacity=2.0, slot=3)
+
+    assert first.reserve() == 0.0
+    assert second.reserve() == 0.0
+    assert first.reserve() == 1.0
+    assert other_slot.reserve() == 0.0
+
+    second.set_rate(3.0)
+    assert first.rate == 3.0
+
+
+def test_shared_bucket_resets_stale_state(tmp_path, clock):
+    path = str(tmp_path / "shared_state.bin")
+    bucket = SharedTokenBucket(SharedState(path), rate=1.0, capacity=2.0)
+    bucket.set_rate(0.25)
+    clock.now += SharedTokenBucket.STALE_AFTER + 1
+    assert SharedTokenBucket(SharedState(path), rate=1.0, capacity=2.0).rate == 1.0
+
+
+def test_shared_bucket_slot_must_exist(tmp_path):
+    with pytest.raises(ValueError):
+        SharedTokenBucket(SharedState(str(tmp_path / "shared_state.bin")), slot=SharedState.BUCKET_SLOTS)
@@ -0,0 +1,56 @@
+import model
+from model import SharedState, TranslationCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TranslationCache(max_size=2)
+    cache.set("one", "english", "spanish", "uno")
+    cache.set("two", "english", "spanish", "dos")
+    assert cache.get("one", "english", "spanish") == "uno"
+    cache.set("three", "english", "spanish", "tres")
+
+    assert cache.get("two", "english", "spanish") is None
+    assert cache.get("one", "english", "spanish") == "uno"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_and_skips_oversized_entries():
+    # Key (32 hex chars) plus translation bytes per entry
+    cache = TranslationCache(max_bytes=64 * 16)
+    cache.set("huge", "english", "spanish", "x" * 40)
+    assert cache.size() == 0
+
+    cache.set("a", "english", "spanish", "x" * 20)
+    cache.set("b", "english", "spanish", "x" * 20)
+    assert cache.stats()["bytes"] == 2 * (32 + 20)
+    for i in range(20):
+        cache.set(f"filler {i}", "english", "spanish", "x" * 20)
+    assert cache.stats()["bytes"] <= 64 * 16
+    assert cache.get("a", "english", "spanish") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(model.time, "time", lambda: now[0])
+    cache = TranslationCache(ttl=60)
+    cache.set("hello", "english", "spanish", "hola")
+    now[0] += 59
+    assert cache.get("hello", "english", "spanish") == "hola"
+    now[0] += 2
+    assert cache.get("hello", "english", "spanish") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_language_names_and_codes_share_entries():
+    cache = TranslationCache()
+    cache.set("Hello", "English", "es", "Hola")
+    assert cache.get("hello ", "en", "spanish") == "Hola"
+    assert list(cache.stats()["pairs"]) == ["english->spanish"]
+
+
+def test_clearing_one_worker_clears_the_others(tmp_path):
+    path = str(tmp_path / "shared_state.bin")
+    first, second = TranslationCache(shared=SharedState(path)), TranslationCache(shared=SharedState(path))
+    second.set("hello", "english", "spanish", "hola")
+    first.clear("memory")
+    assert second.get("hello", "english", "spanish") is None
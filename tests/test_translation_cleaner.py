@@ -0,0 +1,34 @@
+from model import translation_cleaner
+
+
+def stream_clean(raw_text: str) -> str:
+    stream = translation_cleaner.stream()
+    text = "".join(stream.feed(char) for char in raw_text)
+    return text + stream.finish()[len(text):]
+
+
+def test_translation_starting_with_native_language_name_is_kept():
+    for raw_text in ("Español es mi idioma", "Deutsch ist schwer", "Italiano è bello"):
+        assert translation_cleaner.clean(raw_text) == raw_text
+        assert stream_clean(raw_text) == raw_text
+
+
+def test_native_language_label_with_colon_is_stripped():
+    assert translation_cleaner.clean("Español: Hola") == "Hola"
+    assert translation_cleaner.clean('Translation: Deutsch: "Hallo"\nNote: informal') == "Hallo"
+    assert stream_clean("Español: Hola") == "Hola"
+
+
+def test_translation_starting_with_a_label_word_is_kept():
+    for raw_text in ("English teachers needed", "Result is good", "English-speaking staff", "Input output"):
+        assert translation_cleaner.clean(raw_text) == raw_text
+        assert stream_clean(raw_text) == raw_text
+
+
+def test_labels_before_a_separator_are_stripped():
+    for raw_text in (
+        "**Translation**: Hola", "**Translation:** Hola", "Translation - Hola", "Translation\nHola",
+        "Spanish translation: Hola", "Here is the translation:\n\"Hola\"",
+    ):
+        assert translation_cleaner.clean(raw_text) == "Hola"
+        assert stream_clean(raw_text) == "Hola"
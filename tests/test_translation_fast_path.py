@@ -0,0 +1,15 @@
+from model import translation_fast_path
+
+
+def test_script_guess_does_not_override_explicit_source_language():
+    for text, from_language, to_language in (
+        ("Привіт, я хочу працювати у вашому ресторані", "ukrainian", "russian"),
+        ("سلام، من می‌خواهم در رستوران شما کار کنم", "persian", "arabic"),
+        ("नमस्कार, मला तुमच्या रेस्टॉरंटमध्ये काम करायचे आहे", "marathi", "hindi"),
+    ):
+        assert translation_fast_path.check(text, from_language, to_language) is None
+
+
+def test_text_already_in_target_language_is_returned():
+    text = "Hello, I would like to work at your restaurant this week"
+    assert translation_fast_path.check(text, "spanish", "english") == text
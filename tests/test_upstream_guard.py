@@ -0,0 +1,33 @@
+import os
+
+from model import SharedState, SharedTokenBucket, UpstreamGuard
+
+
+def test_workers_sharing_a_bucket_cut_the_rate_once(tmp_path):
+    path = str(tmp_path / "shared_state.bin")
+    states = [SharedState(path) for _ in range(2)]
+    # Two serving processes: this one and its parent
+    states[0].register_worker(os.getpid())
+    states[1].register_worker(os.getppid())
+    guards = [UpstreamGuard(SharedTokenBucket(state, rate=4.0, slot=1), increase=0.2) for state in states]
+    for guard in guards:
+        guard.failed(429, 1.0, trial=False)
+    assert guards[0].limiter.rate == 2.0
+
+    for guard in guards:
+        guard.succeeded(1.0, trial=False)
+    # Two workers together add about one worker's worth of increase
+    assert 2.09 < guards[1].limiter.rate < 2.1
+
+
+def test_worker_table_drops_exited_processes(tmp_path):
+    state = SharedState(str(tmp_path / "shared_state.bin"))
+    state.set("worker5", 2 ** 22 + 12345)
+    assert state.workers() == 1
+    state.register_worker(os.getpid())
+    state.register_worker(os.getpid())
+    assert state.get("worker5") == 0
+    assert state.workers() == 1
+    state.unregister_worker(os.getpid())
+    assert state.workers() == 1
+    assert not any(state.get(f"worker{slot}") for slot in range(SharedState.WORKER_SLOTS))
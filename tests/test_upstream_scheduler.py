@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from model import OverloadedError, UpstreamScheduler
+
+
+class ManualLimiter:
+    """Tokens only arrive when a test hands them out"""
+    def __init__(self, rate=100.0):
+        self.rate = rate
+        self.tokens = asyncio.Queue()
+        self.refunded = []
+
+    def available(self):
+        return 0.0
+
+    async def acquire(self):
+        return await self.tokens.get()
+
+    def refund(self, token):
+        self.refunded.append(token)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_tokens_are_granted_by_weight():
+    async def scenario():
+        limiter = ManualLimiter()
+        scheduler = UpstreamScheduler(limiter, {"high": (2.0, None), "low": (1.0, None)})
+        scheduler.start()
+        order = []
+
+        async def call(priority):
+            await scheduler.acquire(priority)
+            order.append(priority)
+
+        # Low-priority work arrives first, as a bulk job would
+        callers = [asyncio.ensure_future(call("low")) for _ in range(3)]
+        callers += [asyncio.ensure_future(call("high")) for _ in range(4)]
+        await settle()
+        for token in range(7):
+            limiter.tokens.put_nowait(token)
+            await settle()
+        await asyncio.gather(*callers)
+        await scheduler.stop()
+        return order, scheduler.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["high", "high", "low", "high", "high", "low", "low"]
+    assert stats["high"]["granted"] == 4 and stats["low"]["granted"] == 3
+
+
+def test_request_that_would_miss_its_deadline_is_shed_up_front():
+    async def scenario():
+        limiter = ManualLimiter(rate=1.0)
+        scheduler = UpstreamScheduler(limiter, {"interactive": (1.0, 2.5)})
+        scheduler.start()
+        waiting = [asyncio.ensure_future(scheduler.acquire("interactive")) for _ in range(2)]
+        await settle()
+        with pytest.raises(OverloadedError) as error:
+            await scheduler.acquire("interactive")
+        for waiter in waiting:
+            waiter.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        await scheduler.stop()
+        return error.value.retry_after, scheduler.stats()
+
+    retry_after, stats = asyncio.run(scenario())
+    assert retry_after == 3.0
+    assert stats["interactive"]["shed"] == 1
+
+
+def test_expired_waiter_is_skipped_and_its_token_goes_to_the_next():
+    async def scenario():
+        limiter = ManualLimiter()
+        scheduler = UpstreamScheduler(limiter, {"ui": (1.0, None), "backfill": (1.0, None)})
+        scheduler.start()
+        loop = asyncio.get_running_loop()
+        expiring = asyncio.ensure_future(scheduler.acquire("ui", deadline=loop.time() + 0.05))
+        patient = asyncio.ensure_future(scheduler.acquire("backfill"))
+        await asyncio.sleep(0.1)
+        limiter.tokens.put_nowait("token")
+        with pytest.raises(OverloadedError):
+            await expiring
+        granted = await patient
+        await scheduler.stop()
+        return granted, scheduler.stats()
+
+    granted, stats = asyncio.run(scenario())
+    assert granted == "token"
+    assert stats["ui"]["expired"] == 1
+
+
+def test_token_is_refunded_when_every_waiter_has_left():
+    async def scenario():
+        limiter = ManualLimiter()
+        scheduler = UpstreamScheduler(limiter, {"ui": (1.0, None)})
+        scheduler.start()
+        waiter = asyncio.ensure_future(scheduler.acquire("ui"))
+        await settle()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.tokens.put_nowait("token")
+        await settle()
+        await scheduler.stop()
+        return limiter.refunded
+
+    assert asyncio.run(scenario()) == ["token"]